@@ -4,9 +4,12 @@ import osvimdriver.config as osvimdriverconfig
 import pathlib
 import os
 from osvimdriver.service.resourcedriver import ResourceDriverHandler, AdditionalResourceDriverProperties, AdoptProperties
-from osvimdriver.openstack.environment import OpenstackDeploymentLocationTranslator
+from osvimdriver.openstack.environment import OpenstackDeploymentLocationTranslator, OpenstackProperties
+from osvimdriver.openstack.warmup import LocationWarmer, LocationWarmupProperties
 from osvimdriver.service.tosca import ToscaParserCapability, ToscaHeatTranslatorCapability, ToscaParserService, ToscaHeatTranslatorService, ToscaTopologyDiscoveryService, ToscaTopologyDiscoveryCapability
 from osvimdriver.service.osadmin import OpenstackAdminApiConfigurator, OpenstackAdminServiceConfigurator, OpenstackAdminProperties
+from osvimdriver.service.watcher import StackWatcher, StackWatcherServiceConfigurator
+from osvimdriver.service.tenancy import TenantResourceDriverServiceConfigurator, disable_bootstrapped_resource_driver_service
 
 default_config_dir_path = str(pathlib.Path(osvimdriverconfig.__file__).parent.resolve())
 default_config_path = os.path.join(default_config_dir_path, 'ovd_config.yml')
@@ -14,26 +17,41 @@ default_config_path = os.path.join(default_config_dir_path, 'ovd_config.yml')
 
 def create_app():
     app_builder = ignition.build_resource_driver('Openstack VIM Driver')
+    # Replaced, so the tenant of each request reaches the handler (and the stack watcher)
+    disable_bootstrapped_resource_driver_service(app_builder)
     app_builder.include_file_config_properties(default_config_path, required=True)
     app_builder.include_file_config_properties('./ovd_config.yml', required=False)
     # custom config file e.g. for K8s populated from Helm chart values
     app_builder.include_file_config_properties('/var/ovd/ovd_config.yml', required=False)
     app_builder.include_environment_config_properties('OVD_CONFIG', required=False)
-    app_builder.add_property_group(AdditionalResourceDriverProperties())
+    resource_driver_properties = AdditionalResourceDriverProperties()
+    app_builder.add_property_group(resource_driver_properties)
     app_builder.add_property_group(AdoptProperties())
+    openstack_properties = OpenstackProperties()
+    app_builder.add_property_group(openstack_properties)
+    warmup_properties = LocationWarmupProperties()
+    app_builder.add_property_group(warmup_properties)
+    # Shared by all services so tokens (and other per-location state) are reused across requests
+    location_translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+    stack_watcher = StackWatcher(location_translator, resource_driver_properties.stack_watcher)
     app_builder.add_service(ToscaParserService)
     app_builder.add_service(ToscaTopologyDiscoveryService, tosca_parser_service=ToscaParserCapability)
     app_builder.add_service(ToscaHeatTranslatorService, tosca_parser_service=ToscaParserCapability)
-    app_builder.add_service(ResourceDriverHandler, OpenstackDeploymentLocationTranslator(),
+    app_builder.add_service(ResourceDriverHandler, location_translator, stack_watcher,
                             heat_translator_service=ToscaHeatTranslatorCapability, tosca_discovery_service=ToscaTopologyDiscoveryCapability,
                             resource_driver_config=AdditionalResourceDriverProperties, adopt_config=AdoptProperties)
 
     # Custom Property Group, Service and API
     app_builder.add_property_group(OpenstackAdminProperties())
     app_builder.add_api_configurator(OpenstackAdminApiConfigurator())
-    app_builder.add_service_configurator(OpenstackAdminServiceConfigurator())
+    app_builder.add_service_configurator(OpenstackAdminServiceConfigurator(location_translator))
+    app_builder.add_service_configurator(StackWatcherServiceConfigurator(stack_watcher))
+    app_builder.add_service_configurator(TenantResourceDriverServiceConfigurator())
 
-    return app_builder.configure()
+    app = app_builder.configure()
+    # Properties are only populated once configured
+    LocationWarmer(location_translator, warmup_properties).start()
+    return app
 
 
 def init_app():
@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from ignition.api.exceptions import ApiException
+from ignition.service.config import ConfigurationProperties
+from ignition.service.resourcedriver import TemporaryResourceDriverError
+from osvimdriver.openstack.cache import LRUCache
+from osvimdriver.openstack.retry import CONNECTION_ERRORS, status_code_of
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = 'CLOSED'
+STATE_OPEN = 'OPEN'
+STATE_HALF_OPEN = 'HALF_OPEN'
+
+
+class CircuitOpenError(TemporaryResourceDriverError):
+    pass
+
+
+def is_location_failure(error):
+    if isinstance(error, TemporaryResourceDriverError):
+        # Includes a request deadline passing, so a probe that times out does not close the circuit
+        return True
+    if isinstance(error, ApiException):
+        # Raised by the driver itself on an invalid request
+        return False
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    status_code = status_code_of(error)
+    # Errors in the request itself (not found, bad request, unauthorized) say nothing about the health of the location
+    return status_code is None or status_code >= 500 or status_code in (408, 429)
+
+
+class CircuitBreakerProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        # consecutive failed requests to a deployment location before requests to it fail fast
+        self.failure_threshold = 5
+        # successful requests slower than this many seconds also count as failures
+        self.slow_call_seconds = 30
+        # requests fail fast for this many seconds, then one request is let through to see if the location has recovered
+        self.open_seconds = 30
+        # maximum number of deployment locations tracked, the least recently used are forgotten first
+        self.max_size = 200
+
+
+class CircuitBreaker():
+
+    def __init__(self, name, failure_threshold=5, slow_call_seconds=30, open_seconds=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.__lock = threading.Lock()
+        self.__state = STATE_CLOSED
+        self.__consecutive_failures = 0
+        self.__opened_at = None
+        self.__probing = False
+        self.__rejected = 0
+        self.__times_opened = 0
+
+    def call(self, operation, request):
+        self.__before(operation)
+        started_at = time.monotonic()
+        try:
+            result = request()
+        except Exception as e:
+            if is_location_failure(e):
+                self.__failed(operation, str(e))
+            else:
+                self.__succeeded()
+            raise
+        duration = time.monotonic() - started_at
+        if self.slow_call_seconds is not None and duration > self.slow_call_seconds:
+            self.__failed(operation, 'took {0:.1f}s'.format(duration))
+        else:
+            self.__succeeded()
+        return result
+
+    @property
+    def state(self):
+        with self.__lock:
+            return self.__state
+
+    def __before(self, operation):
+        with self.__lock:
+            if self.__state == STATE_CLOSED:
+                return
+            if self.__state == STATE_OPEN and time.monotonic() - self.__opened_at >= self.open_seconds:
+                self.__state = STATE_HALF_OPEN
+            if self.__state == STATE_HALF_OPEN and not self.__probing:
+                # Only one request at a time finds out whether the location has recovered
+                self.__probing = True
+                return
+            self.__rejected += 1
+            consecutive_failures = self.__consecutive_failures
+        raise CircuitOpenError('Deployment location {0} is unavailable after {1} consecutive failed requests, {2} will be attempted again later'.format(
+            self.name, consecutive_failures, operation))
+
+    def __succeeded(self):
+        with self.__lock:
+            if self.__state != STATE_CLOSED:
+                logger.info('Deployment location %s has recovered, closing circuit', self.name)
+            self.__state = STATE_CLOSED
+            self.__consecutive_failures = 0
+            self.__probing = False
+
+    def __failed(self, operation, reason):
+        with self.__lock:
+            self.__consecutive_failures += 1
+            reopen = self.__state == STATE_HALF_OPEN
+            if reopen or (self.__state == STATE_CLOSED and self.__consecutive_failures >= self.failure_threshold):
+                logger.warning('Deployment location %s is failing (%s %s), requests will fail fast for %ss', self.name, operation, reason, self.open_seconds)
+                self.__state = STATE_OPEN
+                self.__opened_at = time.monotonic()
+                self.__times_opened += 1
+            self.__probing = False
+
+    def stats(self):
+        with self.__lock:
+            stats = {'name': self.name, 'state': self.__state, 'consecutive_failures': self.__consecutive_failures,
+                     'rejected': self.__rejected, 'times_opened': self.__times_opened}
+            if self.__state == STATE_OPEN:
+                stats['retry_in_seconds'] = round(max(self.open_seconds - (time.monotonic() - self.__opened_at), 0), 1)
+            return stats
+
+
+class CircuitBreakerRegistry():
+
+    def __init__(self, failure_threshold=5, slow_call_seconds=30, open_seconds=30, max_size=200):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.__breakers = LRUCache(max_size=max_size)
+        self.__lock = threading.Lock()
+
+    def get(self, fingerprint, name):
+        # Keyed by fingerprint, so every request to the same location (however often it is rebuilt) shares one breaker
+        with self.__lock:
+            breaker = self.__breakers.get(fingerprint)
+            if breaker is None:
+                breaker = CircuitBreaker(name, failure_threshold=self.failure_threshold, slow_call_seconds=self.slow_call_seconds, open_seconds=self.open_seconds)
+                self.__breakers.put(fingerprint, breaker)
+            return breaker
+
+    def stats(self):
+        return [breaker.stats() for breaker in self.__breakers.values()]
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache():
+
+    def __init__(self, max_size=100, ttl=None, on_evict=None):
+        if max_size is not None and max_size < 1:
+            raise ValueError('max_size must be greater than 0')
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__lock = threading.RLock()
+        self.__entries = OrderedDict()
+
+    def get(self, key, default=None):
+        expired = None
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                expired = self.__entries.pop(key)[0]
+                self.evictions += 1
+                self.misses += 1
+            else:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+        if expired is not None:
+            self.__notify_evicted([(key, expired)])
+            return default
+        return value
+
+    def put(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        evicted = []
+        with self.__lock:
+            self.__entries[key] = (value, expires_at)
+            self.__entries.move_to_end(key)
+            while self.max_size is not None and len(self.__entries) > self.max_size:
+                evicted.append(self.__pop_oldest())
+        self.__notify_evicted(evicted)
+
+    def touch(self, key, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return False
+            expires_at = time.monotonic() + ttl if ttl is not None else None
+            self.__entries[key] = (entry[0], expires_at)
+            self.__entries.move_to_end(key)
+            return True
+
+    def remove(self, key):
+        with self.__lock:
+            entry = self.__entries.pop(key, None)
+        return entry[0] if entry is not None else None
+
+    def expire(self):
+        now = time.monotonic()
+        evicted = []
+        with self.__lock:
+            for key, (value, expires_at) in list(self.__entries.items()):
+                if expires_at is not None and expires_at <= now:
+                    del self.__entries[key]
+                    self.evictions += 1
+                    evicted.append((key, value))
+        self.__notify_evicted(evicted)
+        return len(evicted)
+
+    def clear(self):
+        with self.__lock:
+            evicted = [(key, value) for key, (value, _) in self.__entries.items()]
+            self.__entries.clear()
+        self.__notify_evicted(evicted)
+
+    def keys(self):
+        with self.__lock:
+            return list(self.__entries.keys())
+
+    def values(self):
+        with self.__lock:
+            return [value for value, _ in self.__entries.values()]
+
+    def stats(self):
+        with self.__lock:
+            return {
+                'size': len(self.__entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def __contains__(self, key):
+        with self.__lock:
+            return key in self.__entries
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__entries)
+
+    def __pop_oldest(self):
+        key, (value, _) = self.__entries.popitem(last=False)
+        self.evictions += 1
+        return (key, value)
+
+    def __notify_evicted(self, evicted):
+        if self.on_evict is None:
+            return
+        for key, value in evicted:
+            self.on_evict(key, value)
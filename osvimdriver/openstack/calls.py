@@ -0,0 +1,20 @@
+import functools
+
+
+class OpenstackCaller():
+
+    def __init__(self, retry_policy=None, circuit_breaker=None, concurrency_gate=None):
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.concurrency_gate = concurrency_gate
+
+    def call(self, operation, request, idempotent=True):
+        if self.circuit_breaker is not None:
+            # Inside the retries, so they stop as soon as the circuit opens
+            request = functools.partial(self.circuit_breaker.call, operation, request)
+        if self.concurrency_gate is not None:
+            # Outside the circuit breaker, so time spent queued is not mistaken for a slow location, and no turn is held between retries
+            request = functools.partial(self.concurrency_gate.call, operation, request)
+        if self.retry_policy is None:
+            return request()
+        return self.retry_policy.call(operation, request, idempotent=idempotent)
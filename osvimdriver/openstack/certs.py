@@ -0,0 +1,129 @@
+import atexit
+import hashlib
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+from ignition.service.config import ConfigurationProperties
+
+logger = logging.getLogger(__name__)
+
+CERT_FILE_SUFFIX = '.pem'
+
+
+class CertificateStoreProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        # Shared by all worker processes on the pod, so identical certificates are only written once
+        self.directory = os.path.join(tempfile.gettempdir(), 'ovd-certs')
+        self.max_age_seconds = 3600
+        self.sweep_interval_seconds = 300
+
+
+class CertificateStore():
+
+    def __init__(self, directory, max_age_seconds=3600, sweep_interval_seconds=300):
+        if directory is None:
+            raise ValueError('directory must be provided')
+        self.directory = self.__prepare_directory(directory)
+        self.max_age_seconds = max_age_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.__lock = threading.Lock()
+        self.__references = {}
+        self.__last_sweep = time.monotonic()
+
+    def __prepare_directory(self, directory):
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # The default path is predictable, so it may have been created (or swapped for a link) by another user beforehand
+        directory_stat = os.lstat(directory)
+        if stat.S_ISDIR(directory_stat.st_mode) and directory_stat.st_uid == os.getuid() and stat.S_IMODE(directory_stat.st_mode) == 0o700:
+            return directory
+        private_directory = tempfile.mkdtemp(prefix='ovd-certs-')
+        # Only ever used by this process, so nothing else would remove it
+        atexit.register(shutil.rmtree, private_directory, ignore_errors=True)
+        logger.warning('Certificate directory %s is not a directory private to this user, using %s instead (certificates are not shared between workers)',
+                       directory, private_directory)
+        return private_directory
+
+    def acquire(self, content):
+        path = os.path.join(self.directory, hashlib.sha256(content.encode('utf-8')).hexdigest() + CERT_FILE_SUFFIX)
+        with self.__lock:
+            self.__write_or_touch(path, content)
+            if path in self.__references:
+                self.__references[path]['count'] += 1
+            else:
+                self.__references[path] = {'count': 1, 'content': content}
+        self.__sweep_if_due()
+        return path
+
+    def release(self, path):
+        with self.__lock:
+            reference = self.__references.get(path)
+            if reference is None:
+                return
+            reference['count'] -= 1
+            if reference['count'] <= 0:
+                # Not removed straight away, other workers may be using the same file. The sweep removes it once it ages out
+                del self.__references[path]
+
+    def sweep(self):
+        removed = 0
+        oldest_allowed = time.time() - self.max_age_seconds
+        with self.__lock:
+            self.__last_sweep = time.monotonic()
+            # Keep files held by this process fresh, so no other process ages them out
+            for path, reference in self.__references.items():
+                self.__write_or_touch(path, reference['content'])
+            for file_name in os.listdir(self.directory):
+                path = os.path.join(self.directory, file_name)
+                if not file_name.endswith(CERT_FILE_SUFFIX) or path in self.__references:
+                    continue
+                try:
+                    if os.path.getmtime(path) < oldest_allowed:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        if removed > 0:
+            logger.debug('Removed %s unused certificate files from %s', removed, self.directory)
+        return removed
+
+    def destroy(self):
+        with self.__lock:
+            self.__references.clear()
+            if os.path.exists(self.directory):
+                shutil.rmtree(self.directory)
+
+    def stats(self):
+        with self.__lock:
+            referenced = len(self.__references)
+        files = len([f for f in os.listdir(self.directory) if f.endswith(CERT_FILE_SUFFIX)]) if os.path.exists(self.directory) else 0
+        return {'files': files, 'referenced': referenced}
+
+    def __sweep_if_due(self):
+        if time.monotonic() - self.__last_sweep >= self.sweep_interval_seconds:
+            self.sweep()
+
+    def __write_or_touch(self, path, content):
+        if os.path.exists(path):
+            try:
+                os.utime(path)
+                return
+            except FileNotFoundError:
+                pass
+        # Written to a temporary file then renamed, so other workers never read a partially written certificate
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
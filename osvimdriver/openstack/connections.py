@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+import requests
+from keystoneauth1 import session as keystonesession
+from ignition.service.config import ConfigurationProperties
+from osvimdriver.openstack.cache import LRUCache
+from osvimdriver.openstack.retry import note_retry_after
+from osvimdriver.openstack.deadline import timeout_for_request
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPoolProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        self.pool_size = 10
+        self.max_connections_per_host = 20
+        self.idle_timeout_seconds = 60
+
+
+class DeadlineHTTPAdapter(keystonesession.TCPKeepAliveAdapter):
+
+    def send(self, request, **kwargs):
+        # The clients set no timeouts of their own, so each request is limited to what is left of the deadline of the request it serves
+        kwargs['timeout'] = timeout_for_request(kwargs.get('timeout'))
+        response = super().send(request, **kwargs)
+        note_retry_after(response)
+        return response
+
+
+class PooledHTTPAdapter(DeadlineHTTPAdapter):
+
+    def __init__(self, pool_size=10, max_connections_per_host=20, idle_timeout_seconds=60, ssl_context=None):
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.ssl_context = ssl_context
+        self.__lock = threading.Lock()
+        self.__in_flight = 0
+        self.__last_used = time.monotonic()
+        self.__retired_requests = 0
+        self.__retired_connections = 0
+        self.__idle_resets = 0
+        super().__init__(pool_connections=pool_size, pool_maxsize=max_connections_per_host)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.ssl_context is not None:
+            kwargs['ssl_context'] = self.ssl_context
+        super().init_poolmanager(*args, **kwargs)
+
+    def cert_verify(self, conn, url, verify, cert):
+        if self.ssl_context is None or not url.lower().startswith('https'):
+            return super().cert_verify(conn, url, verify, cert)
+        # The CA bundle and client certificate are already loaded into the SSL context, so nothing is re-read per connection
+        conn.cert_reqs = 'CERT_REQUIRED'
+        conn.ca_certs = None
+        conn.ca_cert_dir = None
+        conn.cert_file = None
+        conn.key_file = None
+
+    def send(self, request, **kwargs):
+        self.__start_request()
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            self.__end_request()
+
+    def stats(self):
+        with self.__lock:
+            total_requests = self.__retired_requests
+            total_connections = self.__retired_connections
+            idle_resets = self.__idle_resets
+        for pool in self.__live_pools():
+            total_requests += pool.num_requests
+            total_connections += pool.num_connections
+        return {
+            'requests': total_requests,
+            'connections_opened': total_connections,
+            'connections_reused': max(total_requests - total_connections, 0),
+            'idle_resets': idle_resets
+        }
+
+    def __start_request(self):
+        with self.__lock:
+            idle_for = time.monotonic() - self.__last_used
+            if self.__in_flight == 0 and self.idle_timeout_seconds is not None and idle_for > self.idle_timeout_seconds:
+                # Load balancers tend to drop idle connections silently, so start afresh rather than fail on a stale socket
+                logger.debug('Closing pooled connections idle for %.1fs', idle_for)
+                self.__retire_pools()
+            self.__in_flight += 1
+            self.__last_used = time.monotonic()
+
+    def __end_request(self):
+        with self.__lock:
+            self.__in_flight -= 1
+            self.__last_used = time.monotonic()
+
+    def __retire_pools(self):
+        for pool in self.__live_pools():
+            self.__retired_requests += pool.num_requests
+            self.__retired_connections += pool.num_connections
+        self.poolmanager.clear()
+        self.__idle_resets += 1
+
+    def __live_pools(self):
+        pools = self.poolmanager.pools
+        live_pools = []
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                live_pools.append(pool)
+        return live_pools
+
+
+def build_pooled_session(adapter):
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class ConnectionPool():
+
+    def __init__(self, pool_size=10, max_connections_per_host=20, idle_timeout_seconds=60, max_tls_sessions=50):
+        self.pool_size = pool_size
+        self.max_connections_per_host = max_connections_per_host
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.adapter = PooledHTTPAdapter(pool_size=pool_size, max_connections_per_host=max_connections_per_host, idle_timeout_seconds=idle_timeout_seconds)
+        self.session = build_pooled_session(self.adapter)
+        # Bounded like the SSL context cache, so certificates that are no longer used do not keep their sessions (and connections) forever
+        self.__tls_sessions = LRUCache(max_size=max_tls_sessions, on_evict=self.__tls_session_evicted)
+        self.__lock = threading.Lock()
+
+    def session_for(self, tls_fingerprint, ssl_context):
+        # Connections made with one SSL context must never be handed to a location trusting different certificates
+        with self.__lock:
+            session = self.__tls_sessions.get(tls_fingerprint)
+            if session is None:
+                adapter = PooledHTTPAdapter(pool_size=self.pool_size, max_connections_per_host=self.max_connections_per_host,
+                                            idle_timeout_seconds=self.idle_timeout_seconds, ssl_context=ssl_context)
+                session = build_pooled_session(adapter)
+                self.__tls_sessions.put(tls_fingerprint, session)
+            return session
+
+    def __tls_session_evicted(self, tls_fingerprint, session):
+        # Locations still holding the session can carry on using it, the adapter opens new connections as needed
+        session.close()
+
+    def stats(self):
+        stats = self.adapter.stats()
+        with self.__lock:
+            tls_sessions = list(self.__tls_sessions.values())
+        for session in tls_sessions:
+            for key, value in session.get_adapter('https://').stats().items():
+                stats[key] += value
+        return stats
+
+    def close(self):
+        self.session.close()
+        with self.__lock:
+            tls_sessions = list(self.__tls_sessions.values())
+            self.__tls_sessions.clear()
+        for session in tls_sessions:
+            session.close()
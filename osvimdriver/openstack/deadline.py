@@ -0,0 +1,76 @@
+import contextlib
+import contextvars
+import time
+from ignition.service.resourcedriver import TemporaryResourceDriverError
+
+# Applied to calls made outside of any request (e.g. background token refreshes), so a hung API cannot hold them up indefinitely
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 10
+DEFAULT_READ_TIMEOUT_SECONDS = 60
+
+# Deadline of the request being handled, carried to the HTTP adapter without passing it through every client call
+_current_deadline = contextvars.ContextVar('ovd_deadline', default=None)
+
+
+class DeadlineExceededError(TemporaryResourceDriverError):
+    pass
+
+
+class Deadline():
+
+    def __init__(self, name, seconds, connect_timeout_seconds=None):
+        self.name = name
+        self.seconds = seconds
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+
+@contextlib.contextmanager
+def deadline(name, seconds, connect_timeout_seconds=None):
+    if seconds is None:
+        yield _current_deadline.get()
+        return
+    new_deadline = Deadline(name, seconds, connect_timeout_seconds=connect_timeout_seconds)
+    current = _current_deadline.get()
+    if current is not None and current.expires_at < new_deadline.expires_at:
+        # Already working to a tighter deadline, which still applies
+        new_deadline = current
+    token = _current_deadline.set(new_deadline)
+    try:
+        yield new_deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline():
+    return _current_deadline.get()
+
+
+def remaining_seconds():
+    current = _current_deadline.get()
+    return current.remaining() if current is not None else None
+
+
+def deadline_exceeded(current):
+    return DeadlineExceededError('{0} request ran out of time ({1}s)'.format(current.name, current.seconds))
+
+
+def timeout_for_request(timeout=None):
+    current = _current_deadline.get()
+    if current is None:
+        return timeout if timeout is not None else (DEFAULT_CONNECT_TIMEOUT_SECONDS, DEFAULT_READ_TIMEOUT_SECONDS)
+    remaining = current.remaining()
+    if remaining <= 0:
+        raise deadline_exceeded(current)
+    if isinstance(timeout, tuple):
+        connect_timeout, read_timeout = timeout
+    else:
+        connect_timeout, read_timeout = timeout, timeout
+    if current.connect_timeout_seconds is not None:
+        connect_timeout = min(connect_timeout, current.connect_timeout_seconds) if connect_timeout is not None else current.connect_timeout_seconds
+    # Whatever the clients asked for, nothing waits beyond the deadline
+    connect_timeout = min(connect_timeout, remaining) if connect_timeout is not None else remaining
+    read_timeout = min(read_timeout, remaining) if read_timeout is not None else remaining
+    return (connect_timeout, read_timeout)
@@ -0,0 +1,44 @@
+import logging
+from ignition.service.config import ConfigurationProperties
+from osvimdriver.openstack.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+HEAT_SERVICE_TYPE = 'orchestration'
+NEUTRON_SERVICE_TYPE = 'network'
+
+
+class EndpointCacheProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        self.max_size = 200
+        self.ttl_seconds = 3600
+        self.interface = 'public'
+        self.region_name = None
+
+
+class EndpointCache():
+
+    def __init__(self, max_size=200, ttl_seconds=3600, interface='public', region_name=None):
+        self.interface = interface
+        self.region_name = region_name
+        self.__endpoints = LRUCache(max_size=max_size, ttl=ttl_seconds)
+
+    def get_endpoint(self, session, fingerprint, service_type):
+        key = (fingerprint, service_type, self.interface, self.region_name)
+        endpoint = self.__endpoints.get(key)
+        if endpoint is not None:
+            return endpoint
+        endpoint = session.get_endpoint(service_type=service_type, interface=self.interface, region_name=self.region_name)
+        if endpoint is None:
+            # Not cached, so the client falls back to resolving the endpoint itself and reports the missing service
+            logger.debug('No %s endpoint found in the service catalog for %s', service_type, fingerprint)
+            return None
+        logger.debug('Resolved %s endpoint %s for %s', service_type, endpoint, fingerprint)
+        self.__endpoints.put(key, endpoint)
+        return endpoint
+
+    def stats(self):
+        return self.__endpoints.stats()
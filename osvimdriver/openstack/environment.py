@@ -1,11 +1,30 @@
 import tempfile
+import hashlib
+import json
+import logging
 import os
-import shutil
+import threading
 from keystoneauth1.identity import v3 as keystonev3
 from keystoneauth1 import session as keystonesession
+from ignition.service.config import ConfigurationPropertiesGroup
 from osvimdriver.openstack.heat.driver import HeatDriver
+from osvimdriver.openstack.heat.batching import StackStatusBatchingProperties
+from osvimdriver.openstack.heat.stackcache import StackCache, StackCacheProperties
+from osvimdriver.openstack.heat.monitor import StackStatusMonitor, StackStatusMonitorProperties
 from osvimdriver.openstack.heat.template import HeatInputUtil
 from osvimdriver.openstack.neutron.driver import NeutronDriver
+from osvimdriver.openstack.tokens import TokenCache, TokenCacheProperties, CachedPassword, TokenRefresher
+from osvimdriver.openstack.tokenstore import SharedTokenStore
+from osvimdriver.openstack.registry import OpenstackLocationRegistry, LocationRegistryProperties
+from osvimdriver.openstack.connections import ConnectionPool, ConnectionPoolProperties, PooledHTTPAdapter, DeadlineHTTPAdapter, build_pooled_session
+from osvimdriver.openstack.certs import CertificateStore, CertificateStoreProperties
+from osvimdriver.openstack.tasks import PeriodicTask
+from osvimdriver.openstack.endpoints import EndpointCache, EndpointCacheProperties, HEAT_SERVICE_TYPE, NEUTRON_SERVICE_TYPE
+from osvimdriver.openstack.tls import SSLContextCache, SSLContextCacheProperties, tls_fingerprint
+from osvimdriver.openstack.retry import RetryPolicy, RetryBudgetRegistry, RetryMetrics, RetryProperties
+from osvimdriver.openstack.breaker import CircuitBreakerRegistry, CircuitBreakerProperties
+from osvimdriver.openstack.limiter import FairScheduler, ConcurrencyLimitProperties
+from osvimdriver.openstack.heat.hedging import HedgerRegistry, HedgingProperties
 
 AUTH_PROP_PREFIX = 'os_auth_'
 AUTH_ENABLED_PROP = 'os_auth_enabled'
@@ -15,6 +34,61 @@ OS_CACERT_PROP = 'os_cacert'
 OS_CERT_PROP = 'os_cert'
 OS_KEY_PROP = 'os_key'
 
+logger = logging.getLogger(__name__)
+
+
+class OpenstackProperties(ConfigurationPropertiesGroup):
+
+    def __init__(self):
+        super().__init__('openstack')
+        self.token_cache = TokenCacheProperties()
+        self.location_registry = LocationRegistryProperties()
+        self.connection_pool = ConnectionPoolProperties()
+        self.cert_store = CertificateStoreProperties()
+        self.ssl_context_cache = SSLContextCacheProperties()
+        self.endpoint_cache = EndpointCacheProperties()
+        self.status_batching = StackStatusBatchingProperties()
+        self.stack_cache = StackCacheProperties()
+        self.stack_status_monitor = StackStatusMonitorProperties()
+        self.retry = RetryProperties()
+        self.circuit_breaker = CircuitBreakerProperties()
+        self.concurrency_limit = ConcurrencyLimitProperties()
+        self.stack_read_hedging = HedgingProperties()
+        # how often (in seconds) idle locations and unused certificate files are cleaned up in the background
+        self.reaper_interval_seconds = 60
+
+
+class LocationGauge():
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__live_locations = 0
+        self.__live_workspaces = 0
+
+    def location_opened(self):
+        with self.__lock:
+            self.__live_locations += 1
+
+    def location_disposed(self):
+        with self.__lock:
+            self.__live_locations -= 1
+
+    def workspace_created(self):
+        with self.__lock:
+            self.__live_workspaces += 1
+
+    def workspace_removed(self):
+        with self.__lock:
+            self.__live_workspaces -= 1
+
+    def stats(self):
+        with self.__lock:
+            return {'live_locations': self.__live_locations, 'live_workspaces': self.__live_workspaces}
+
+# Process wide, so locations which are never closed show up as a steadily growing number
+location_gauge = LocationGauge()
+
+
 class OpenstackPasswordAuth():
 
     def __init__(self, auth_api, auth_properties={}):
@@ -23,36 +97,91 @@ class OpenstackPasswordAuth():
         self.auth_api = auth_api
         self.auth_properties = auth_properties
 
-    def build_os_auth(self, api_url):
+    def build_os_auth(self, api_url, token_cache=None, fingerprint=None):
         full_auth_url = api_url + '/' + self.auth_api
         full_auth_props = self.auth_properties.copy()
         full_auth_props['auth_url'] = full_auth_url
+        if token_cache is not None:
+            return CachedPassword(token_cache, fingerprint, **full_auth_props)
         auth = keystonev3.Password(**full_auth_props)
         return auth
 
 
 class OpenstackDeploymentLocation():
 
-    def __init__(self, name, api_url, auth, ca_cert=None, client_cert=None, client_key=None):
+    def __init__(self, name, api_url, auth, ca_cert=None, client_cert=None, client_key=None, token_cache=None, connection_pool=None, cert_store=None, ssl_context_cache=None, endpoint_cache=None, status_batching=None, stack_cache=None, stack_status_monitor=None, retry_policy=None, retry_budgets=None, circuit_breakers=None, scheduler=None, hedgers=None):
         self.name = name
+        # Shared locations are owned by the OpenstackLocationRegistry, which disposes of them when they are evicted
+        self.shared = False
+        self.__references = 0
+        self.__retired = False
+        self.__disposed = False
+        self.__lock = threading.RLock()
         self.__api_url = api_url
         self.__auth = auth
+        self.__token_cache = token_cache
+        self.__connection_pool = connection_pool
+        self.__ssl_context_cache = ssl_context_cache
+        self.__endpoint_cache = endpoint_cache
+        self.__status_batching = status_batching
+        self.__stack_cache = stack_cache
+        self.__stack_status_monitor_properties = stack_status_monitor
+        self.__stack_status_monitor = None
+        # Holds the retry budget, so requests to a struggling location share one allowance of retries
+        self.__retry_policy = retry_policy
         self.__session = None
         self.__heat_driver = None
         self.__neutron_driver = None
-        self.__tmp_workspace = tempfile.mkdtemp()
+        self.__cert_store = cert_store
+        # Only used when no shared store is provided and the location has certificates to write
+        self.__private_cert_store = None
         self.__ca_cert = ca_cert
         self.__client_cert = client_cert
         self.__client_key = client_key
-        self.__ca_cert_path = os.path.join(self.__tmp_workspace, 'ca.cert') if ca_cert is not None else None
-        self.__client_cert_path = os.path.join(self.__tmp_workspace, 'client.cert') if client_cert is not None else None
-        self.__client_key_path = os.path.join(self.__tmp_workspace, 'client.key') if client_key is not None else None
+        self.__ca_cert_path = None
+        self.__client_cert_path = None
+        self.__client_key_path = None
+        self.fingerprint = self.__build_fingerprint()
+        if self.__retry_policy is not None and retry_budgets is not None:
+            self.__retry_policy.budget = retry_budgets.get(self.fingerprint)
+        self.circuit_breaker = circuit_breakers.get(self.fingerprint, name) if circuit_breakers is not None else None
+        self.concurrency_gate = scheduler.gate(self.fingerprint, name) if scheduler is not None else None
+        self.hedger = hedgers.get(self.fingerprint) if hedgers is not None else None
+        location_gauge.location_opened()
+
+    def __build_fingerprint(self):
+        # Identifies the credentials used to reach this location, so equivalent locations can share tokens
+        fingerprint_values = {
+            'api_url': self.__api_url,
+            'auth_api': getattr(self.__auth, 'auth_api', None),
+            'auth_properties': getattr(self.__auth, 'auth_properties', None),
+            'ca_cert': self.__ca_cert,
+            'client_cert': self.__client_cert,
+            'client_key': self.__client_key
+        }
+        fingerprint_str = json.dumps(fingerprint_values, sort_keys=True, default=str)
+        return hashlib.sha256(fingerprint_str.encode('utf-8')).hexdigest()
+
+    def __build_auth(self):
+        if self.__auth is None:
+            return None
+        if self.__token_cache is not None:
+            return self.__auth.build_os_auth(self.__api_url, token_cache=self.__token_cache, fingerprint=self.fingerprint)
+        return self.__auth.build_os_auth(self.__api_url)
 
     def create_session(self):
-        auth_details = self.__auth.build_os_auth(self.__api_url) if self.__auth is not None else None
+        auth_details = self.__build_auth()
         self.__write_certs()
         kwargs = {}
         kwargs['auth'] = auth_details
+        requests_session = self.__build_tls_session()
+        if requests_session is not None:
+            kwargs['session'] = requests_session
+        elif self.__connection_pool is not None:
+            kwargs['session'] = self.__connection_pool.session
+        else:
+            # Not shared, but still limited by the deadline of the request being handled
+            kwargs['session'] = build_pooled_session(DeadlineHTTPAdapter())
         if self.__ca_cert_path != None:
             kwargs['verify'] = self.__ca_cert_path
         if self.__client_cert_path != None:
@@ -63,47 +192,391 @@ class OpenstackDeploymentLocation():
         self.__session = keystonesession.Session(**kwargs)
         return self.__session
 
+    def __build_tls_session(self):
+        if self.__ssl_context_cache is None or (self.__ca_cert is None and self.__client_cert is None):
+            return None
+        fingerprint = tls_fingerprint(self.__ca_cert, self.__client_cert, self.__client_key)
+        ssl_context = self.__ssl_context_cache.get(ca_cert=self.__ca_cert, client_cert_path=self.__client_cert_path, client_key_path=self.__client_key_path,
+                                                   fingerprint=fingerprint)
+        if self.__connection_pool is not None:
+            return self.__connection_pool.session_for(fingerprint, ssl_context)
+        return build_pooled_session(PooledHTTPAdapter(idle_timeout_seconds=None, ssl_context=ssl_context))
+
     def get_session(self):
-        if self.__session is None:
-            self.create_session()
-        return self.__session
+        with self.__lock:
+            if self.__session is None:
+                self.create_session()
+            return self.__session
 
     @property
     def heat_driver(self):
-        if self.__heat_driver is None:
-            self.__heat_driver = HeatDriver(self.get_session())
-        return self.__heat_driver
+        with self.__lock:
+            if self.__heat_driver is None:
+                session = self.get_session()
+                heat_kwargs = self.__driver_kwargs(session, HEAT_SERVICE_TYPE)
+                if self.__status_batching is not None and self.__status_batching.enabled:
+                    heat_kwargs['batch_window_seconds'] = self.__status_batching.window_ms / 1000
+                    heat_kwargs['max_batch_size'] = self.__status_batching.max_batch_size
+                if self.__stack_cache is not None:
+                    heat_kwargs['stack_cache'] = self.__stack_cache
+                    heat_kwargs['location_fingerprint'] = self.fingerprint
+                if self.__retry_policy is not None:
+                    heat_kwargs['retry_policy'] = self.__retry_policy
+                if self.circuit_breaker is not None:
+                    heat_kwargs['circuit_breaker'] = self.circuit_breaker
+                if self.concurrency_gate is not None:
+                    heat_kwargs['concurrency_gate'] = self.concurrency_gate
+                if self.hedger is not None:
+                    heat_kwargs['hedger'] = self.hedger
+                self.__heat_driver = HeatDriver(session, **heat_kwargs)
+            return self.__heat_driver
+
+    @property
+    def stack_status_monitor(self):
+        monitor_properties = self.__stack_status_monitor_properties
+        # Only worth running for locations reused across requests
+        if not self.shared or monitor_properties is None or not monitor_properties.enabled:
+            return None
+        with self.__lock:
+            if self.__stack_status_monitor is None and not self.__disposed:
+                self.__stack_status_monitor = StackStatusMonitor(self.heat_driver, interval_seconds=monitor_properties.interval_seconds,
+                                                                 max_age_seconds=monitor_properties.max_age_seconds, idle_timeout_seconds=monitor_properties.idle_timeout_seconds,
+                                                                 max_tracked_stacks=monitor_properties.max_tracked_stacks, page_size=monitor_properties.page_size,
+                                                                 name='ovd-stack-monitor-{0}'.format(self.name))
+                self.__stack_status_monitor.start()
+            return self.__stack_status_monitor
+
+    def get_endpoint(self, service_type, session=None):
+        if self.__endpoint_cache is None or self.__auth is None:
+            return None
+        if session is None:
+            session = self.get_session()
+        if self.circuit_breaker is not None:
+            # Authenticates with Keystone when the endpoint is not already known, which hangs just the same when the location is down
+            return self.circuit_breaker.call('get_endpoint', lambda: self.__endpoint_cache.get_endpoint(session, self.fingerprint, service_type))
+        return self.__endpoint_cache.get_endpoint(session, self.fingerprint, service_type)
+
+    def __driver_kwargs(self, session, service_type):
+        try:
+            endpoint = self.get_endpoint(service_type, session=session)
+        except Exception as e:
+            # Left to the client, so any auth or catalog error is raised by the request that needed it, as before
+            logger.debug('Unable to resolve %s endpoint for %s: %s', service_type, self.name, str(e))
+            return {}
+        if endpoint is None:
+            return {}
+        return {'endpoint': endpoint}
 
     def get_heat_input_util(self):
         return HeatInputUtil()
 
     @property
     def neutron_driver(self):
-        if self.__neutron_driver is None:
-            self.__neutron_driver = NeutronDriver(self.get_session())
-        return self.__neutron_driver
+        with self.__lock:
+            if self.__neutron_driver is None:
+                session = self.get_session()
+                neutron_kwargs = self.__driver_kwargs(session, NEUTRON_SERVICE_TYPE)
+                if self.__retry_policy is not None:
+                    neutron_kwargs['retry_policy'] = self.__retry_policy
+                if self.circuit_breaker is not None:
+                    neutron_kwargs['circuit_breaker'] = self.circuit_breaker
+                if self.concurrency_gate is not None:
+                    neutron_kwargs['concurrency_gate'] = self.concurrency_gate
+                self.__neutron_driver = NeutronDriver(session, **neutron_kwargs)
+            return self.__neutron_driver
+
+    def acquire(self):
+        with self.__lock:
+            self.__references += 1
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def close(self):
-        if os.path.exists(self.__tmp_workspace):
-            shutil.rmtree(self.__tmp_workspace)
+        if self.shared:
+            with self.__lock:
+                self.__references = max(self.__references - 1, 0)
+                dispose_now = self.__retired and self.__references == 0
+            if dispose_now:
+                self.__dispose()
+            return
+        self.dispose()
 
-    def __write_certs(self):
-        if self.__ca_cert_path != None:
-            self.__write_if_needed(self.__ca_cert_path, self.__ca_cert)
-        if self.__client_cert_path != None:
-            self.__write_if_needed(self.__client_cert_path, self.__client_cert)
-        if self.__client_key_path != None:
-            self.__write_if_needed(self.__client_key_path, self.__client_key)
+    def dispose(self):
+        with self.__lock:
+            if self.__references > 0:
+                # Still in use by a request, so disposed of when the last user closes it
+                self.__retired = True
+                return
+        self.__dispose()
 
-    def __write_if_needed(self, path, content):
-        if not os.path.exists(path):
-            with open(path, 'w') as f:
-                f.write(content)
+    def __dispose(self):
+        with self.__lock:
+            if self.__disposed:
+                return
+            self.__disposed = True
+            stack_status_monitor = self.__stack_status_monitor
+            cert_store = self.__cert_store if self.__cert_store is not None else self.__private_cert_store
+            if cert_store is not None:
+                for path in [self.__ca_cert_path, self.__client_cert_path, self.__client_key_path]:
+                    if path != None:
+                        cert_store.release(path)
+            if self.__private_cert_store is not None:
+                self.__private_cert_store.destroy()
+                location_gauge.workspace_removed()
+        if stack_status_monitor is not None:
+            # Not waited for, a refresh already in progress finishes on its own
+            stack_status_monitor.stop(timeout=0)
+        location_gauge.location_disposed()
+
+    def __has_certs(self):
+        return self.__ca_cert != None or self.__client_cert != None or self.__client_key != None
+
+    def __get_cert_store(self):
+        if self.__cert_store is not None:
+            return self.__cert_store
+        if self.__private_cert_store is None:
+            self.__private_cert_store = CertificateStore(tempfile.mkdtemp())
+            location_gauge.workspace_created()
+        return self.__private_cert_store
+
+    def __write_certs(self):
+        if not self.__has_certs():
+            return
+        cert_store = self.__get_cert_store()
+        if self.__ca_cert != None and self.__ca_cert_path == None:
+            self.__ca_cert_path = cert_store.acquire(self.__ca_cert)
+        if self.__client_cert != None and self.__client_cert_path == None:
+            self.__client_cert_path = cert_store.acquire(self.__client_cert)
+        if self.__client_key != None and self.__client_key_path == None:
+            self.__client_key_path = cert_store.acquire(self.__client_key)
 
 
 class OpenstackDeploymentLocationTranslator():
 
+    def __init__(self, openstack_properties=None):
+        self.openstack_properties = openstack_properties
+        self.__token_cache = None
+        self.__token_refresher = None
+        self.__location_registry = None
+        self.__connection_pool = None
+        self.__cert_store = None
+        self.__ssl_context_cache = None
+        self.__endpoint_cache = None
+        self.__stack_cache = None
+        self.__retry_metrics = RetryMetrics()
+        self.__retry_budgets = None
+        self.__circuit_breakers = None
+        self.__scheduler = None
+        self.__hedgers = None
+        self.__reaper = None
+        self.__lock = threading.Lock()
+
+    def __get_token_cache(self):
+        if self.openstack_properties is None or not self.openstack_properties.token_cache.enabled:
+            return None
+        # Built on first use, as the properties are only populated once the application configuration has been read
+        with self.__lock:
+            if self.__token_cache is None:
+                token_cache_properties = self.openstack_properties.token_cache
+                self.__token_cache = TokenCache(max_size=token_cache_properties.max_size, expiry_margin_seconds=token_cache_properties.expiry_margin_seconds,
+                                                shared_store=self.__build_shared_token_store(token_cache_properties.shared_store))
+                refresher_properties = token_cache_properties.refresher
+                if refresher_properties.enabled:
+                    self.__token_refresher = TokenRefresher(self.__token_cache, refresh_margin_seconds=refresher_properties.refresh_margin_seconds,
+                                                            interval_seconds=refresher_properties.interval_seconds, idle_timeout_seconds=refresher_properties.idle_timeout_seconds)
+                    self.__token_refresher.start()
+            return self.__token_cache
+
+    def __build_shared_token_store(self, shared_store_properties):
+        if not shared_store_properties.enabled:
+            return None
+        try:
+            key = os.environ.get(shared_store_properties.key_env) if shared_store_properties.key_env else None
+            return SharedTokenStore(shared_store_properties.path, key=key or None, key_file=shared_store_properties.key_file)
+        except Exception as e:
+            # Tokens are still cached by this worker, only sharing them with other workers is lost
+            logger.exception('Unable to open shared token store at {0}, tokens will not be shared between workers: {1}'.format(shared_store_properties.path, str(e)))
+            return None
+
+    def __get_location_registry(self):
+        if self.openstack_properties is None or not self.openstack_properties.location_registry.enabled:
+            return None
+        with self.__lock:
+            if self.__location_registry is None:
+                registry_properties = self.openstack_properties.location_registry
+                self.__location_registry = OpenstackLocationRegistry(max_size=registry_properties.max_size, idle_timeout_seconds=registry_properties.idle_timeout_seconds)
+            return self.__location_registry
+
+    def __get_connection_pool(self):
+        if self.openstack_properties is None or not self.openstack_properties.connection_pool.enabled:
+            return None
+        with self.__lock:
+            if self.__connection_pool is None:
+                pool_properties = self.openstack_properties.connection_pool
+                self.__connection_pool = ConnectionPool(pool_size=pool_properties.pool_size, max_connections_per_host=pool_properties.max_connections_per_host,
+                                                        idle_timeout_seconds=pool_properties.idle_timeout_seconds,
+                                                        max_tls_sessions=self.openstack_properties.ssl_context_cache.max_size)
+            return self.__connection_pool
+
+    def __get_cert_store(self):
+        if self.openstack_properties is None or not self.openstack_properties.cert_store.enabled:
+            return None
+        with self.__lock:
+            if self.__cert_store is None:
+                cert_store_properties = self.openstack_properties.cert_store
+                self.__cert_store = CertificateStore(cert_store_properties.directory, max_age_seconds=cert_store_properties.max_age_seconds,
+                                                     sweep_interval_seconds=cert_store_properties.sweep_interval_seconds)
+            return self.__cert_store
+
+    def __get_ssl_context_cache(self):
+        if self.openstack_properties is None or not self.openstack_properties.ssl_context_cache.enabled:
+            return None
+        with self.__lock:
+            if self.__ssl_context_cache is None:
+                self.__ssl_context_cache = SSLContextCache(max_size=self.openstack_properties.ssl_context_cache.max_size)
+            return self.__ssl_context_cache
+
+    def __get_endpoint_cache(self):
+        if self.openstack_properties is None or not self.openstack_properties.endpoint_cache.enabled:
+            return None
+        with self.__lock:
+            if self.__endpoint_cache is None:
+                endpoint_cache_properties = self.openstack_properties.endpoint_cache
+                self.__endpoint_cache = EndpointCache(max_size=endpoint_cache_properties.max_size, ttl_seconds=endpoint_cache_properties.ttl_seconds,
+                                                      interface=endpoint_cache_properties.interface, region_name=endpoint_cache_properties.region_name)
+            return self.__endpoint_cache
+
+    def __get_stack_cache(self):
+        if self.openstack_properties is None or not self.openstack_properties.stack_cache.enabled:
+            return None
+        with self.__lock:
+            if self.__stack_cache is None:
+                stack_cache_properties = self.openstack_properties.stack_cache
+                self.__stack_cache = StackCache(max_size=stack_cache_properties.max_size, ttl_seconds=stack_cache_properties.ttl_seconds,
+                                                terminal_ttl_seconds=stack_cache_properties.terminal_ttl_seconds)
+            return self.__stack_cache
+
+    def __build_retry_policy(self):
+        if self.openstack_properties is None or not self.openstack_properties.retry.enabled:
+            return None
+        retry_properties = self.openstack_properties.retry
+        return RetryPolicy(max_attempts=retry_properties.max_attempts, base_delay_seconds=retry_properties.base_delay_seconds,
+                           max_delay_seconds=retry_properties.max_delay_seconds, max_retry_after_seconds=retry_properties.max_retry_after_seconds,
+                           metrics=self.__retry_metrics)
+
+    def __get_retry_budgets(self):
+        if self.openstack_properties is None or not self.openstack_properties.retry.enabled:
+            return None
+        with self.__lock:
+            if self.__retry_budgets is None:
+                retry_properties = self.openstack_properties.retry
+                self.__retry_budgets = RetryBudgetRegistry(burst=retry_properties.budget_burst, ratio=retry_properties.budget_ratio)
+            return self.__retry_budgets
+
+    def __get_circuit_breakers(self):
+        if self.openstack_properties is None or not self.openstack_properties.circuit_breaker.enabled:
+            return None
+        with self.__lock:
+            if self.__circuit_breakers is None:
+                breaker_properties = self.openstack_properties.circuit_breaker
+                self.__circuit_breakers = CircuitBreakerRegistry(failure_threshold=breaker_properties.failure_threshold, slow_call_seconds=breaker_properties.slow_call_seconds,
+                                                                 open_seconds=breaker_properties.open_seconds, max_size=breaker_properties.max_size)
+            return self.__circuit_breakers
+
+    def __get_scheduler(self):
+        if self.openstack_properties is None or not self.openstack_properties.concurrency_limit.enabled:
+            return None
+        with self.__lock:
+            if self.__scheduler is None:
+                limit_properties = self.openstack_properties.concurrency_limit
+                self.__scheduler = FairScheduler(max_per_location=limit_properties.max_per_location, max_total=limit_properties.max_total,
+                                                 max_wait_seconds=limit_properties.max_wait_seconds, weights=limit_properties.weights,
+                                                 max_tracked_locations=limit_properties.max_tracked_locations)
+            return self.__scheduler
+
+    def __get_hedgers(self):
+        if self.openstack_properties is None or not self.openstack_properties.stack_read_hedging.enabled:
+            return None
+        with self.__lock:
+            if self.__hedgers is None:
+                hedging_properties = self.openstack_properties.stack_read_hedging
+                self.__hedgers = HedgerRegistry(percentile=hedging_properties.percentile, min_delay_seconds=hedging_properties.min_delay_ms / 1000,
+                                                max_delay_seconds=hedging_properties.max_delay_ms / 1000, sample_size=hedging_properties.sample_size,
+                                                min_samples=hedging_properties.min_samples, budget_burst=hedging_properties.budget_burst,
+                                                budget_ratio=hedging_properties.budget_ratio, max_threads=hedging_properties.max_threads,
+                                                max_size=hedging_properties.max_size)
+            return self.__hedgers
+
+    def circuit_breakers(self):
+        if self.__circuit_breakers is None:
+            return []
+        return self.__circuit_breakers.stats()
+
+    def __get_status_batching(self):
+        if self.openstack_properties is None:
+            return None
+        return self.openstack_properties.status_batching
+
+    def __get_stack_status_monitor(self):
+        if self.openstack_properties is None:
+            return None
+        return self.openstack_properties.stack_status_monitor
+
+    def __start_reaper(self):
+        if self.openstack_properties is None:
+            return
+        with self.__lock:
+            if self.__reaper is None:
+                self.__reaper = PeriodicTask('ovd-location-reaper', self.openstack_properties.reaper_interval_seconds, self.reap)
+                self.__reaper.start()
+
+    def reap(self):
+        if self.__location_registry is not None:
+            self.__location_registry.expire()
+        if self.__cert_store is not None:
+            self.__cert_store.sweep()
+
+    def stats(self):
+        stats = {'locations': location_gauge.stats()}
+        if self.__location_registry is not None:
+            stats['location_registry'] = self.__location_registry.stats()
+        if self.__token_cache is not None:
+            stats['token_cache'] = self.__token_cache.stats()
+        if self.__token_refresher is not None:
+            stats['token_refresher'] = self.__token_refresher.stats()
+        if self.__connection_pool is not None:
+            stats['connection_pool'] = self.__connection_pool.stats()
+        if self.__cert_store is not None:
+            stats['cert_store'] = self.__cert_store.stats()
+        if self.__endpoint_cache is not None:
+            stats['endpoint_cache'] = self.__endpoint_cache.stats()
+        if self.__stack_cache is not None:
+            stats['stack_cache'] = self.__stack_cache.stats()
+        if self.__ssl_context_cache is not None:
+            stats['ssl_context_cache'] = self.__ssl_context_cache.stats()
+        if self.openstack_properties is not None and self.openstack_properties.retry.enabled:
+            stats['retries'] = self.__retry_metrics.stats()
+        if self.__circuit_breakers is not None:
+            stats['circuit_breakers'] = self.__circuit_breakers.stats()
+        if self.__scheduler is not None:
+            stats['concurrency'] = self.__scheduler.stats()
+        if self.__hedgers is not None:
+            stats['stack_read_hedging'] = self.__hedgers.stats()
+        return stats
+
     def from_deployment_location(self, deployment_location):
+        self.__start_reaper()
+        location_registry = self.__get_location_registry()
+        if location_registry is not None:
+            return location_registry.get_or_create(deployment_location, self.__build_location)
+        return self.__build_location(deployment_location)
+
+    def __build_location(self, deployment_location):
         dl_name = deployment_location.get('name')
         if dl_name is None:
             raise ValueError('Deployment Location managed by the Openstack VIM Driver must have a name')
@@ -134,7 +607,13 @@ class OpenstackDeploymentLocationTranslator():
         else:
             configured_auth = None
         ca_cert, client_cert, client_key = self.__gather_certs(dl_properties)
-        return OpenstackDeploymentLocation(dl_name, api_url, configured_auth, ca_cert=ca_cert, client_cert=client_cert, client_key=client_key)
+        return OpenstackDeploymentLocation(dl_name, api_url, configured_auth, ca_cert=ca_cert, client_cert=client_cert, client_key=client_key,
+                                            token_cache=self.__get_token_cache(), connection_pool=self.__get_connection_pool(), cert_store=self.__get_cert_store(),
+                                            ssl_context_cache=self.__get_ssl_context_cache(), endpoint_cache=self.__get_endpoint_cache(),
+                                            status_batching=self.__get_status_batching(), stack_cache=self.__get_stack_cache(),
+                                            stack_status_monitor=self.__get_stack_status_monitor(), retry_policy=self.__build_retry_policy(),
+                                            retry_budgets=self.__get_retry_budgets(), circuit_breakers=self.__get_circuit_breakers(), scheduler=self.__get_scheduler(),
+                                            hedgers=self.__get_hedgers())
 
     def __gather_certs(self, dl_properties):
         ca_cert = dl_properties.get(OS_CACERT_PROP, None)
@@ -0,0 +1,106 @@
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from ignition.service.config import ConfigurationProperties
+from osvimdriver.openstack.deadline import current_deadline, deadline_exceeded
+
+logger = logging.getLogger(__name__)
+
+
+class StackStatusBatchingProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        # off by default, as Ignition handles the polls of each worker one at a time: a lookup with no other lookup of the same location
+        # in progress is fetched straight away, so nothing is batched unless polls are handled concurrently
+        self.enabled = False
+        # status lookups made within this many milliseconds of each other are resolved with a single stack list request
+        self.window_ms = 20
+        # maximum number of stacks requested in one stack list request
+        self.max_batch_size = 50
+
+
+class StackStatusBatcher():
+
+    def __init__(self, list_stacks, window_seconds=0.02, max_batch_size=50):
+        if list_stacks is None:
+            raise ValueError('list_stacks must be provided')
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        self.__list_stacks = list_stacks
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self.__lock = threading.Lock()
+        self.__pending = {}
+        self.__collecting = False
+        self.__batch_full = threading.Event()
+        self.__fetching = 0
+        self.__lookups = 0
+        self.__fetched = 0
+        self.__batches = 0
+        self.__requests = 0
+
+    def get(self, stack_id, fetch):
+        with self.__lock:
+            self.__lookups += 1
+            alone = not self.__collecting and self.__fetching == 0
+            if alone:
+                # Nothing else in progress to batch with, so there is no reason to wait
+                self.__fetching += 1
+                self.__fetched += 1
+        if alone:
+            try:
+                return fetch()
+            finally:
+                with self.__lock:
+                    self.__fetching -= 1
+        with self.__lock:
+            future = self.__pending.get(stack_id)
+            if future is None:
+                future = Future()
+                self.__pending[stack_id] = future
+            # The first caller of a window collects lookups for the others, then makes the request on their behalf
+            leader = not self.__collecting
+            if leader:
+                self.__collecting = True
+                self.__batch_full.clear()
+            if len(self.__pending) >= self.max_batch_size:
+                self.__batch_full.set()
+        if leader:
+            self.__batch_full.wait(self.window_seconds)
+            self.__flush()
+        current = current_deadline()
+        try:
+            stack = future.result(timeout=max(current.remaining(), 0) if current is not None else None)
+        except FutureTimeoutError:
+            # The leader's stack list request is taking longer than this request has left
+            raise deadline_exceeded(current) from None
+        if stack is None:
+            # Missing from the list, so fetched on its own to raise the usual errors
+            return fetch()
+        return stack
+
+    def __flush(self):
+        with self.__lock:
+            batch = self.__pending
+            self.__pending = {}
+            self.__collecting = False
+            self.__batches += 1
+        stack_ids = list(batch.keys())
+        found = {}
+        try:
+            for i in range(0, len(stack_ids), self.max_batch_size):
+                with self.__lock:
+                    self.__requests += 1
+                for stack in self.__list_stacks(stack_ids[i:i + self.max_batch_size]):
+                    found[stack.get('id')] = stack
+        except Exception as e:
+            # Callers fetch their stacks individually instead, so any error is raised against the request it belongs to
+            logger.warning('Failed to list status of %s stacks: %s', len(stack_ids), str(e))
+            found = {}
+        for stack_id, future in batch.items():
+            future.set_result(found.get(stack_id))
+
+    def stats(self):
+        with self.__lock:
+            return {'lookups': self.__lookups, 'fetched': self.__fetched, 'batches': self.__batches, 'requests': self.__requests}
@@ -4,6 +4,9 @@ from heatclient import client as heatclient
 from heatclient import exc as heatexc
 from ignition.service.logging import logging_context
 from osvimdriver.openstack.heat.template import HeatInputUtil
+from osvimdriver.openstack.cache import LRUCache
+from osvimdriver.openstack.calls import OpenstackCaller
+from osvimdriver.openstack.heat.batching import StackStatusBatcher
 import osvimdriver.service.common as common
 
 import osvimdriver.service.resourcedriver as rd
@@ -15,16 +18,40 @@ class StackNotFoundError(Exception):
     pass
 
 LOG_URI_PREFIX = '...'
+STACK_NAME_CACHE_SIZE = 1000
 
 class HeatDriver():
 
-    def __init__(self, session):
+    def __init__(self, session, endpoint=None, batch_window_seconds=None, max_batch_size=50, stack_cache=None, location_fingerprint=None, retry_policy=None, circuit_breaker=None, concurrency_gate=None, hedger=None):
         self.__session = session
-        self.__heat_client = heatclient.Client('1', session=self.__session)
+        self.__hedger = hedger
+        self.__caller = OpenstackCaller(retry_policy=retry_policy, circuit_breaker=circuit_breaker, concurrency_gate=concurrency_gate)
+        # Shared by every location, so entries are keyed by the fingerprint of the location they were retrieved from
+        self.__stack_cache = stack_cache if location_fingerprint is not None else None
+        self.__location_fingerprint = location_fingerprint
+        # Names of stacks seen by this driver, so stacks polled by id alone are also fetched from their canonical URL
+        self.__stack_names = LRUCache(max_size=STACK_NAME_CACHE_SIZE)
+        self.__status_batcher = None
+        if batch_window_seconds is not None:
+            self.__status_batcher = StackStatusBatcher(self.__list_stack_statuses, window_seconds=batch_window_seconds, max_batch_size=max_batch_size)
+        if endpoint is not None:
+            # Resolved up front, so requests skip the service catalog lookup
+            self.__heat_client = heatclient.Client('1', session=self.__session, endpoint_override=endpoint)
+        else:
+            self.__heat_client = heatclient.Client('1', session=self.__session)
 
     def __get_heat_client(self):
         return self.__heat_client
 
+    def __call(self, operation, request, idempotent=True):
+        return self.__caller.call(operation, request, idempotent=idempotent)
+
+    def __hedged_call(self, operation, request):
+        if self.__hedger is None:
+            return self.__call(operation, request)
+        # Each request sent goes through retries, concurrency limits and the circuit breaker on its own
+        return self.__hedger.call(lambda: self.__call(operation, request))
+
     def create_stack(self, stack_name, heat_template, input_properties=None,  files=None):
         if input_properties is None:
             input_properties = {}
@@ -46,9 +73,12 @@ class HeatDriver():
         
         
         try:  
-            create_result = heat_client.stacks.create(stack_name=stack_name, template=heat_template, parameters=input_properties, files=files)
+            # Not idempotent, so only retried when Heat turned it away without creating anything
+            create_result = self.__call('create_stack', lambda: heat_client.stacks.create(stack_name=stack_name, template=heat_template, parameters=input_properties, files=files),
+                                        idempotent=False)
             stack_id = create_result['stack']['id']
             driver_request_id = rd.build_request_id(rd.CREATE_REQUEST_PREFIX, str(stack_id))
+            self.__stack_names.put(stack_id, stack_name)
             common._generate_additional_logs(create_result, 'received', external_request_id, 'application/json',
                                        'response', 'http', {'status_code' : 201,'status_reason_phrase' : 'Created'}, driver_request_id)
             logger.debug('Stack with name %s created and assigned id %s', stack_name, stack_id)
@@ -73,7 +103,8 @@ class HeatDriver():
            
             common._generate_additional_logs('', 'sent', external_request_id, '',
                                         'request', 'http', {'method':'delete', 'uri' : LOG_URI_PREFIX + '/stacks/' + stack_id}, driver_request_id)
-            delete_result = heat_client.stacks.delete(stack_id)
+            delete_result = self.__call('delete_stack', lambda: heat_client.stacks.delete(stack_id))
+            self.__invalidate_cached_stack(stack_id)
             result = ''
             content_type =''
             if delete_result != None:   
@@ -89,16 +120,35 @@ class HeatDriver():
                                        'response', 'http', {'status_code' : e.code,'status_reason_phrase' : status_reason_phrase}, driver_request_id)
             raise StackNotFoundError(str(e)) from e
 
-    def get_stack(self, stack_id, driver_request_id=None):
+    def get_stack(self, stack_id, driver_request_id=None, resolve_outputs=True, stack_name=None, expected_actions=None):
         if stack_id is None:
             raise ValueError('stack_id must be provided')
-        heat_client = self.__get_heat_client()
+        if self.__stack_cache is not None:
+            key = (self.__location_fingerprint, stack_id, resolve_outputs)
+            # A cached stack is only used when it shows the operation being polled (e.g. not CREATE_COMPLETE when polling a delete)
+            return self.__stack_cache.get(key, lambda: self.__get_stack(stack_id, driver_request_id, resolve_outputs, stack_name), actions=expected_actions)
+        return self.__get_stack(stack_id, driver_request_id, resolve_outputs, stack_name)
+
+    def __get_stack(self, stack_id, driver_request_id, resolve_outputs, stack_name):
         logger.debug('Retrieving stack with id %s', stack_id)
+        if not resolve_outputs and self.__status_batcher is not None:
+            stack = self.__status_batcher.get(stack_id, lambda: self.__show_stack(stack_id, driver_request_id, resolve_outputs, stack_name))
+            self.__remember_stack_name(stack_id, stack)
+            return stack
+        return self.__show_stack(stack_id, driver_request_id, resolve_outputs, stack_name)
+
+    def __show_stack(self, stack_id, driver_request_id, resolve_outputs, stack_name):
+        heat_client = self.__get_heat_client()
+        stack_identifier = self.__stack_identifier(stack_id, stack_name)
         try:
             external_request_id = str(uuid.uuid4())
             common._generate_additional_logs('', 'sent', external_request_id, '',
-                                        'request', 'http', {'method':'get', 'uri' : LOG_URI_PREFIX + '/stacks/' + stack_id}, driver_request_id)
-            result = heat_client.stacks.get(stack_id)
+                                        'request', 'http', {'method':'get', 'uri' : LOG_URI_PREFIX + '/stacks/' + stack_identifier}, driver_request_id)
+            if resolve_outputs:
+                result = self.__hedged_call('get_stack', lambda: heat_client.stacks.get(stack_identifier))
+            else:
+                # Heat evaluates every output of the stack unless told otherwise, which is costly for large stacks
+                result = self.__hedged_call('get_stack', lambda: heat_client.stacks.get(stack_identifier, resolve_outputs=False))
            
             common._generate_additional_logs(str(result).removeprefix('<Stack').removesuffix('>'), 'received', external_request_id, 'application/json',
                                        'response', 'http', {'status_code' : 200, 'status_reason_phrase' : 'ok'}, driver_request_id)  
@@ -109,7 +159,49 @@ class HeatDriver():
             common._generate_additional_logs(e, 'received', external_request_id, 'plain/text',
                                        'response', 'http', {'status_code' : e.code,'status_reason_phrase' : status_reason_phrase}, driver_request_id)
             raise StackNotFoundError(str(e)) from e
-        return result.to_dict()
+        stack = result.to_dict()
+        self.__remember_stack_name(stack_id, stack)
+        return stack
+
+    def __stack_identifier(self, stack_id, stack_name=None):
+        if stack_name is None:
+            stack_name = self.__stack_names.get(stack_id)
+        # Heat redirects /stacks/{id} to /stacks/{name}/{id}, so using the canonical URL saves a round trip
+        return stack_name + '/' + stack_id if stack_name is not None else stack_id
+
+    def get_stack_events(self, stack_id, marker=None, stack_name=None):
+        if stack_id is None:
+            raise ValueError('stack_id must be provided')
+        heat_client = self.__get_heat_client()
+        try:
+            if marker is None:
+                # Only the latest event, to use as the marker for the next call
+                events = self.__call('get_stack_events', lambda: heat_client.events.list(self.__stack_identifier(stack_id, stack_name), sort_dir='desc', limit=1))
+            else:
+                events = self.__call('get_stack_events', lambda: heat_client.events.list(self.__stack_identifier(stack_id, stack_name), marker=marker, sort_dir='asc'))
+        except heatexc.HTTPNotFound as e:
+            raise StackNotFoundError(str(e)) from e
+        return [event.to_dict() for event in events]
+
+    def __invalidate_cached_stack(self, stack_id):
+        if self.__stack_cache is not None:
+            self.__stack_cache.invalidate(self.__location_fingerprint, stack_id)
+
+    def __remember_stack_name(self, stack_id, stack):
+        if isinstance(stack.get('stack_name'), str):
+            self.__stack_names.put(stack_id, stack['stack_name'])
+
+    def __list_stack_statuses(self, stack_ids):
+        heat_client = self.__get_heat_client()
+        logger.debug('Retrieving status of stacks %s', stack_ids)
+        external_request_id = str(uuid.uuid4())
+        common._generate_additional_logs('', 'sent', external_request_id, '',
+                                    'request', 'http', {'method':'get', 'uri' : LOG_URI_PREFIX + '/stacks?id=' + '&id='.join(stack_ids)}, None)
+        # Deleted stacks are hidden from the list by default, but delete requests are polling for exactly that status
+        result = self.__call('list_stacks', lambda: [stack.to_dict() for stack in heat_client.stacks.list(filters={'id': stack_ids}, limit=len(stack_ids), show_deleted=True)])
+        common._generate_additional_logs(str(result), 'received', external_request_id, 'application/json',
+                                   'response', 'http', {'status_code' : 200, 'status_reason_phrase' : 'ok'}, None)
+        return result
 
     def check_stack(self, stack_id):
         if stack_id is None:
@@ -117,10 +209,23 @@ class HeatDriver():
         heat_client = self.__get_heat_client()
         logger.debug('Checking stack with id %s', stack_id)
         try:
-            heat_client.actions.check(stack_id)
+            self.__call('check_stack', lambda: heat_client.actions.check(stack_id))
+            self.__invalidate_cached_stack(stack_id)
         except heatexc.HTTPNotFound as e:
             raise StackNotFoundError(str(e)) from e
                       
+    def get_stacks_by_status(self, status, page_size=500):
+        heat_client = self.__get_heat_client()
+        logger.debug('Retrieving stacks with status %s', status)
+        stacks = []
+        marker = None
+        while True:
+            page = self.__call('list_stacks', lambda: [stack.to_dict() for stack in heat_client.stacks.list(filters={'status': status}, limit=page_size, marker=marker)])
+            stacks.extend(page)
+            if len(page) < page_size:
+                return stacks
+            marker = page[-1]['id']
+
     def get_stacks(self):
         heat_client = self.__get_heat_client()
         logger.debug('Retrieving stacks %s')
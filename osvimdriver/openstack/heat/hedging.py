@@ -0,0 +1,217 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ignition.service.config import ConfigurationProperties
+from osvimdriver.openstack.cache import LRUCache
+from osvimdriver.openstack.deadline import current_deadline, deadline_exceeded
+from osvimdriver.openstack.retry import RetryBudget, take_retry_after, restore_retry_after
+
+logger = logging.getLogger(__name__)
+
+
+class HedgingProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = False
+        # a second request is sent when the first has taken longer than this percentile of recent stack retrievals from the same location
+        self.percentile = 95
+        # bounds (in milliseconds) of the delay before the second request
+        self.min_delay_ms = 20
+        self.max_delay_ms = 2000
+        # number of recent retrieval times kept for each deployment location, hedging starts once min_samples have been seen
+        self.sample_size = 200
+        self.min_samples = 20
+        # second requests each deployment location may send in a burst
+        self.budget_burst = 5
+        # fraction of a second request earned by each stack retrieval, once the burst is spent
+        self.budget_ratio = 0.05
+        # threads shared by all deployment locations to send stack retrievals on, once all are busy retrievals are not hedged
+        self.max_threads = 50
+        # maximum number of deployment locations tracked, the least recently used are forgotten first
+        self.max_size = 200
+
+
+class HedgeMetrics():
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__requests = 0
+        self.__hedged = 0
+        self.__hedge_wins = 0
+        self.__budget_exhausted = 0
+        self.__saturated = 0
+
+    def requested(self):
+        with self.__lock:
+            self.__requests += 1
+
+    def hedged(self):
+        with self.__lock:
+            self.__hedged += 1
+
+    def hedge_won(self):
+        with self.__lock:
+            self.__hedge_wins += 1
+
+    def budget_exhausted(self):
+        with self.__lock:
+            self.__budget_exhausted += 1
+
+    def saturated(self):
+        with self.__lock:
+            self.__saturated += 1
+
+    def stats(self):
+        with self.__lock:
+            return {'requests': self.__requests, 'hedged': self.__hedged, 'hedge_wins': self.__hedge_wins, 'budget_exhausted': self.__budget_exhausted,
+                    'saturated': self.__saturated}
+
+
+class Hedger():
+
+    def __init__(self, executor, percentile=95, min_delay_seconds=0.02, max_delay_seconds=2, sample_size=200, min_samples=20, budget=None, metrics=None, slots=None):
+        self.executor = executor
+        self.percentile = percentile
+        self.min_delay_seconds = min_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.min_samples = min_samples
+        self.budget = budget if budget is not None else RetryBudget(burst=5, ratio=0.05)
+        self.metrics = metrics if metrics is not None else HedgeMetrics()
+        # Threads of the executor free to take a request, shared by every hedger using it
+        self.slots = slots if slots is not None else threading.Semaphore(executor._max_workers)
+        self.__lock = threading.Lock()
+        self.__samples = deque(maxlen=sample_size)
+
+    def hedge_delay(self):
+        with self.__lock:
+            if len(self.__samples) < self.min_samples:
+                return None
+            samples = sorted(self.__samples)
+        index = min(int(len(samples) * self.percentile / 100), len(samples) - 1)
+        return min(max(samples[index], self.min_delay_seconds), self.max_delay_seconds)
+
+    def call(self, request):
+        self.metrics.requested()
+        self.budget.succeeded()
+        delay = self.hedge_delay()
+        if delay is None:
+            # Too few retrievals seen to know what slow looks like, so no thread is taken for it
+            return self.__timed(request)
+        primary = self.__submit(request)
+        if primary is None:
+            # Every thread is busy, most likely with a slow location, which must not hold up requests to the others
+            self.metrics.saturated()
+            return self.__timed(request)
+        done, _ = wait([primary], timeout=delay)
+        if len(done) > 0:
+            return self.__outcome(primary)
+        if not self.budget.try_retry():
+            # Many requests are slow, so the location itself is likely struggling and more requests would not help
+            self.metrics.budget_exhausted()
+            return self.__outcome(self.__wait_for(primary))
+        hedge = self.__submit(request)
+        if hedge is None:
+            self.metrics.saturated()
+            return self.__outcome(self.__wait_for(primary))
+        logger.debug('No response after %.3fs, sending a second request', delay)
+        self.metrics.hedged()
+        pending = {primary, hedge}
+        failed = None
+        while len(pending) > 0:
+            done, pending = self.__wait_for_first(pending)
+            for future in done:
+                if future.result()[1] is None:
+                    if future is hedge:
+                        self.metrics.hedge_won()
+                    # The response of the other is ignored, a request already sent cannot be called back
+                    for other in pending:
+                        other.cancel()
+                    return self.__outcome(future)
+                failed = future
+        return self.__outcome(failed)
+
+    def __wait_for(self, future):
+        self.__wait_for_first({future})
+        return future
+
+    def __wait_for_first(self, futures):
+        current = current_deadline()
+        done, pending = wait(futures, timeout=max(current.remaining(), 0) if current is not None else None, return_when=FIRST_COMPLETED)
+        if len(done) == 0:
+            for future in pending:
+                future.cancel()
+            raise deadline_exceeded(current)
+        return done, pending
+
+    def __outcome(self, future):
+        result, error, retry_after = future.result()
+        # Taken on the executor thread, so handed back for the caller's retry policy to see
+        restore_retry_after(retry_after)
+        if error is not None:
+            raise error
+        return result
+
+    def __submit(self, request):
+        if not self.slots.acquire(blocking=False):
+            return None
+        # Run with a copy of the caller's context, so the request deadline still applies
+        context = contextvars.copy_context()
+        try:
+            future = self.executor.submit(context.run, self.__timed_outcome, request)
+        except Exception:
+            self.slots.release()
+            raise
+        # Also called when cancelled before it started
+        future.add_done_callback(lambda f: self.slots.release())
+        return future
+
+    def __timed_outcome(self, request):
+        take_retry_after()
+        try:
+            result = self.__timed(request)
+        except Exception as e:
+            return None, e, take_retry_after()
+        return result, None, take_retry_after()
+
+    def __timed(self, request):
+        started_at = time.monotonic()
+        result = request()
+        with self.__lock:
+            self.__samples.append(time.monotonic() - started_at)
+        return result
+
+
+class HedgerRegistry():
+
+    def __init__(self, percentile=95, min_delay_seconds=0.02, max_delay_seconds=2, sample_size=200, min_samples=20, budget_burst=5, budget_ratio=0.05,
+                 max_threads=50, max_size=200):
+        self.percentile = percentile
+        self.min_delay_seconds = min_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.sample_size = sample_size
+        self.min_samples = min_samples
+        self.budget_burst = budget_burst
+        self.budget_ratio = budget_ratio
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='ovd-hedged-read')
+        self.slots = threading.Semaphore(max_threads)
+        self.metrics = HedgeMetrics()
+        self.__hedgers = LRUCache(max_size=max_size)
+        self.__lock = threading.Lock()
+
+    def get(self, fingerprint):
+        # Latency and budget are kept per location, as one slow or struggling location says nothing about the others
+        with self.__lock:
+            hedger = self.__hedgers.get(fingerprint)
+            if hedger is None:
+                hedger = Hedger(self.executor, percentile=self.percentile, min_delay_seconds=self.min_delay_seconds, max_delay_seconds=self.max_delay_seconds,
+                                sample_size=self.sample_size, min_samples=self.min_samples, budget=RetryBudget(burst=self.budget_burst, ratio=self.budget_ratio),
+                                metrics=self.metrics, slots=self.slots)
+                self.__hedgers.put(fingerprint, hedger)
+            return hedger
+
+    def stats(self):
+        return self.metrics.stats()
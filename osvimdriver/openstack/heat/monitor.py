@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+from ignition.service.config import ConfigurationProperties
+from osvimdriver.openstack.cache import LRUCache
+from osvimdriver.openstack.tasks import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+IN_PROGRESS_STATUS = 'IN_PROGRESS'
+
+
+class StackStatusMonitorProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = False
+        # how often (in seconds) the status of stacks with in-flight requests is refreshed
+        self.interval_seconds = 5
+        # polls are only answered from statuses refreshed within this many seconds, otherwise the stack is retrieved
+        self.max_age_seconds = 10
+        # stacks not polled for this many seconds are no longer refreshed
+        self.idle_timeout_seconds = 300
+        # maximum number of stacks refreshed for each deployment location
+        self.max_tracked_stacks = 10000
+        # number of stacks requested in each page of the stack list
+        self.page_size = 500
+
+
+class StackStatusMonitor():
+
+    def __init__(self, heat_driver, interval_seconds=5, max_age_seconds=10, idle_timeout_seconds=300, max_tracked_stacks=10000, page_size=500, name='ovd-stack-monitor'):
+        if heat_driver is None:
+            raise ValueError('heat_driver must be provided')
+        self.heat_driver = heat_driver
+        self.max_age_seconds = max_age_seconds
+        self.page_size = page_size
+        self.__tracked = LRUCache(max_size=max_tracked_stacks, ttl=idle_timeout_seconds)
+        self.__lock = threading.Lock()
+        self.__snapshot = {}
+        self.__refreshed_at = None
+        self.__refreshes = 0
+        self.__failures = 0
+        self.__task = PeriodicTask(name, interval_seconds, self.refresh)
+
+    def start(self):
+        self.__task.start()
+
+    def stop(self, timeout=None):
+        self.__task.stop(timeout)
+
+    def track(self, stack_id):
+        self.__tracked.put(stack_id, True)
+
+    def untrack(self, stack_id):
+        self.__tracked.remove(stack_id)
+        with self.__lock:
+            self.__snapshot.pop(stack_id, None)
+
+    def get(self, stack_id):
+        with self.__lock:
+            if self.__refreshed_at is None or time.monotonic() - self.__refreshed_at > self.max_age_seconds:
+                return None
+            stack = self.__snapshot.get(stack_id)
+        return dict(stack) if stack is not None else None
+
+    def refresh(self):
+        self.__tracked.expire()
+        tracked = set(self.__tracked.keys())
+        if len(tracked) == 0:
+            with self.__lock:
+                self.__snapshot = {}
+            return
+        started_at = time.monotonic()
+        try:
+            # Stacks which have left IN_PROGRESS are missing from the snapshot, so their final status is retrieved by the poll
+            stacks = self.heat_driver.get_stacks_by_status(IN_PROGRESS_STATUS, page_size=self.page_size)
+        except Exception as e:
+            logger.warning('Failed to refresh status of %s stacks: %s', len(tracked), str(e))
+            with self.__lock:
+                self.__failures += 1
+            return
+        snapshot = {stack.get('id'): stack for stack in stacks if stack.get('id') in tracked}
+        with self.__lock:
+            self.__snapshot = snapshot
+            self.__refreshed_at = started_at
+            self.__refreshes += 1
+        logger.debug('Refreshed status of %s stacks, %s still in progress', len(tracked), len(snapshot))
+
+    def stats(self):
+        tracked = len(self.__tracked.keys())
+        with self.__lock:
+            return {'tracked': tracked, 'in_progress': len(self.__snapshot), 'refreshes': self.__refreshes, 'failures': self.__failures}
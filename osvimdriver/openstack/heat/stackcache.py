@@ -0,0 +1,89 @@
+import copy
+import logging
+import threading
+from concurrent.futures import Future
+from ignition.service.config import ConfigurationProperties
+from osvimdriver.openstack.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUS_SUFFIXES = ('_COMPLETE', '_FAILED')
+
+
+def stack_action_matches(stack, actions):
+    if actions is None:
+        return True
+    stack_status = stack.get('stack_status')
+    return isinstance(stack_status, str) and stack_status.startswith(tuple(action + '_' for action in actions))
+
+
+class StackCacheProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        # maximum number of stacks held, the least recently used are evicted first
+        self.max_size = 1000
+        # stacks with an operation in progress are retrieved again after this many seconds
+        self.ttl_seconds = 1
+        # stacks in a complete or failed state are retrieved again after this many seconds
+        self.terminal_ttl_seconds = 10
+
+
+class StackCache():
+
+    def __init__(self, max_size=1000, ttl_seconds=1, terminal_ttl_seconds=10):
+        self.ttl_seconds = ttl_seconds
+        self.terminal_ttl_seconds = terminal_ttl_seconds
+        self.__stacks = LRUCache(max_size=max_size, ttl=ttl_seconds)
+        self.__lock = threading.Lock()
+        self.__in_flight = {}
+        self.__shared = 0
+        self.__stale = 0
+
+    def get(self, key, load, actions=None):
+        stack = self.__stacks.get(key)
+        if stack is not None and stack_action_matches(stack, actions):
+            return copy.deepcopy(stack)
+        if stack is not None:
+            # Another worker may have started a new operation on the stack since, which this worker's cache knows nothing of
+            self.__stale += 1
+        with self.__lock:
+            future = self.__in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.__in_flight[key] = future
+            else:
+                self.__shared += 1
+        if not leader:
+            # Identical lookup already in progress, so its response is shared rather than requested again
+            return copy.deepcopy(future.result())
+        try:
+            stack = load()
+            self.__stacks.put(key, stack, ttl=self.__ttl_for(stack))
+            future.set_result(stack)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.__lock:
+                self.__in_flight.pop(key, None)
+        return copy.deepcopy(stack)
+
+    def invalidate(self, fingerprint, stack_id):
+        for resolve_outputs in (True, False):
+            self.__stacks.remove((fingerprint, stack_id, resolve_outputs))
+
+    def __ttl_for(self, stack):
+        stack_status = stack.get('stack_status')
+        if isinstance(stack_status, str) and stack_status.endswith(TERMINAL_STATUS_SUFFIXES):
+            return self.terminal_ttl_seconds
+        return self.ttl_seconds
+
+    def stats(self):
+        stats = self.__stacks.stats()
+        with self.__lock:
+            stats['shared'] = self.__shared
+            stats['stale'] = self.__stale
+        return stats
@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from collections import deque
+from ignition.service.config import ConfigurationProperties
+from ignition.service.resourcedriver import TemporaryResourceDriverError
+from osvimdriver.openstack.deadline import remaining_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimitError(TemporaryResourceDriverError):
+    pass
+
+
+class ConcurrencyLimitProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        # maximum number of Heat and Neutron requests in flight to any one deployment location
+        self.max_per_location = 10
+        # maximum number of Heat and Neutron requests in flight across all deployment locations
+        self.max_total = 50
+        # requests queued for longer than this many seconds fail, to be tried again later
+        self.max_wait_seconds = 60
+        # share of the total each deployment location gets when requests are queued, by location name (locations not listed have a weight of 1)
+        self.weights = {}
+        # idle deployment locations are dropped from the statistics once more than this many are tracked
+        self.max_tracked_locations = 200
+
+
+class LocationQueue():
+
+    def __init__(self, name, weight):
+        self.name = name
+        self.weight = weight
+        self.waiters = deque()
+        self.in_flight = 0
+        self.virtual_time = 0
+        self.max_queue_depth = 0
+        self.waited = 0
+        self.total_wait_seconds = 0
+        self.longest_wait_seconds = 0
+        self.timeouts = 0
+
+    def stats(self):
+        return {'name': self.name, 'weight': self.weight, 'in_flight': self.in_flight, 'queued': len(self.waiters), 'max_queue_depth': self.max_queue_depth,
+                'waited': self.waited, 'average_wait_seconds': round(self.total_wait_seconds / self.waited, 3) if self.waited > 0 else 0,
+                'longest_wait_seconds': round(self.longest_wait_seconds, 3), 'timeouts': self.timeouts}
+
+
+class FairScheduler():
+
+    def __init__(self, max_per_location=10, max_total=50, max_wait_seconds=60, weights=None, max_tracked_locations=200):
+        self.max_per_location = max_per_location
+        self.max_total = max_total
+        self.max_wait_seconds = max_wait_seconds
+        self.weights = weights if weights is not None else {}
+        self.max_tracked_locations = max_tracked_locations
+        self.__lock = threading.Lock()
+        self.__queues = {}
+        self.__in_flight = 0
+        # Virtual time of the last request let through, so a location becoming busy starts level with the others rather than with credit
+        self.__virtual_clock = 0
+
+    def gate(self, key, name):
+        return LocationGate(self, key, name)
+
+    def acquire(self, key, name):
+        queued_at = time.monotonic()
+        with self.__lock:
+            queue = self.__queues.get(key)
+            if queue is None:
+                queue = LocationQueue(name, self.__weight_of(name))
+                self.__queues[key] = queue
+            if len(queue.waiters) == 0:
+                queue.virtual_time = max(queue.virtual_time, self.__virtual_clock)
+            waiter = {'event': threading.Event(), 'granted': False}
+            queue.waiters.append(waiter)
+            self.__dispatch()
+            if waiter['granted']:
+                return
+            queue.max_queue_depth = max(queue.max_queue_depth, len(queue.waiters))
+        wait_seconds = self.max_wait_seconds
+        remaining = remaining_seconds()
+        if remaining is not None:
+            # No point waiting for a turn the request has no time left to use
+            wait_seconds = max(min(wait_seconds, remaining), 0)
+        waiter['event'].wait(wait_seconds)
+        waited_for = time.monotonic() - queued_at
+        with self.__lock:
+            if not waiter['granted']:
+                queue.waiters.remove(waiter)
+                queue.timeouts += 1
+                self.__forget_if_idle(key, queue)
+                raise ConcurrencyLimitError('Deployment location {0} has too many requests in progress, waited {1:.1f}s for a turn'.format(name, waited_for))
+            queue.waited += 1
+            queue.total_wait_seconds += waited_for
+            queue.longest_wait_seconds = max(queue.longest_wait_seconds, waited_for)
+        logger.debug('Waited %.3fs for a turn to call deployment location %s', waited_for, name)
+
+    def release(self, key):
+        with self.__lock:
+            queue = self.__queues[key]
+            queue.in_flight -= 1
+            self.__in_flight -= 1
+            self.__dispatch()
+            self.__forget_if_idle(key, queue)
+
+    def __dispatch(self):
+        while self.__in_flight < self.max_total:
+            ready = [queue for queue in self.__queues.values() if len(queue.waiters) > 0 and queue.in_flight < self.max_per_location]
+            if len(ready) == 0:
+                return
+            # Weighted fair queuing: the location furthest behind its share goes next
+            queue = min(ready, key=lambda q: q.virtual_time)
+            waiter = queue.waiters.popleft()
+            self.__virtual_clock = queue.virtual_time
+            queue.virtual_time += 1 / queue.weight
+            queue.in_flight += 1
+            self.__in_flight += 1
+            waiter['granted'] = True
+            waiter['event'].set()
+
+    def __forget_if_idle(self, key, queue):
+        if queue.in_flight == 0 and len(queue.waiters) == 0 and len(self.__queues) > self.max_tracked_locations:
+            del self.__queues[key]
+
+    def __weight_of(self, name):
+        weight = self.weights.get(name, 1) if isinstance(self.weights, dict) else 1
+        return weight if isinstance(weight, (int, float)) and weight > 0 else 1
+
+    def stats(self):
+        with self.__lock:
+            return {'in_flight': self.__in_flight, 'queued': sum(len(queue.waiters) for queue in self.__queues.values()),
+                    'locations': [queue.stats() for queue in self.__queues.values()]}
+
+
+class LocationGate():
+
+    def __init__(self, scheduler, key, name):
+        self.scheduler = scheduler
+        self.key = key
+        self.name = name
+
+    def call(self, operation, request):
+        self.scheduler.acquire(self.key, self.name)
+        try:
+            return request()
+        finally:
+            self.scheduler.release(self.key)
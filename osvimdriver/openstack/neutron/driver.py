@@ -3,6 +3,7 @@ import uuid
 from neutronclient.v2_0 import client as neutronclient
 from neutronclient.common import exceptions as neutronexceptions
 from ignition.service.logging import logging_context
+from osvimdriver.openstack.calls import OpenstackCaller
 import osvimdriver.service.common as common
 
 logger = logging.getLogger(__name__)
@@ -11,13 +12,21 @@ LOG_URI_PREFIX = '...'
 
 class NeutronDriver():
 
-    def __init__(self, session):
+    def __init__(self, session, endpoint=None, retry_policy=None, circuit_breaker=None, concurrency_gate=None):
         self.__session = session
-        self.__neutron_client = neutronclient.Client(session=self.__session)
+        self.__caller = OpenstackCaller(retry_policy=retry_policy, circuit_breaker=circuit_breaker, concurrency_gate=concurrency_gate)
+        if endpoint is not None:
+            # Resolved up front, so requests skip the service catalog lookup
+            self.__neutron_client = neutronclient.Client(session=self.__session, endpoint_override=endpoint)
+        else:
+            self.__neutron_client = neutronclient.Client(session=self.__session)
 
     def __get_neutron_client(self):
         return self.__neutron_client
 
+    def __call(self, operation, request):
+        return self.__caller.call(operation, request)
+
     def get_network_by_id(self, network_id,driver_request_id=None):
         if network_id is None:
             raise ValueError('network_id must be provided')
@@ -27,7 +36,7 @@ class NeutronDriver():
             external_request_id = str(uuid.uuid4())
             common._generate_additional_logs('', 'sent', external_request_id, '',
                                        'request', 'http', {'method' : 'get', 'uri' : LOG_URI_PREFIX +'/networks/' + network_id }, driver_request_id)
-            result = neutron_client.show_network(network_id)
+            result = self.__call('get_network', lambda: neutron_client.show_network(network_id))
             common._generate_additional_logs(str(result), 'received', external_request_id, 'application/json',
                                        'response', 'http', {'status_code' : 200, 'status_reason_phrase' : 'ok'}, driver_request_id)  
             return result['network']
@@ -46,7 +55,7 @@ class NeutronDriver():
         common._generate_additional_logs('', 'sent', external_request_id, '',
                                        'request', 'http', {'method' : 'get', 'uri' : LOG_URI_PREFIX +'/networks' }, driver_request_id)
         try:
-            result = neutron_client.list_networks()
+            result = self.__call('list_networks', lambda: neutron_client.list_networks())
             common._generate_additional_logs(str(result), 'received', external_request_id, 'application/json',
                                        'response', 'http', {'status_code' : 200, 'status_reason_phrase' : 'ok'}, driver_request_id)
         except Exception as e:
@@ -74,7 +83,7 @@ class NeutronDriver():
             external_request_id = str(uuid.uuid4())
             common._generate_additional_logs('', 'sent', external_request_id, '',
                                        'request', 'http', {'method' : 'get', 'uri' : LOG_URI_PREFIX +'/subnets/' + subnet_id}, driver_request_id)
-            result = neutron_client.show_subnet(subnet_id)
+            result = self.__call('get_subnet', lambda: neutron_client.show_subnet(subnet_id))
             common._generate_additional_logs(str(result), 'received', external_request_id, 'application/json',
                                        'response', 'http', {'status_code' : 200, 'status_reason_phrase' : 'ok'}, driver_request_id)
             return result['subnet']
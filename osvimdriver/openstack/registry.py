@@ -0,0 +1,65 @@
+import hashlib
+import json
+import logging
+import threading
+from ignition.service.config import ConfigurationProperties
+from osvimdriver.openstack.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class LocationRegistryProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        self.max_size = 50
+        self.idle_timeout_seconds = 600
+
+
+def deployment_location_fingerprint(deployment_location):
+    deployment_location_str = json.dumps(deployment_location, sort_keys=True, default=str)
+    return hashlib.sha256(deployment_location_str.encode('utf-8')).hexdigest()
+
+
+class OpenstackLocationRegistry():
+
+    def __init__(self, max_size=50, idle_timeout_seconds=600):
+        self.__locations = LRUCache(max_size=max_size, ttl=idle_timeout_seconds, on_evict=self.__dispose)
+        self.__lock = threading.Lock()
+
+    def get_or_create(self, deployment_location, location_factory):
+        key = deployment_location_fingerprint(deployment_location)
+        # Held whilst expiring too, so the reaper cannot dispose of a location between it being found and acquired
+        with self.__lock:
+            self.__locations.expire()
+            location = self.__locations.get(key)
+            if location is not None:
+                self.__locations.touch(key)
+                location.acquire()
+                return location
+            location = location_factory(deployment_location)
+            location.shared = True
+            location.acquire()
+            logger.debug('Registering deployment location %s', location.name)
+            self.__locations.put(key, location)
+            return location
+
+    def expire(self):
+        with self.__lock:
+            return self.__locations.expire()
+
+    def clear(self):
+        with self.__lock:
+            self.__locations.clear()
+
+    def stats(self):
+        return self.__locations.stats()
+
+    def __dispose(self, key, location):
+        # Locations still in use by a request are only disposed of once they are closed
+        logger.debug('Disposing of idle deployment location %s', location.name)
+        try:
+            location.dispose()
+        except Exception as e:
+            logger.exception('Encountered an error whilst disposing of deployment location {0}: {1}'.format(location.name, str(e)))
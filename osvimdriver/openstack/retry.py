@@ -0,0 +1,223 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from keystoneauth1 import exceptions as keystoneexceptions
+from heatclient import exc as heatexc
+from neutronclient.common import exceptions as neutronexceptions
+from ignition.api.exceptions import ApiException
+from ignition.service.config import ConfigurationProperties
+from osvimdriver.openstack.cache import LRUCache
+from osvimdriver.openstack.deadline import remaining_seconds
+
+logger = logging.getLogger(__name__)
+
+# Overloaded or briefly unavailable, worth asking again
+RETRYABLE_STATUS_CODES = (429, 502, 503, 504)
+# Turned away before any work was done, so safe to send again even when the request is not idempotent
+REJECTED_STATUS_CODES = (429, 503)
+CONNECTION_ERRORS = (keystoneexceptions.ConnectionError, heatexc.CommunicationError, neutronexceptions.ConnectionFailed)
+
+# Retry-After of the last response received on each thread, captured by the DeadlineHTTPAdapter as the clients drop the headers
+_last_retry_after = threading.local()
+
+
+def note_retry_after(response):
+    retry_after = None
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+    _last_retry_after.seconds = retry_after
+
+
+def take_retry_after():
+    retry_after = getattr(_last_retry_after, 'seconds', None)
+    _last_retry_after.seconds = None
+    return retry_after
+
+
+def restore_retry_after(retry_after):
+    # Hands a Retry-After taken on another thread to this one
+    _last_retry_after.seconds = retry_after
+
+
+def parse_retry_after(value):
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+def status_code_of(error):
+    # Heat exceptions carry the status as code, Neutron exceptions as status_code and Keystone exceptions as http_status
+    for attribute in ('code', 'status_code', 'http_status'):
+        code = getattr(error, attribute, None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+class RetryProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        # total attempts made at each request, including the first
+        self.max_attempts = 3
+        # retries wait a random time up to base_delay_seconds, doubled on each attempt and capped at max_delay_seconds
+        self.base_delay_seconds = 0.5
+        self.max_delay_seconds = 10
+        # a Retry-After longer than this many seconds is not waited for, the error is raised instead
+        self.max_retry_after_seconds = 30
+        # retries each deployment location may make in a burst
+        self.budget_burst = 10
+        # fraction of a retry earned by each successful request, once the burst is spent
+        self.budget_ratio = 0.1
+
+
+class RetryBudget():
+
+    def __init__(self, burst=10, ratio=0.1):
+        self.burst = burst
+        self.ratio = ratio
+        self.__tokens = burst
+        self.__lock = threading.Lock()
+
+    def succeeded(self):
+        with self.__lock:
+            self.__tokens = min(self.__tokens + self.ratio, self.burst)
+
+    def try_retry(self):
+        with self.__lock:
+            if self.__tokens < 1:
+                return False
+            self.__tokens -= 1
+            return True
+
+
+class RetryBudgetRegistry():
+
+    def __init__(self, burst=10, ratio=0.1, max_size=200):
+        self.burst = burst
+        self.ratio = ratio
+        self.__budgets = LRUCache(max_size=max_size)
+        self.__lock = threading.Lock()
+
+    def get(self, fingerprint):
+        # Keyed by fingerprint, so every request to the same location (however often it is rebuilt) draws on one budget
+        with self.__lock:
+            budget = self.__budgets.get(fingerprint)
+            if budget is None:
+                budget = RetryBudget(burst=self.burst, ratio=self.ratio)
+                self.__budgets.put(fingerprint, budget)
+            return budget
+
+
+class RetryMetrics():
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__retries = 0
+        self.__recovered = 0
+        self.__exhausted = 0
+        self.__budget_exhausted = 0
+        self.__retry_after_waits = 0
+
+    def retried(self, honoured_retry_after):
+        with self.__lock:
+            self.__retries += 1
+            if honoured_retry_after:
+                self.__retry_after_waits += 1
+
+    def recovered(self):
+        with self.__lock:
+            self.__recovered += 1
+
+    def exhausted(self):
+        with self.__lock:
+            self.__exhausted += 1
+
+    def budget_exhausted(self):
+        with self.__lock:
+            self.__budget_exhausted += 1
+
+    def stats(self):
+        with self.__lock:
+            return {'retries': self.__retries, 'recovered': self.__recovered, 'exhausted': self.__exhausted,
+                    'budget_exhausted': self.__budget_exhausted, 'retry_after_waits': self.__retry_after_waits}
+
+
+class RetryPolicy():
+
+    def __init__(self, max_attempts=3, base_delay_seconds=0.5, max_delay_seconds=10, max_retry_after_seconds=30, budget=None, metrics=None):
+        self.max_attempts = max_attempts
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.max_retry_after_seconds = max_retry_after_seconds
+        self.budget = budget if budget is not None else RetryBudget()
+        self.metrics = metrics if metrics is not None else RetryMetrics()
+
+    def call(self, operation, request, idempotent=True):
+        attempt = 1
+        while True:
+            # Anything left over belongs to an earlier request on this thread
+            take_retry_after()
+            try:
+                result = request()
+            except Exception as e:
+                delay = self.__retry_delay(operation, e, attempt, idempotent)
+                if delay is None:
+                    raise
+                logger.warning('%s failed on attempt %s of %s, retrying in %.2fs: %s', operation, attempt, self.max_attempts, delay, str(e))
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.budget.succeeded()
+            if attempt > 1:
+                self.metrics.recovered()
+            return result
+
+    def __retry_delay(self, operation, error, attempt, idempotent):
+        if not self.__is_retryable(error, idempotent):
+            return None
+        if attempt >= self.max_attempts:
+            self.metrics.exhausted()
+            return None
+        retry_after = take_retry_after()
+        if retry_after is not None and retry_after > self.max_retry_after_seconds:
+            logger.debug('%s asked to retry after %.1fs, longer than the %ss allowed', operation, retry_after, self.max_retry_after_seconds)
+            return None
+        if retry_after is not None:
+            delay = retry_after
+        else:
+            delay = random.uniform(0, min(self.base_delay_seconds * (2 ** (attempt - 1)), self.max_delay_seconds))
+        remaining = remaining_seconds()
+        if remaining is not None and delay >= remaining:
+            logger.debug('%s is not retried, the request deadline is only %.1fs away', operation, remaining)
+            return None
+        if not self.budget.try_retry():
+            # Retrying everything whilst the location is struggling only adds to its load
+            logger.debug('Retry budget spent, %s is not retried', operation)
+            self.metrics.budget_exhausted()
+            return None
+        self.metrics.retried(retry_after is not None)
+        return delay
+
+    def __is_retryable(self, error, idempotent):
+        if isinstance(error, ApiException):
+            # Raised by the driver itself (e.g. an open circuit), not a response worth asking again for
+            return False
+        status_code = status_code_of(error)
+        if idempotent:
+            return isinstance(error, CONNECTION_ERRORS) or status_code in RETRYABLE_STATUS_CODES
+        # Lost connections and timeouts may have reached the server, so only a clear rejection is sent again
+        return status_code in REJECTED_STATUS_CODES
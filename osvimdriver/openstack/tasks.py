@@ -0,0 +1,41 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask():
+
+    def __init__(self, name, interval_seconds, task):
+        if interval_seconds is None or interval_seconds <= 0:
+            raise ValueError('interval_seconds must be greater than 0')
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.task = task
+        self.__stop_event = threading.Event()
+        self.__thread = None
+
+    def start(self):
+        if self.__thread is not None:
+            return
+        self.__thread = threading.Thread(target=self.__run, name=self.name, daemon=True)
+        self.__thread.start()
+
+    def stop(self, timeout=None):
+        self.__stop_event.set()
+        if self.__thread is not None:
+            self.__thread.join(timeout)
+
+    @property
+    def running(self):
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def run_once(self):
+        try:
+            self.task()
+        except Exception as e:
+            logger.exception('Encountered an error whilst running background task {0}: {1}'.format(self.name, str(e)))
+
+    def __run(self):
+        while not self.__stop_event.wait(self.interval_seconds):
+            self.run_once()
@@ -0,0 +1,108 @@
+import certifi
+import hashlib
+import json
+import logging
+import ssl
+import threading
+from ignition.service.config import ConfigurationProperties
+from osvimdriver.openstack.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class SSLContextCacheProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        # maximum number of distinct CA bundle/client certificate combinations held
+        self.max_size = 50
+
+
+def tls_fingerprint(ca_cert=None, client_cert=None, client_key=None):
+    tls_str = json.dumps({'ca_cert': ca_cert, 'client_cert': client_cert, 'client_key': client_key}, sort_keys=True)
+    return hashlib.sha256(tls_str.encode('utf-8')).hexdigest()
+
+
+class ResumableSSLSocket(ssl.SSLSocket):
+
+    def _real_close(self):
+        # TLS 1.3 session tickets only arrive after the handshake, so the session is kept once the connection is done with
+        if not self.server_side and isinstance(self.context, ResumableSSLContext):
+            try:
+                self.context.remember_session(self.server_hostname, self.session)
+            except (OSError, ValueError):
+                pass
+        super()._real_close()
+
+
+class ResumableSSLContext(ssl.SSLContext):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.sslsocket_class = ResumableSSLSocket
+        self.__sessions = {}
+        self.__sessions_lock = threading.Lock()
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True, suppress_ragged_eofs=True, server_hostname=None, session=None):
+        if session is None and not server_side:
+            with self.__sessions_lock:
+                session = self.__sessions.get(server_hostname)
+        try:
+            return super().wrap_socket(sock, server_side=server_side, do_handshake_on_connect=do_handshake_on_connect,
+                                       suppress_ragged_eofs=suppress_ragged_eofs, server_hostname=server_hostname, session=session)
+        except (ssl.SSLError, ValueError):
+            # A stale session must not stop the next connection from being made
+            self.forget_session(server_hostname)
+            raise
+
+    def remember_session(self, server_hostname, session):
+        if session is None or not session.has_ticket:
+            return
+        with self.__sessions_lock:
+            self.__sessions[server_hostname] = session
+
+    def forget_session(self, server_hostname):
+        with self.__sessions_lock:
+            self.__sessions.pop(server_hostname, None)
+
+    def session_count(self):
+        with self.__sessions_lock:
+            return len(self.__sessions)
+
+
+class SSLContextCache():
+
+    def __init__(self, max_size=50):
+        self.__contexts = LRUCache(max_size=max_size)
+        self.__lock = threading.Lock()
+
+    def get(self, ca_cert=None, client_cert_path=None, client_key_path=None, fingerprint=None):
+        if fingerprint is None:
+            raise ValueError('fingerprint must be provided')
+        with self.__lock:
+            context = self.__contexts.get(fingerprint)
+            if context is None:
+                context = self.__build_context(ca_cert, client_cert_path, client_key_path)
+                self.__contexts.put(fingerprint, context)
+            return context
+
+    def clear(self):
+        self.__contexts.clear()
+
+    def stats(self):
+        stats = self.__contexts.stats()
+        stats['sessions'] = sum([context.session_count() for context in self.__contexts.values()])
+        return stats
+
+    def __build_context(self, ca_cert, client_cert_path, client_key_path):
+        logger.debug('Building SSL context')
+        context = ResumableSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        if ca_cert is not None:
+            context.load_verify_locations(cadata=ca_cert)
+        else:
+            # The CA bundle requests verifies against when no CA certificate is given, rather than the system store
+            context.load_verify_locations(cafile=certifi.where())
+        if client_cert_path is not None:
+            context.load_cert_chain(client_cert_path, keyfile=client_key_path)
+        return context
@@ -0,0 +1,250 @@
+import contextlib
+import json
+import logging
+import threading
+import time
+from keystoneauth1.identity import v3 as keystonev3
+from ignition.service.config import ConfigurationProperties
+from osvimdriver.openstack.cache import LRUCache
+from osvimdriver.openstack.tokenstore import SharedTokenStoreProperties
+from osvimdriver.openstack.tasks import PeriodicTask
+from osvimdriver.openstack.deadline import current_deadline, deadline_exceeded
+
+logger = logging.getLogger(__name__)
+
+
+class TokenRefresherProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        # tokens are renewed once they are this close (in seconds) to expiring, should be greater than the expiry margin
+        self.refresh_margin_seconds = 300
+        self.interval_seconds = 30
+        # locations with no requests for this many seconds are no longer kept authenticated
+        self.idle_timeout_seconds = 600
+
+
+class TokenCacheProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        self.max_size = 100
+        self.expiry_margin_seconds = 120
+        self.shared_store = SharedTokenStoreProperties()
+        self.refresher = TokenRefresherProperties()
+
+
+class TokenCache():
+
+    def __init__(self, max_size=100, expiry_margin_seconds=120, shared_store=None):
+        self.expiry_margin_seconds = expiry_margin_seconds
+        self.shared_store = shared_store
+        self.__tokens = LRUCache(max_size=max_size, on_evict=self.__forget_expiry)
+        self.__lock = threading.Lock()
+        self.__expiries = {}
+        self.__flight_locks = {}
+        self.__active = {}
+
+    def get(self, fingerprint):
+        auth_state = self.__tokens.get(fingerprint)
+        if auth_state is not None or self.shared_store is None:
+            return auth_state
+        shared_token = self.__get_shared(fingerprint)
+        if shared_token is None:
+            return None
+        auth_state, expires_at = shared_token
+        if not self.__put_local(fingerprint, auth_state, expires_at):
+            return None
+        logger.debug('Reusing Keystone token for %s requested by another worker', fingerprint)
+        return auth_state
+
+    def put(self, fingerprint, auth_state, expires_at):
+        if not self.__put_local(fingerprint, auth_state, expires_at):
+            return
+        if self.shared_store is not None:
+            try:
+                self.shared_store.put(fingerprint, auth_state, expires_at)
+            except Exception as e:
+                logger.exception('Unable to share Keystone token for {0}: {1}'.format(fingerprint, str(e)))
+
+    def invalidate(self, fingerprint):
+        self.__tokens.remove(fingerprint)
+        self.__forget_expiry(fingerprint, None)
+        if self.shared_store is not None:
+            try:
+                self.shared_store.invalidate(fingerprint)
+            except Exception as e:
+                logger.exception('Unable to remove shared Keystone token for {0}: {1}'.format(fingerprint, str(e)))
+
+    def expires_at(self, fingerprint):
+        with self.__lock:
+            return self.__expiries.get(fingerprint)
+
+    @contextlib.contextmanager
+    def lock(self, fingerprint):
+        # Single flight: threads of this worker queue on the same lock, other workers on the shared store lock
+        with self.__lock:
+            flight_lock = self.__flight_locks.get(fingerprint)
+            if flight_lock is None:
+                flight_lock = threading.Lock()
+                self.__flight_locks[fingerprint] = flight_lock
+        current = current_deadline()
+        # Whoever holds the lock may be waiting on a hung Keystone, so requests wait no longer than their deadline allows
+        if not flight_lock.acquire(timeout=max(current.remaining(), 0) if current is not None else -1):
+            raise deadline_exceeded(current)
+        try:
+            if self.shared_store is None:
+                yield
+            else:
+                with self.shared_store.lock(fingerprint):
+                    yield
+        finally:
+            flight_lock.release()
+
+    def track(self, fingerprint, auth, session):
+        with self.__lock:
+            self.__active[fingerprint] = (auth, session, time.monotonic())
+
+    def active_auths(self, idle_timeout_seconds=None):
+        oldest_allowed = time.monotonic() - idle_timeout_seconds if idle_timeout_seconds is not None else None
+        with self.__lock:
+            if oldest_allowed is not None:
+                for fingerprint in [f for f, (_, _, last_used) in self.__active.items() if last_used < oldest_allowed]:
+                    del self.__active[fingerprint]
+            return [(fingerprint, auth, session) for fingerprint, (auth, session, _) in self.__active.items()]
+
+    def stats(self):
+        stats = self.__tokens.stats()
+        with self.__lock:
+            stats['active'] = len(self.__active)
+        if self.shared_store is not None:
+            try:
+                stats.update(self.shared_store.stats())
+            except Exception as e:
+                logger.exception('Unable to read shared token store statistics: {0}'.format(str(e)))
+        return stats
+
+    def __put_local(self, fingerprint, auth_state, expires_at):
+        # Tokens are only handed out until shortly before they expire, so in-flight requests never carry a stale token
+        ttl = expires_at - time.time() - self.expiry_margin_seconds
+        if ttl <= 0:
+            logger.debug('Not caching token for %s as it expires within %ss', fingerprint, self.expiry_margin_seconds)
+            return False
+        self.__tokens.put(fingerprint, auth_state, ttl=ttl)
+        with self.__lock:
+            self.__expiries[fingerprint] = expires_at
+        return True
+
+    def __forget_expiry(self, fingerprint, auth_state):
+        with self.__lock:
+            self.__expiries.pop(fingerprint, None)
+
+    def __get_shared(self, fingerprint):
+        # The shared store only saves authentication requests, so a worker carries on without it if it cannot be read
+        try:
+            return self.shared_store.get(fingerprint)
+        except Exception as e:
+            logger.exception('Unable to read shared Keystone token for {0}: {1}'.format(fingerprint, str(e)))
+            return None
+
+
+def serialize_auth_ref(auth_ref):
+    # Same format as keystoneauth's get_auth_state, so it can be restored with set_auth_state
+    return json.dumps({'auth_token': auth_ref.auth_token, 'body': auth_ref._data})
+
+
+class CachedPassword(keystonev3.Password):
+
+    def __init__(self, token_cache, fingerprint, **kwargs):
+        if token_cache is None:
+            raise ValueError('token_cache must be provided')
+        if fingerprint is None:
+            raise ValueError('fingerprint must be provided')
+        super().__init__(**kwargs)
+        self.token_cache = token_cache
+        self.fingerprint = fingerprint
+        self.MIN_TOKEN_LIFE_SECONDS = token_cache.expiry_margin_seconds
+
+    def get_access(self, session, **kwargs):
+        # Called on every request, whereas get_auth_ref is only called once per token, so this is where use is recorded
+        self.token_cache.track(self.fingerprint, self, session)
+        return super().get_access(session, **kwargs)
+
+    def get_auth_ref(self, session, **kwargs):
+        auth_state = self.token_cache.get(self.fingerprint)
+        if auth_state is not None:
+            logger.debug('Reusing cached Keystone token for %s', self.fingerprint)
+            self.set_auth_state(auth_state)
+            return self.auth_ref
+        with self.token_cache.lock(self.fingerprint):
+            # Another worker may have requested a token whilst this one waited for the lock
+            auth_state = self.token_cache.get(self.fingerprint)
+            if auth_state is not None:
+                logger.debug('Reusing cached Keystone token for %s', self.fingerprint)
+                self.set_auth_state(auth_state)
+                return self.auth_ref
+            logger.debug('Requesting new Keystone token for %s', self.fingerprint)
+            auth_ref = super().get_auth_ref(session, **kwargs)
+            if auth_ref.expires is not None:
+                self.token_cache.put(self.fingerprint, serialize_auth_ref(auth_ref), auth_ref.expires.timestamp())
+            return auth_ref
+
+    def refresh(self, session, refresh_margin_seconds):
+        with self.token_cache.lock(self.fingerprint):
+            # Skipped if another thread or worker has renewed the token since this refresh was scheduled
+            expires_at = self.token_cache.expires_at(self.fingerprint)
+            if expires_at is not None and expires_at - time.time() > refresh_margin_seconds:
+                return False
+            logger.debug('Refreshing Keystone token for %s ahead of expiry', self.fingerprint)
+            auth_ref = super().get_auth_ref(session)
+            if auth_ref.expires is not None:
+                self.token_cache.put(self.fingerprint, serialize_auth_ref(auth_ref), auth_ref.expires.timestamp())
+            return True
+
+    def invalidate(self):
+        # A 401 means the token was revoked, so no other location should be handed it either
+        self.token_cache.invalidate(self.fingerprint)
+        return super().invalidate()
+
+
+class TokenRefresher():
+
+    def __init__(self, token_cache, refresh_margin_seconds=300, interval_seconds=30, idle_timeout_seconds=600):
+        if token_cache is None:
+            raise ValueError('token_cache must be provided')
+        if refresh_margin_seconds <= token_cache.expiry_margin_seconds:
+            logger.warning('Token refresh margin of %ss is not greater than the expiry margin of %ss, requests may still wait on Keystone',
+                           refresh_margin_seconds, token_cache.expiry_margin_seconds)
+        self.token_cache = token_cache
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.refreshes = 0
+        self.failures = 0
+        self.__task = PeriodicTask('ovd-token-refresher', interval_seconds, self.refresh_due_tokens)
+
+    def start(self):
+        self.__task.start()
+
+    def stop(self, timeout=None):
+        self.__task.stop(timeout)
+
+    def refresh_due_tokens(self):
+        refreshed = 0
+        for fingerprint, auth, session in self.token_cache.active_auths(self.idle_timeout_seconds):
+            expires_at = self.token_cache.expires_at(fingerprint)
+            if expires_at is not None and expires_at - time.time() > self.refresh_margin_seconds:
+                continue
+            try:
+                if auth.refresh(session, self.refresh_margin_seconds):
+                    refreshed += 1
+            except Exception as e:
+                # Left for the next request to authenticate synchronously
+                self.failures += 1
+                logger.exception('Failed to refresh Keystone token for {0}: {1}'.format(fingerprint, str(e)))
+        self.refreshes += refreshed
+        return refreshed
+
+    def stats(self):
+        return {'refreshes': self.refreshes, 'failures': self.failures}
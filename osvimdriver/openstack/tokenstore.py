@@ -0,0 +1,122 @@
+import contextlib
+import fcntl
+import logging
+import os
+import sqlite3
+import time
+from cryptography.fernet import Fernet, InvalidToken
+from ignition.service.config import ConfigurationProperties
+from osvimdriver.openstack.deadline import current_deadline, deadline_exceeded
+
+logger = logging.getLogger(__name__)
+
+LOCK_POLL_SECONDS = 0.05
+
+
+class SharedTokenStoreProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = False
+        # SQLite database shared by all workers on the pod
+        self.path = '/var/ovd/tokens.db'
+        # environment variable holding the Fernet key used to encrypt tokens at rest
+        self.key_env = 'OVD_TOKEN_STORE_KEY'
+        # or a file holding it (e.g. a mounted secret), which must not be in the same directory as the database
+        self.key_file = None
+
+
+class SharedTokenStore():
+
+    def __init__(self, path, key=None, key_file=None, timeout_seconds=5):
+        if path is None:
+            raise ValueError('path must be provided')
+        if key is None and key_file is None:
+            raise ValueError('key or key_file must be provided')
+        # A key kept alongside the tokens would leave them readable by anyone able to read the database
+        if key is None and os.path.dirname(os.path.realpath(key_file)) == os.path.dirname(os.path.realpath(path)):
+            raise ValueError('key_file must not be in the same directory as the token store')
+        self.path = path
+        self.key_file = key_file
+        self.timeout_seconds = timeout_seconds
+        self.lock_directory = path + '.locks'
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        os.makedirs(self.lock_directory, mode=0o700, exist_ok=True)
+        self.__fernet = Fernet(key if key is not None else self.__read_key())
+        self.__create_table()
+
+    def get(self, fingerprint):
+        with self.__connect() as connection:
+            row = connection.execute('SELECT token, expires_at FROM tokens WHERE fingerprint = ?', (fingerprint,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        try:
+            auth_state = self.__fernet.decrypt(row[0]).decode('utf-8')
+        except InvalidToken:
+            # Written with another key, so useless to this worker
+            logger.warning('Unable to decrypt shared token for %s, ignoring it', fingerprint)
+            return None
+        return (auth_state, row[1])
+
+    def put(self, fingerprint, auth_state, expires_at):
+        token = self.__fernet.encrypt(auth_state.encode('utf-8'))
+        with self.__connect() as connection:
+            connection.execute('INSERT OR REPLACE INTO tokens (fingerprint, token, expires_at) VALUES (?, ?, ?)', (fingerprint, token, expires_at))
+            connection.execute('DELETE FROM tokens WHERE expires_at <= ?', (time.time(),))
+
+    def invalidate(self, fingerprint):
+        with self.__connect() as connection:
+            connection.execute('DELETE FROM tokens WHERE fingerprint = ?', (fingerprint,))
+
+    @contextlib.contextmanager
+    def lock(self, fingerprint):
+        # Held whilst requesting a token, so only one worker authenticates with a location at a time
+        lock_path = os.path.join(self.lock_directory, fingerprint + '.lock')
+        fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            self.__flock(fd)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def __flock(self, fd):
+        current = current_deadline()
+        if current is None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            return
+        # Another worker may be stuck authenticating, so this one waits no longer than its request allows
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                remaining = current.remaining()
+                if remaining <= 0:
+                    raise deadline_exceeded(current)
+                time.sleep(min(LOCK_POLL_SECONDS, remaining))
+
+    def stats(self):
+        with self.__connect() as connection:
+            row = connection.execute('SELECT COUNT(*) FROM tokens WHERE expires_at > ?', (time.time(),)).fetchone()
+        return {'shared_tokens': row[0]}
+
+    @contextlib.contextmanager
+    def __connect(self):
+        connection = sqlite3.connect(self.path, timeout=self.timeout_seconds)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def __create_table(self):
+        with self.__connect() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS tokens (fingerprint TEXT PRIMARY KEY, token BLOB NOT NULL, expires_at REAL NOT NULL)')
+        os.chmod(self.path, 0o600)
+
+    def __read_key(self):
+        with open(self.key_file, 'rb') as f:
+            return f.read().strip()
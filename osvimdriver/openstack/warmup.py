@@ -0,0 +1,100 @@
+import logging
+import queue
+import threading
+import time
+from ignition.service.config import ConfigurationPropertiesGroup
+from osvimdriver.openstack.deadline import deadline
+
+logger = logging.getLogger(__name__)
+
+
+class LocationWarmupProperties(ConfigurationPropertiesGroup):
+
+    def __init__(self):
+        super().__init__('location_warmup')
+        self.enabled = True
+        # warming each location gives up after this many seconds
+        self.deadline_seconds = 20
+        self.max_workers = 4
+        self.service_types = ['orchestration', 'network']
+        self.interface = 'public'
+        # deployment locations to warm, each with a name and properties (as they are sent on requests)
+        self.locations = []
+
+
+class LocationWarmer():
+
+    def __init__(self, location_translator, warmup_properties):
+        if location_translator is None:
+            raise ValueError('location_translator must be provided')
+        if warmup_properties is None:
+            raise ValueError('warmup_properties must be provided')
+        self.location_translator = location_translator
+        self.warmup_properties = warmup_properties
+
+    def start(self):
+        locations = self.warmup_properties.locations or []
+        if not self.warmup_properties.enabled or len(locations) == 0:
+            return None
+        # Never holds up startup, the worker would otherwise be killed by gunicorn's timeout whilst a location is slow to answer
+        thread = threading.Thread(target=self.warm, name='ovd-location-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def warm(self):
+        locations = self.warmup_properties.locations or []
+        if not self.warmup_properties.enabled or len(locations) == 0:
+            return {}
+        logger.info('Warming %s deployment locations', len(locations))
+        start = time.monotonic()
+        pending = queue.Queue()
+        for deployment_location in locations:
+            pending.put(deployment_location)
+        results = {}
+        results_lock = threading.Lock()
+
+        def work():
+            while True:
+                try:
+                    deployment_location = pending.get_nowait()
+                except queue.Empty:
+                    return
+                warmed = self.warm_location(deployment_location)
+                with results_lock:
+                    results[deployment_location.get('name')] = warmed
+        # Daemon threads, so a location that is still warming cannot hold up the process exiting
+        workers = [threading.Thread(target=work, name='ovd-warmup-{0}'.format(i), daemon=True) for i in range(min(self.warmup_properties.max_workers, len(locations)))]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        logger.info('Warmed %s of %s deployment locations in %.1fs', len([r for r in results.values() if r]), len(locations), time.monotonic() - start)
+        return results
+
+    def warm_location(self, deployment_location):
+        name = deployment_location.get('name')
+        openstack_location = None
+        try:
+            # Bounds the HTTP timeouts of every call, so a location that never answers is given up on
+            with deadline('warmup', self.warmup_properties.deadline_seconds):
+                openstack_location = self.location_translator.from_deployment_location(deployment_location)
+                session = openstack_location.get_session()
+                # Without auth there is no service catalog to look endpoints up in
+                if session.auth is not None:
+                    session.get_token()
+                    for service_type in self.warmup_properties.service_types:
+                        # Resolved through the endpoint cache (when enabled), so the first requests find it primed
+                        endpoint = openstack_location.get_endpoint(service_type, session=session)
+                        if endpoint is None:
+                            endpoint = session.get_endpoint(service_type=service_type, interface=self.warmup_properties.interface)
+                        if endpoint is not None:
+                            # Any response will do, the request is only made to open a pooled connection
+                            session.get(endpoint, raise_exc=False)
+            logger.debug('Warmed deployment location %s', name)
+            return True
+        except Exception as e:
+            logger.warning('Failed to warm deployment location {0}: {1}'.format(name, str(e)))
+            return False
+        finally:
+            if openstack_location is not None:
+                openstack_location.close()
@@ -47,15 +47,16 @@ class OpenstackAdminApiConfigurator():
 
 class OpenstackAdminServiceConfigurator():
 
-    def __init__(self):
-        pass
+    def __init__(self, location_translator=None):
+        self.location_translator = location_translator
 
     def configure(self, configuration, service_register):
         admin_properties = configuration.property_groups.get_property_group(OpenstackAdminProperties)
         if admin_properties.enabled is True:
             logger.debug('Configuring Openstack Admin Services')
             service_register.add_service(ServiceRegistration(OpenstackAdminApiService, service=OpenstackAdminCapability))
-            service_register.add_service(ServiceRegistration(OpenstackAdminService, OpenstackDeploymentLocationTranslator()))
+            location_translator = self.location_translator if self.location_translator is not None else OpenstackDeploymentLocationTranslator()
+            service_register.add_service(ServiceRegistration(OpenstackAdminService, location_translator))
         else:
             logger.debug('Disabled: Openstack Admin Services')
 
@@ -66,6 +67,14 @@ class OpenstackAdminApiCapability(Capability):
     def ping(self, **kwarg):
         pass
 
+    @interface
+    def stats(self, **kwarg):
+        pass
+
+    @interface
+    def circuit_breakers(self, **kwarg):
+        pass
+
 
 class OpenstackAdminCapability(Capability):
 
@@ -73,6 +82,14 @@ class OpenstackAdminCapability(Capability):
     def ping(self, deployment_location):
         pass
 
+    @interface
+    def stats(self):
+        pass
+
+    @interface
+    def circuit_breakers(self):
+        pass
+
 
 class OpenstackAdminApiService(Service, OpenstackAdminApiCapability, BaseController):
 
@@ -88,6 +105,12 @@ class OpenstackAdminApiService(Service, OpenstackAdminApiCapability, BaseControl
         response = {'success': ping_response.success, 'description': ping_response.description}
         return (response, 200)
 
+    def stats(self, **kwarg):
+        return (self.service.stats(), 200)
+
+    def circuit_breakers(self, **kwarg):
+        return ({'circuitBreakers': self.service.circuit_breakers()}, 200)
+
 
 class OpenstackAdminService(Service, OpenstackAdminCapability):
 
@@ -96,8 +119,8 @@ class OpenstackAdminService(Service, OpenstackAdminCapability):
 
     def ping(self, deployment_location):
         openstack_location = self.location_translator.from_deployment_location(deployment_location)
-        heat_driver = openstack_location.heat_driver
         try:
+            heat_driver = openstack_location.heat_driver
             list_of_stacks = heat_driver.get_stacks()
             for stack in list_of_stacks:
                 # Yield first response to force connection
@@ -105,6 +128,14 @@ class OpenstackAdminService(Service, OpenstackAdminCapability):
             return PingResponse(True, 'Reached Heat client successfully')
         except Exception as e:
             return PingResponse(False, str(e))
+        finally:
+            openstack_location.close()
+
+    def stats(self):
+        return self.location_translator.stats()
+
+    def circuit_breakers(self):
+        return self.location_translator.circuit_breakers()
 
 
 class PingResponse:
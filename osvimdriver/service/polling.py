@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import statistics
+import threading
+import time
+import yaml
+from collections import deque
+from datetime import datetime, timezone
+from ignition.service.config import ConfigurationProperties
+from osvimdriver.openstack.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def count_resources(heat_template):
+    try:
+        resources = yaml.safe_load(heat_template).get('resources')
+    except Exception:
+        return None
+    return len(resources) if isinstance(resources, dict) else None
+
+
+class PollHintProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        # bounds (in seconds) of the delay before checking the stack of an in progress request again
+        self.min_seconds = 2
+        self.max_seconds = 60
+        # expected time (in seconds) to create each resource of a template which has not been seen to complete before
+        self.seconds_per_resource = 10
+        # number of completion times kept for each template
+        self.history_size = 20
+
+
+class SettleWindowProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        # polls of a stack created by this driver are answered with IN_PROGRESS, without checking Heat, for this many seconds
+        self.base_seconds = 2
+        # plus this many seconds for each resource in the template
+        self.seconds_per_resource = 0.5
+        self.max_seconds = 30
+
+
+class SettleWindow():
+
+    def __init__(self, base_seconds=2, seconds_per_resource=0.5, max_seconds=30, max_stacks=10000):
+        self.base_seconds = base_seconds
+        self.seconds_per_resource = seconds_per_resource
+        self.max_seconds = max_seconds
+        # stack id -> when the window closes
+        self.__settling = LRUCache(max_size=max_stacks)
+
+    def stack_created(self, stack_id, heat_template):
+        resource_count = count_resources(heat_template) or 0
+        window = min(self.base_seconds + resource_count * self.seconds_per_resource, self.max_seconds)
+        if window > 0:
+            self.__settling.put(stack_id, time.monotonic() + window, ttl=window)
+
+    def remaining(self, stack_id):
+        closes_at = self.__settling.get(stack_id)
+        if closes_at is None:
+            return 0
+        return max(closes_at - time.monotonic(), 0)
+
+
+class PollIntervalAdvisor():
+
+    def __init__(self, min_seconds=2, max_seconds=60, seconds_per_resource=10, history_size=20, max_templates=500, max_stacks=10000):
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.seconds_per_resource = seconds_per_resource
+        self.history_size = history_size
+        self.__lock = threading.Lock()
+        # template hash -> recent completion times (in seconds)
+        self.__durations = LRUCache(max_size=max_templates)
+        # stack id -> (template hash, resource count), for stacks created by this driver
+        self.__stacks = LRUCache(max_size=max_stacks)
+        # request id -> when it was first polled, for requests with no start time on the stack (deletes)
+        self.__first_polled = LRUCache(max_size=max_stacks)
+        # request id -> when its stack is next worth checking
+        self.__next_checks = LRUCache(max_size=max_stacks)
+
+    def stack_created(self, stack_id, heat_template):
+        template_hash = hashlib.sha256(heat_template.encode('utf-8')).hexdigest()
+        self.__stacks.put(stack_id, (template_hash, count_resources(heat_template)))
+
+    def stack_completed(self, stack_id, stack):
+        created = self.__stacks.remove(stack_id)
+        elapsed = self.__elapsed_since(stack.get('creation_time'))
+        if created is None or elapsed is None:
+            return
+        with self.__lock:
+            durations = self.__durations.get(created[0])
+            if durations is None:
+                durations = deque(maxlen=self.history_size)
+                self.__durations.put(created[0], durations)
+            durations.append(elapsed)
+
+    def advise(self, request_id, stack_id, stack, use_creation_time=True):
+        elapsed = self.__elapsed_since(stack.get('creation_time')) if use_creation_time else None
+        if elapsed is None:
+            first_polled = self.__first_polled.get(request_id)
+            if first_polled is None:
+                first_polled = time.time()
+                self.__first_polled.put(request_id, first_polled)
+            elapsed = time.time() - first_polled
+        expected = self.__expected_duration(stack_id) if use_creation_time else None
+        if expected is not None and expected > elapsed:
+            # Half way to the expected completion, so an early finish is not missed by much
+            delay = (expected - elapsed) / 2
+        else:
+            # No idea (or already overdue), so back off the longer it has been running
+            delay = elapsed / 10
+        delay = round(min(max(delay, self.min_seconds), self.max_seconds), 1)
+        self.__next_checks.put(request_id, time.monotonic() + delay, ttl=delay)
+        return delay
+
+    def remaining(self, request_id):
+        next_check = self.__next_checks.get(request_id)
+        if next_check is None:
+            return 0
+        return max(next_check - time.monotonic(), 0)
+
+    def forget(self, request_id):
+        self.__first_polled.remove(request_id)
+        self.__next_checks.remove(request_id)
+
+    def __expected_duration(self, stack_id):
+        created = self.__stacks.get(stack_id)
+        if created is None:
+            return None
+        template_hash, resource_count = created
+        with self.__lock:
+            durations = self.__durations.get(template_hash)
+            if durations is not None and len(durations) > 0:
+                return statistics.median(durations)
+        if resource_count is not None:
+            return resource_count * self.seconds_per_resource
+        return None
+
+    def __elapsed_since(self, timestamp):
+        if not isinstance(timestamp, str):
+            return None
+        try:
+            started = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if started.tzinfo is None:
+            # Heat reports times in UTC
+            started = started.replace(tzinfo=timezone.utc)
+        return max((datetime.now(timezone.utc) - started).total_seconds(), 0)
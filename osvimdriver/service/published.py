@@ -0,0 +1,85 @@
+import contextlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from ignition.service.config import ConfigurationProperties
+from osvimdriver.openstack.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+SENDER_WATCHER = 'watcher'
+SENDER_MONITOR = 'monitor'
+
+
+class SharedPublishedExecutionsProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        # SQLite database shared by all workers on the pod
+        self.path = '/var/ovd/published.db'
+
+
+class LocalPublishedExecutions():
+
+    def __init__(self, max_size=10000, ttl_seconds=86400):
+        self.__senders = LRUCache(max_size=max_size, ttl=ttl_seconds)
+        self.__lock = threading.Lock()
+
+    def claim(self, request_id, sender):
+        with self.__lock:
+            if self.__senders.get(request_id) is not None:
+                return False
+            self.__senders.put(request_id, sender)
+            return True
+
+    def release(self, request_id):
+        self.__senders.remove(request_id)
+
+    def sender_of(self, request_id):
+        return self.__senders.get(request_id)
+
+
+class SharedPublishedExecutions():
+
+    def __init__(self, path, ttl_seconds=86400, timeout_seconds=5):
+        if path is None:
+            raise ValueError('path must be provided')
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.__create_table()
+
+    def claim(self, request_id, sender):
+        now = time.time()
+        with self.__connect() as connection:
+            connection.execute('DELETE FROM published WHERE published_at <= ?', (now - self.ttl_seconds,))
+            # Only one worker can insert the row, so only one sends the execution
+            cursor = connection.execute('INSERT OR IGNORE INTO published (request_id, sender, published_at) VALUES (?, ?, ?)', (request_id, sender, now))
+            return cursor.rowcount == 1
+
+    def release(self, request_id):
+        with self.__connect() as connection:
+            connection.execute('DELETE FROM published WHERE request_id = ?', (request_id,))
+
+    def sender_of(self, request_id):
+        with self.__connect() as connection:
+            row = connection.execute('SELECT sender FROM published WHERE request_id = ? AND published_at > ?', (request_id, time.time() - self.ttl_seconds)).fetchone()
+        return row[0] if row is not None else None
+
+    @contextlib.contextmanager
+    def __connect(self):
+        connection = sqlite3.connect(self.path, timeout=self.timeout_seconds)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def __create_table(self):
+        with self.__connect() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS published (request_id TEXT PRIMARY KEY, sender TEXT NOT NULL, published_at REAL NOT NULL)')
+        os.chmod(self.path, 0o600)
@@ -2,15 +2,23 @@ from uuid import uuid4
 import logging
 import re
 import os
+import contextlib
 from ignition.service.framework import Service, Capability, interface
-from ignition.service.config import ConfigurationPropertiesGroup
-from ignition.service.resourcedriver import ResourceDriverHandlerCapability, InfrastructureNotFoundError, InvalidDriverFilesError, ResourceDriverError, InvalidRequestError
+from ignition.service.config import ConfigurationPropertiesGroup, ConfigurationProperties
+from ignition.service.resourcedriver import ResourceDriverHandlerCapability, InfrastructureNotFoundError, InvalidDriverFilesError, ResourceDriverError, InvalidRequestError, RequestNotFoundError
 from ignition.model.references import FindReferenceResponse, FindReferenceResult
 from ignition.model.associated_topology import AssociatedTopology
 from ignition.model.lifecycle import LifecycleExecuteResponse, LifecycleExecution, STATUS_IN_PROGRESS, STATUS_COMPLETE, STATUS_FAILED, STATUS_UNKNOWN
 from ignition.model.failure import FailureDetails, FAILURE_CODE_INFRASTRUCTURE_ERROR
 from osvimdriver.service.tosca import ToscaValidationError, NotDiscoveredError
 from osvimdriver.openstack.heat.driver import StackNotFoundError
+from osvimdriver.openstack.heat.stackcache import stack_action_matches
+from osvimdriver.openstack.cache import LRUCache
+from osvimdriver.openstack.deadline import deadline
+from osvimdriver.service.polling import PollIntervalAdvisor, PollHintProperties, SettleWindow, SettleWindowProperties
+from osvimdriver.service.watcher import StackWatcherProperties
+from osvimdriver.service.tenancy import current_tenant_id
+from osvimdriver.service.published import SENDER_WATCHER, SENDER_MONITOR
 from ignition.utils.propvaluemap import PropValueMap
 
 logger = logging.getLogger(__name__)
@@ -38,6 +46,18 @@ CREATE_REQUEST_PREFIX = 'Create'
 DELETE_REQUEST_PREFIX = 'Delete'
 ADOPT_REQUEST_PREFIX = 'Adopt'
 
+# Stack actions which show the operation of each type of request, so a stack recalled from before the operation started is not mistaken for its outcome
+REQUEST_STACK_ACTIONS = {
+    CREATE_REQUEST_PREFIX: ('CREATE', 'ADOPT'),
+    DELETE_REQUEST_PREFIX: ('DELETE',)
+}
+
+
+class ExecutionAlreadySentError(RequestNotFoundError):
+    # Raised to Ignition's lifecycle execution monitor for a request the stack watcher has already sent. A RequestNotFoundError is the only
+    # error on which the monitor stops without sending anything, so this extends it
+    pass
+
 STACK_RESOURCE_TYPE = 'Openstack'
 STACK_NAME = 'InfrastructureStack'
 
@@ -49,11 +69,41 @@ def build_request_id(request_type, stack_id):
         request_id += str(uuid4())
         return request_id
 
+class ExecutionCacheProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        # maximum number of complete or failed executions held, the least recently used are evicted first
+        self.max_size = 10000
+        self.ttl_seconds = 3600
+
+class RequestDeadlineProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = True
+        # time (in seconds) allowed for all Openstack calls made by each type of request, including retries and time queued for a turn
+        self.create_seconds = 120
+        self.adopt_seconds = 60
+        self.delete_seconds = 60
+        self.poll_seconds = 30
+        self.find_reference_seconds = 60
+        # maximum time (in seconds) to wait for a connection to Keystone, Heat or Neutron
+        self.connect_timeout_seconds = 10
+
 class AdditionalResourceDriverProperties(ConfigurationPropertiesGroup, Service, Capability):
 
     def __init__(self):
         super().__init__('resource_driver')
         self.keep_files = False
+        # add the stack name to request ids, only once every pod understands the 4 part id (older pods reject it)
+        self.request_id_stack_name = False
+        self.execution_cache = ExecutionCacheProperties()
+        self.poll_hints = PollHintProperties()
+        self.stack_watcher = StackWatcherProperties()
+        self.settle_window = SettleWindowProperties()
+        self.deadlines = RequestDeadlineProperties()
 
 class AdoptProperties(ConfigurationPropertiesGroup, Service, Capability):
 
@@ -86,7 +136,7 @@ class PropertiesMerger:
 
 class ResourceDriverHandler(Service, ResourceDriverHandlerCapability):
 
-    def __init__(self, location_translator, **kwargs):
+    def __init__(self, location_translator, stack_watcher=None, **kwargs):
         if 'heat_translator_service' not in kwargs:
             raise ValueError('heat_translator_service argument not provided')
         self.heat_translator = kwargs.get('heat_translator_service')
@@ -102,19 +152,49 @@ class ResourceDriverHandler(Service, ResourceDriverHandlerCapability):
         self.resource_driver_config = kwargs.get('resource_driver_config')
         
         self.location_translator = location_translator
+        self.stack_watcher = stack_watcher
         self.stack_name_creator = StackNameCreator()
         self.props_merger = PropertiesMerger()
+        self.request_id_stack_name = getattr(self.resource_driver_config, 'request_id_stack_name', False) is True
+        self.completed_executions = None
+        execution_cache_properties = getattr(self.resource_driver_config, 'execution_cache', None)
+        if execution_cache_properties is not None and execution_cache_properties.enabled:
+            # Complete and failed executions never change, so late or duplicate polls are answered without going to Openstack
+            self.completed_executions = LRUCache(max_size=execution_cache_properties.max_size, ttl=execution_cache_properties.ttl_seconds)
+        self.settle_window = None
+        settle_window_properties = getattr(self.resource_driver_config, 'settle_window', None)
+        if settle_window_properties is not None and settle_window_properties.enabled:
+            self.settle_window = SettleWindow(base_seconds=settle_window_properties.base_seconds, seconds_per_resource=settle_window_properties.seconds_per_resource,
+                                              max_seconds=settle_window_properties.max_seconds)
+        self.deadlines = None
+        deadline_properties = getattr(self.resource_driver_config, 'deadlines', None)
+        if deadline_properties is not None and deadline_properties.enabled:
+            self.deadlines = deadline_properties
+        self.poll_advisor = None
+        poll_hint_properties = getattr(self.resource_driver_config, 'poll_hints', None)
+        if poll_hint_properties is not None and poll_hint_properties.enabled:
+            self.poll_advisor = PollIntervalAdvisor(min_seconds=poll_hint_properties.min_seconds, max_seconds=poll_hint_properties.max_seconds,
+                                                    seconds_per_resource=poll_hint_properties.seconds_per_resource, history_size=poll_hint_properties.history_size)
     
+    def __deadline(self, request_type):
+        if self.deadlines is None:
+            return contextlib.nullcontext()
+        return deadline(request_type, getattr(self.deadlines, '{0}_seconds'.format(request_type), None), connect_timeout_seconds=self.deadlines.connect_timeout_seconds)
+
     def execute_lifecycle(self, lifecycle_name, driver_files, system_properties, resource_properties, request_properties, associated_topology, deployment_location):
+        with self.__deadline(lifecycle_name.lower()):
+            return self.__execute_lifecycle(lifecycle_name, driver_files, system_properties, resource_properties, request_properties, associated_topology, deployment_location)
+
+    def __execute_lifecycle(self, lifecycle_name, driver_files, system_properties, resource_properties, request_properties, associated_topology, deployment_location):
         openstack_location = None
         try:
             openstack_location = self.location_translator.from_deployment_location(deployment_location)
             if lifecycle_name.upper() == 'CREATE':
-                return self.__handle_create(driver_files, system_properties, resource_properties, request_properties, associated_topology, openstack_location)
+                return self.__watch(self.__handle_create(driver_files, system_properties, resource_properties, request_properties, associated_topology, openstack_location), deployment_location)
             elif lifecycle_name.upper() == 'ADOPT':
                 return self.__handle_adopt(driver_files, system_properties, resource_properties, request_properties, associated_topology, openstack_location)
             elif lifecycle_name.upper() == 'DELETE':
-                return self.__handle_delete(driver_files, system_properties, resource_properties, request_properties, associated_topology, openstack_location)
+                return self.__watch(self.__handle_delete(driver_files, system_properties, resource_properties, request_properties, associated_topology, openstack_location), deployment_location)
             else:
                 raise InvalidRequestError(f'Openstack driver only supports Create, Adopt and Delete transitions, not {lifecycle_name}')
         finally:
@@ -127,6 +207,14 @@ class ResourceDriverHandler(Service, ResourceDriverHandlerCapability):
             if openstack_location != None:
                 openstack_location.close()
 
+    def __watch(self, execute_response, deployment_location):
+        # Creates of an existing stack have no request to watch
+        if self.stack_watcher is not None and execute_response.request_id is not None:
+            request_type, stack_id, operation_id, stack_name = self.__split_request_id(execute_response.request_id)
+            self.stack_watcher.watch(execute_response.request_id, deployment_location, stack_id, stack_name=stack_name, operation=request_type.upper(),
+                                     tenant_id=current_tenant_id())
+        return execute_response
+
     def __handle_create(self, driver_files, system_properties, resource_properties, request_properties, associated_topology, openstack_location):
         heat_driver = openstack_location.heat_driver
         stack_id = None
@@ -173,6 +261,13 @@ class ResourceDriverHandler(Service, ResourceDriverHandlerCapability):
             else:
                 stack_name = 's' + str(uuid4())       
             stack_id,request_id = heat_driver.create_stack(stack_name, heat_template, heat_inputs, **kwargs)
+            if self.request_id_stack_name:
+                # Optional fourth part, so the stack can be retrieved from its canonical URL
+                request_id += REQUEST_ID_SEPARATOR + stack_name
+            if self.poll_advisor is not None:
+                self.poll_advisor.stack_created(stack_id, heat_template)
+            if self.settle_window is not None:
+                self.settle_window.stack_created(stack_id, heat_template)
         associated_topology = self.__build_associated_topology_response(stack_id)
         return LifecycleExecuteResponse(request_id, associated_topology=associated_topology)
 
@@ -203,6 +298,9 @@ class ResourceDriverHandler(Service, ResourceDriverHandlerCapability):
         else:
             # There is no Stack associated to this Resource raise error
             raise InvalidRequestError("You must supply the stack_id in associated_topology")   
+        stack_name = stack_to_adopt.get('stack_name', None)
+        if self.request_id_stack_name and isinstance(stack_name, str):
+            request_id += REQUEST_ID_SEPARATOR + stack_name
         # get the status and check it's ok 
         stack_status = stack_to_adopt.get('stack_status', None)
         if stack_status in [OS_STACK_STATUS_DELETE_COMPLETE, OS_STACK_STATUS_DELETE_IN_PROGRESS]:
@@ -231,6 +329,10 @@ class ResourceDriverHandler(Service, ResourceDriverHandlerCapability):
         return LifecycleExecuteResponse(request_id)
 
     def find_reference(self, instance_name, driver_files, deployment_location):
+        with self.__deadline('find_reference'):
+            return self.__find_reference(instance_name, driver_files, deployment_location)
+
+    def __find_reference(self, instance_name, driver_files, deployment_location):
         openstack_location = None
         try:
             openstack_location = self.location_translator.from_deployment_location(deployment_location)
@@ -260,12 +362,14 @@ class ResourceDriverHandler(Service, ResourceDriverHandlerCapability):
 
     def __split_request_id(self, request_id):
         split_parts = request_id.split(REQUEST_ID_SEPARATOR)
-        if len(split_parts) != 3:
+        # Request ids issued before the stack name was included only have 3 parts
+        if len(split_parts) not in [3, 4]:
             raise InvalidRequestError(f'request_id is not valid: {request_id}')
         request_type = split_parts[0]
         stack_id = split_parts[1]
         operation_id = split_parts[2]
-        return (request_type, stack_id, operation_id)
+        stack_name = split_parts[3] if len(split_parts) == 4 else None
+        return (request_type, stack_id, operation_id, stack_name)
 
     def __build_associated_topology_response(self, stack_id):
         associated_topology = AssociatedTopology()
@@ -325,23 +429,96 @@ class ResourceDriverHandler(Service, ResourceDriverHandlerCapability):
         return files
 
     def get_lifecycle_execution(self, request_id, deployment_location):
-        openstack_location = self.location_translator.from_deployment_location(deployment_location)
-        heat_driver = openstack_location.heat_driver
-        request_type, stack_id, operation_id = self.__split_request_id(request_id)
+        # Polled by Ignition's lifecycle execution monitor, which sends the execution once it is complete or failed. Never waits for
+        # the stack to change, as that would hold up the monitor's other jobs: the stack watcher sends executions as stacks finish
+        if self.stack_watcher is not None and self.stack_watcher.sent_by(request_id) == SENDER_WATCHER:
+            raise ExecutionAlreadySentError('Lifecycle execution for request {0} has already been sent'.format(request_id))
+        execution = self.check_lifecycle_execution(request_id, deployment_location)
+        if self.stack_watcher is not None and execution.status in [STATUS_COMPLETE, STATUS_FAILED]:
+            # Claimed so the stack watcher (in any worker) does not send it as well. Claimed by the monitor already when an earlier send failed
+            if not self.stack_watcher.claim(request_id, SENDER_MONITOR) and self.stack_watcher.sent_by(request_id) == SENDER_WATCHER:
+                raise ExecutionAlreadySentError('Lifecycle execution for request {0} has already been sent'.format(request_id))
+        return execution
+
+    def check_lifecycle_execution(self, request_id, deployment_location):
+        if self.completed_executions is None:
+            with self.__deadline('poll'):
+                return self.__get_lifecycle_execution(request_id, deployment_location)
+        execution = self.completed_executions.get(request_id)
+        if execution is not None:
+            logger.debug('Returning previously completed execution for request %s', request_id)
+            return execution
+        with self.__deadline('poll'):
+            execution = self.__get_lifecycle_execution(request_id, deployment_location)
+        if execution.status in [STATUS_COMPLETE, STATUS_FAILED]:
+            self.completed_executions.put(request_id, execution)
+        return execution
+
+    def __get_lifecycle_execution(self, request_id, deployment_location):
+        request_type, stack_id, operation_id, stack_name = self.__split_request_id(request_id)
+        remaining = self.__remaining_before_check(request_type, request_id, stack_id)
+        if remaining > 0:
+            logger.debug('Request %s is in progress, not checking stack %s again for another %.1fs', request_id, stack_id, remaining)
+            return LifecycleExecution(request_id, STATUS_IN_PROGRESS)
+        openstack_location = None
         try:
-            stack = heat_driver.get_stack(stack_id, request_id)            
-        except StackNotFoundError as e:
-            logger.debug('Stack not found: %s', stack_id)
-            if request_type == DELETE_REQUEST_PREFIX:
-                logger.debug('Stack not found on delete request, returning task as successful: %s', stack_id)
-                return LifecycleExecution(request_id, STATUS_COMPLETE)
-            else:
-                raise InfrastructureNotFoundError(str(e)) from e
-        logger.debug('Retrieved stack: %s', stack)
-        return self.__build_execution_response(stack, request_id)
+            openstack_location = self.location_translator.from_deployment_location(deployment_location)
+            heat_driver = openstack_location.heat_driver
+            stack_status_monitor = openstack_location.stack_status_monitor
+            expected_actions = REQUEST_STACK_ACTIONS.get(request_type)
+            stack = stack_status_monitor.get(stack_id) if stack_status_monitor is not None else None
+            if stack is not None and not stack_action_matches(stack, expected_actions):
+                stack = None
+            try:
+                if stack is None:
+                    stack = heat_driver.get_stack(stack_id, request_id, resolve_outputs=False, stack_name=stack_name, expected_actions=expected_actions)
+                logger.debug('Retrieved stack: %s', stack)
+                execution = self.__build_execution_response(stack, request_id, heat_driver=heat_driver)
+            except StackNotFoundError as e:
+                logger.debug('Stack not found: %s', stack_id)
+                if stack_status_monitor is not None:
+                    stack_status_monitor.untrack(stack_id)
+                if request_type == DELETE_REQUEST_PREFIX:
+                    logger.debug('Stack not found on delete request, returning task as successful: %s', stack_id)
+                    return LifecycleExecution(request_id, STATUS_COMPLETE)
+                else:
+                    raise InfrastructureNotFoundError(str(e)) from e
+            if self.poll_advisor is not None:
+                self.__advise_next_check(execution, request_type, stack_id, stack)
+            if stack_status_monitor is not None:
+                # Refreshed in the background until it finishes, so later polls are answered from the monitor's snapshot
+                if execution.status == STATUS_IN_PROGRESS:
+                    stack_status_monitor.track(stack_id)
+                else:
+                    stack_status_monitor.untrack(stack_id)
+            return execution
+        finally:
+            if openstack_location != None:
+                openstack_location.close()
 
-    def __build_execution_response(self, stack, request_id):
-        request_type, stack_id, operation_id = self.__split_request_id(request_id)
+    def __remaining_before_check(self, request_type, request_id, stack_id):
+        remaining = 0
+        if self.settle_window is not None and request_type == CREATE_REQUEST_PREFIX:
+            # Created moments ago by this driver, so certain to still be in progress
+            remaining = self.settle_window.remaining(stack_id)
+        if self.poll_advisor is not None:
+            # Polled again sooner than the stack is likely to have changed
+            remaining = max(remaining, self.poll_advisor.remaining(request_id))
+        return remaining
+
+    def __advise_next_check(self, execution, request_type, stack_id, stack):
+        if execution.status == STATUS_IN_PROGRESS:
+            # Heat records when a stack was created, but not when a delete started
+            use_creation_time = request_type != DELETE_REQUEST_PREFIX
+            delay = self.poll_advisor.advise(execution.request_id, stack_id, stack, use_creation_time=use_creation_time)
+            logger.debug('Request %s is in progress, checking stack %s again in no less than %ss', execution.request_id, stack_id, delay)
+            return
+        self.poll_advisor.forget(execution.request_id)
+        if execution.status == STATUS_COMPLETE and request_type == CREATE_REQUEST_PREFIX:
+            self.poll_advisor.stack_completed(stack_id, stack)
+
+    def __build_execution_response(self, stack, request_id, heat_driver=None):
+        request_type, stack_id, operation_id, stack_name = self.__split_request_id(request_id)
         stack_status = stack.get('stack_status', None)
         failure_details = None
         if request_type == CREATE_REQUEST_PREFIX:
@@ -359,6 +536,9 @@ class ResourceDriverHandler(Service, ResourceDriverHandlerCapability):
         outputs = None
         associated_topology = None
         if request_type == CREATE_REQUEST_PREFIX or request_type == ADOPT_REQUEST_PREFIX:
+            if status == STATUS_COMPLETE and heat_driver is not None and 'outputs' not in stack:
+                # Polled without outputs whilst in progress, so they are only resolved once the stack is complete
+                stack = heat_driver.get_stack(stack_id, request_id, stack_name=stack_name)
             outputs_from_stack = stack.get('outputs', [])
             outputs = self.__translate_outputs_to_values_dict(outputs_from_stack)                               
         return LifecycleExecution(request_id, status, failure_details=failure_details, outputs=outputs)
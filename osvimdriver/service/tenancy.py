@@ -0,0 +1,62 @@
+import contextlib
+import contextvars
+import logging
+from ignition.boot.config import BootProperties
+from ignition.service.framework import ServiceRegistration
+from ignition.service.requestqueue import LifecycleRequestQueueCapability
+from ignition.service.resourcedriver import (ResourceDriverProperties, ResourceDriverService, ResourceDriverServiceCapability, ResourceDriverHandlerCapability,
+                                             LifecycleExecutionMonitoringCapability, LifecycleMessagingCapability, DriverFilesManagerCapability)
+from ignition.boot.configurators.utils import validate_no_service_with_capability_exists
+
+logger = logging.getLogger(__name__)
+
+# Tenant of the lifecycle request being handled, as Ignition only passes it to its own services and never to the handler
+_current_tenant_id = contextvars.ContextVar('ovd_tenant_id', default=None)
+
+
+@contextlib.contextmanager
+def tenant_context(tenant_id):
+    token = _current_tenant_id.set(tenant_id)
+    try:
+        yield tenant_id
+    finally:
+        _current_tenant_id.reset(token)
+
+
+def current_tenant_id():
+    return _current_tenant_id.get()
+
+
+class TenantResourceDriverService(ResourceDriverService):
+
+    def execute_lifecycle(self, lifecycle_name, driver_files, system_properties, resource_properties, request_properties, associated_topology, deployment_location, tenant_id):
+        # Ignition hands the tenant to this service rather than the handler. Requests taken from the lifecycle request queue carry their
+        # tenant_id, so whatever handles them sets it with tenant_context in the same way
+        with tenant_context(tenant_id):
+            return super().execute_lifecycle(lifecycle_name, driver_files, system_properties, resource_properties, request_properties, associated_topology,
+                                             deployment_location, tenant_id)
+
+
+def disable_bootstrapped_resource_driver_service(app_builder):
+    # Replaced by the TenantResourceDriverService, registered by the TenantResourceDriverServiceConfigurator
+    app_builder.property_groups.get_property_group(BootProperties).resource_driver.service_enabled = False
+
+
+class TenantResourceDriverServiceConfigurator():
+
+    def configure(self, configuration, service_register):
+        logger.debug('Configuring Tenant Resource Driver Service')
+        validate_no_service_with_capability_exists(service_register, ResourceDriverServiceCapability, 'Resource Driver Service', 'bootstrap.resource_driver.service_enabled')
+        resource_driver_config = configuration.property_groups.get_property_group(ResourceDriverProperties)
+        # Same capabilities as the Resource Driver Service bootstrapped by Ignition
+        required_capabilities = {}
+        if resource_driver_config.async_messaging_enabled is True:
+            required_capabilities['lifecycle_monitor_service'] = LifecycleExecutionMonitoringCapability
+        else:
+            required_capabilities['lifecycle_messaging_service'] = LifecycleMessagingCapability
+        required_capabilities['handler'] = ResourceDriverHandlerCapability
+        required_capabilities['resource_driver_config'] = ResourceDriverProperties
+        required_capabilities['driver_files_manager'] = DriverFilesManagerCapability
+        if resource_driver_config.lifecycle_request_queue.enabled is True:
+            required_capabilities['lifecycle_request_queue'] = LifecycleRequestQueueCapability
+        service_register.add_service(ServiceRegistration(TenantResourceDriverService, **required_capabilities))
@@ -0,0 +1,225 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from ignition.boot.config import BootProperties
+from ignition.service.config import ConfigurationProperties
+from ignition.service.framework import Service, Capability, ServiceRegistration
+from ignition.service.resourcedriver import ResourceDriverError, TemporaryResourceDriverError, ResourceDriverHandlerCapability, LifecycleMessagingCapability
+from ignition.model.lifecycle import STATUS_COMPLETE, STATUS_FAILED
+from osvimdriver.openstack.cache import LRUCache
+from osvimdriver.openstack.tasks import PeriodicTask
+from osvimdriver.openstack.heat.driver import StackNotFoundError
+from osvimdriver.service.published import SharedPublishedExecutionsProperties, SharedPublishedExecutions, LocalPublishedExecutions, SENDER_WATCHER
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUS_SUFFIXES = ('_COMPLETE', '_FAILED')
+# Events stamped this long before the watch started are still accepted, in case the Heat clock is behind
+EVENT_CLOCK_SKEW_SECONDS = 30
+
+
+def parse_event_time(event_time):
+    if not isinstance(event_time, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(event_time.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    # Heat reports times in UTC, with or without an offset
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+class StackWatcherProperties(ConfigurationProperties):
+
+    def __init__(self):
+        super().__init__()
+        self.enabled = False
+        # how often (in seconds) watched stacks are checked for new events
+        self.interval_seconds = 5
+        # maximum number of stacks watched at once, the least recently created are dropped first
+        self.max_watched_stacks = 10000
+        # stacks which have not finished after this many seconds are no longer watched
+        self.timeout_seconds = 86400
+        # record of the requests already sent, shared by all workers so only one of them sends each request
+        self.shared_store = SharedPublishedExecutionsProperties()
+
+
+class StackWatcher():
+
+    def __init__(self, location_translator, watcher_properties=None):
+        if location_translator is None:
+            raise ValueError('location_translator must be provided')
+        self.location_translator = location_translator
+        # Only read on start, as the properties are populated once the application configuration has been read
+        self.watcher_properties = watcher_properties if watcher_properties is not None else StackWatcherProperties()
+        self.handler = None
+        self.lifecycle_messaging_service = None
+        self.__watches = None
+        self.__published_requests = None
+        self.__task = None
+        self.__published = 0
+
+    def start(self, handler, lifecycle_messaging_service):
+        if handler is None:
+            raise ValueError('handler must be provided')
+        if lifecycle_messaging_service is None:
+            raise ValueError('lifecycle_messaging_service must be provided')
+        if self.__task is not None:
+            return
+        self.handler = handler
+        self.lifecycle_messaging_service = lifecycle_messaging_service
+        self.__watches = LRUCache(max_size=self.watcher_properties.max_watched_stacks, ttl=self.watcher_properties.timeout_seconds)
+        # Requests already sent, so the handler can stop Ignition's own monitoring from sending them again
+        self.__published_requests = self.__build_published_executions()
+        self.__task = PeriodicTask('ovd-stack-watcher', self.watcher_properties.interval_seconds, self.check)
+        self.__task.start()
+
+    def stop(self):
+        if self.__task is not None:
+            self.__task.stop()
+
+    @property
+    def running(self):
+        return self.__task is not None
+
+    def watch(self, request_id, deployment_location, stack_id, stack_name=None, operation=None, tenant_id=None):
+        if not self.running:
+            return
+        self.__watches.put(request_id, {'deployment_location': deployment_location, 'stack_id': stack_id, 'stack_name': stack_name, 'marker': None,
+                                        'operation': operation, 'tenant_id': tenant_id, 'started_at': datetime.now(timezone.utc)})
+
+    def unwatch(self, request_id):
+        if self.running:
+            self.__watches.remove(request_id)
+
+    def __build_published_executions(self):
+        shared_store_properties = self.watcher_properties.shared_store
+        if shared_store_properties is not None and shared_store_properties.enabled:
+            try:
+                return SharedPublishedExecutions(shared_store_properties.path, ttl_seconds=self.watcher_properties.timeout_seconds)
+            except Exception as e:
+                logger.warning('Unable to open shared record of sent requests at {0}, other workers may send requests a second time: {1}'.format(shared_store_properties.path, str(e)))
+        return LocalPublishedExecutions(max_size=self.watcher_properties.max_watched_stacks, ttl_seconds=self.watcher_properties.timeout_seconds)
+
+    def sent_by(self, request_id):
+        if not self.running:
+            return None
+        return self.__published_requests.sender_of(request_id)
+
+    def claim(self, request_id, sender):
+        # Only the first claim of a request succeeds, in any worker, and that claimant alone sends it
+        if not self.running:
+            return True
+        return self.__published_requests.claim(request_id, sender)
+
+    def check(self):
+        self.__watches.expire()
+        for request_id in self.__watches.keys():
+            watch = self.__watches.get(request_id)
+            if watch is not None:
+                try:
+                    self.check_request(request_id, watch)
+                except Exception as e:
+                    logger.warning('Failed to check stack events for request {0}: {1}'.format(request_id, str(e)))
+
+    def check_request(self, request_id, watch):
+        if watch.get('finished'):
+            # Seen to finish before the handler reported it (e.g. from a cached stack), so only the result is checked again
+            self.__publish(request_id, watch)
+            return
+        stack_id = watch['stack_id']
+        finished = False
+        openstack_location = self.location_translator.from_deployment_location(watch['deployment_location'])
+        try:
+            # Only events after the marker are returned, so each check costs the same however long the stack has been running
+            events = openstack_location.heat_driver.get_stack_events(stack_id, marker=watch['marker'], stack_name=watch['stack_name'])
+            if len(events) > 0:
+                watch['marker'] = events[-1].get('id')
+            for event in events:
+                if self.__is_finish_event(event, watch):
+                    finished = True
+        except StackNotFoundError:
+            # Gone, so the handler decides what that means for the request
+            finished = True
+        finally:
+            openstack_location.close()
+        if finished:
+            watch['finished'] = True
+            self.__publish(request_id, watch)
+
+    def __is_finish_event(self, event, watch):
+        resource_status = event.get('resource_status')
+        if event.get('physical_resource_id') != watch['stack_id'] or not isinstance(resource_status, str) or not resource_status.endswith(TERMINAL_STATUS_SUFFIXES):
+            return False
+        # The first page of events may end with one from an earlier operation on the stack, e.g. the CREATE_COMPLETE of a stack now being deleted
+        if watch.get('operation') is not None and not resource_status.startswith(watch['operation'] + '_'):
+            return False
+        event_time = parse_event_time(event.get('event_time'))
+        if event_time is not None and event_time < watch['started_at'] - timedelta(seconds=EVENT_CLOCK_SKEW_SECONDS):
+            return False
+        return True
+
+    def __publish(self, request_id, watch):
+        try:
+            execution = self.handler.check_lifecycle_execution(request_id, watch['deployment_location'])
+        except TemporaryResourceDriverError as e:
+            logger.debug('Unable to determine result of request %s at this time, it will be checked again: %s', request_id, str(e))
+            return
+        except ResourceDriverError as e:
+            # Left to the lifecycle execution monitor to report
+            logger.warning('Unable to determine result of request {0}, it will no longer be watched: {1}'.format(request_id, str(e)))
+            self.unwatch(request_id)
+            return
+        if execution.status not in [STATUS_COMPLETE, STATUS_FAILED]:
+            return
+        if not self.claim(request_id, SENDER_WATCHER):
+            logger.debug('Lifecycle execution for request %s has already been sent', request_id)
+            self.unwatch(request_id)
+            return
+        logger.debug('Stack for request %s has finished, sending %s lifecycle execution', request_id, execution.status)
+        try:
+            self.lifecycle_messaging_service.send_lifecycle_execution(execution, tenant_id=watch.get('tenant_id'))
+        except Exception:
+            # Still left to the lifecycle execution monitor to send
+            self.__published_requests.release(request_id)
+            raise
+        self.unwatch(request_id)
+        self.__published += 1
+
+    def stats(self):
+        if not self.running:
+            return {'watched': 0, 'published': 0}
+        return {'watched': len(self.__watches.keys()), 'published': self.__published}
+
+
+class StackWatcherCapability(Capability):
+    pass
+
+
+class StackWatcherService(Service, StackWatcherCapability):
+
+    def __init__(self, stack_watcher, **kwargs):
+        if 'handler' not in kwargs:
+            raise ValueError('handler argument not provided')
+        if 'lifecycle_messaging_service' not in kwargs:
+            raise ValueError('lifecycle_messaging_service argument not provided')
+        self.stack_watcher = stack_watcher
+        # Started here, as the handler and messaging service only exist once the application has been configured
+        self.stack_watcher.start(kwargs.get('handler'), kwargs.get('lifecycle_messaging_service'))
+
+
+class StackWatcherServiceConfigurator():
+
+    def __init__(self, stack_watcher):
+        self.stack_watcher = stack_watcher
+
+    def configure(self, configuration, service_register):
+        if not self.stack_watcher.watcher_properties.enabled:
+            logger.debug('Disabled: Stack Watcher Service')
+            return
+        boot_properties = configuration.property_groups.get_property_group(BootProperties)
+        if not boot_properties.resource_driver.lifecycle_messaging_service_enabled:
+            logger.warning('Stack Watcher Service is enabled but the lifecycle messaging service is not, so it will not be started')
+            return
+        logger.debug('Configuring Stack Watcher Service')
+        service_register.add_service(ServiceRegistration(StackWatcherService, self.stack_watcher, handler=ResourceDriverHandlerCapability,
+                                                         lifecycle_messaging_service=LifecycleMessagingCapability))
@@ -27,7 +27,9 @@ setup(
         'python-novaclient>=13.0.0,<14.0.0',
         'tosca-parser @ git+https://github.com/IBM/tosca-parser.git@accanto',
         'heat-translator @ git+https://github.com/IBM/heat-translator.git@accanto-nfv',
-        'gunicorn==20.1.0'
+        'gunicorn==20.1.0',
+        'cryptography>=3.2',
+        'certifi'
     ],
     entry_points='''
         [console_scripts]
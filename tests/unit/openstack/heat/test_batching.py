@@ -0,0 +1,156 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from osvimdriver.openstack.deadline import deadline, DeadlineExceededError
+from osvimdriver.openstack.heat.batching import StackStatusBatcher
+
+
+class TestStackStatusBatcher(unittest.TestCase):
+
+    def __list_stacks(self, stack_ids):
+        return [{'id': stack_id, 'stack_status': 'CREATE_IN_PROGRESS'} for stack_id in stack_ids if stack_id != 'missing']
+
+    def __fetch(self, stack_id):
+        return {'id': stack_id, 'stack_status': 'FETCHED'}
+
+    def __get_concurrently(self, batcher, stack_ids):
+        # A lookup in progress on its own, so the others have something to batch alongside
+        fetch_started = threading.Event()
+        release_fetch = threading.Event()
+        def slow_fetch():
+            fetch_started.set()
+            release_fetch.wait(5)
+            return self.__fetch('busy')
+        busy_thread = threading.Thread(target=batcher.get, args=('busy', slow_fetch))
+        busy_thread.start()
+        fetch_started.wait(5)
+        results = {}
+        def get(stack_id):
+            results[stack_id] = batcher.get(stack_id, lambda: self.__fetch(stack_id))
+        threads = [threading.Thread(target=get, args=(stack_id,)) for stack_id in stack_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        release_fetch.set()
+        busy_thread.join(5)
+        return results
+
+    def test_init_without_list_stacks_fails(self):
+        with self.assertRaises(ValueError) as context:
+            StackStatusBatcher(None)
+        self.assertEqual(str(context.exception), 'list_stacks must be provided')
+
+    def test_lone_lookup_fetched_without_waiting(self):
+        list_stacks = MagicMock(side_effect=self.__list_stacks)
+        batcher = StackStatusBatcher(list_stacks, window_seconds=1)
+        started_at = time.monotonic()
+        for _ in range(5):
+            self.assertEqual(batcher.get('1', lambda: self.__fetch('1')), {'id': '1', 'stack_status': 'FETCHED'})
+        self.assertLess(time.monotonic() - started_at, 0.5)
+        list_stacks.assert_not_called()
+        self.assertEqual(batcher.stats(), {'lookups': 5, 'fetched': 5, 'batches': 0, 'requests': 0})
+
+    def test_lone_lookup_fetch_error_raised(self):
+        batcher = StackStatusBatcher(self.__list_stacks, window_seconds=0)
+        with self.assertRaises(ValueError):
+            batcher.get('1', MagicMock(side_effect=ValueError('Not found')))
+        # No longer counted as in progress, so the next lookup is not held up either
+        self.assertEqual(batcher.get('2', lambda: self.__fetch('2'))['stack_status'], 'FETCHED')
+
+    def test_missing_stack_fetched(self):
+        batcher = StackStatusBatcher(self.__list_stacks, window_seconds=0.05)
+        results = self.__get_concurrently(batcher, ['1', 'missing'])
+        self.assertEqual(results['1']['stack_status'], 'CREATE_IN_PROGRESS')
+        self.assertEqual(results['missing']['stack_status'], 'FETCHED')
+
+    def test_list_error_fetches_each_stack(self):
+        list_stacks = MagicMock(side_effect=Exception('Service Unavailable'))
+        batcher = StackStatusBatcher(list_stacks, window_seconds=0.05)
+        results = self.__get_concurrently(batcher, ['1', '2'])
+        self.assertEqual(results['1']['stack_status'], 'FETCHED')
+        self.assertEqual(results['2']['stack_status'], 'FETCHED')
+
+    def test_concurrent_lookups_share_request(self):
+        list_stacks = MagicMock(side_effect=self.__list_stacks)
+        batcher = StackStatusBatcher(list_stacks, window_seconds=1, max_batch_size=5)
+        results = self.__get_concurrently(batcher, ['1', '2', '3', '4', '5'])
+        self.assertEqual(len(results), 5)
+        for stack_id, stack in results.items():
+            self.assertEqual(stack['id'], stack_id)
+            self.assertEqual(stack['stack_status'], 'CREATE_IN_PROGRESS')
+        list_stacks.assert_called_once()
+        self.assertEqual(sorted(list_stacks.call_args[0][0]), ['1', '2', '3', '4', '5'])
+        self.assertEqual(batcher.stats(), {'lookups': 6, 'fetched': 1, 'batches': 1, 'requests': 1})
+
+    def test_concurrent_lookups_of_same_stack_are_requested_once(self):
+        list_stacks = MagicMock(side_effect=self.__list_stacks)
+        batcher = StackStatusBatcher(list_stacks, window_seconds=0.2)
+        fetch_started = threading.Event()
+        release_fetch = threading.Event()
+        def slow_fetch():
+            fetch_started.set()
+            release_fetch.wait(5)
+        busy_thread = threading.Thread(target=batcher.get, args=('busy', slow_fetch))
+        busy_thread.start()
+        fetch_started.wait(5)
+        barrier = threading.Barrier(3)
+        results = []
+        def get():
+            barrier.wait()
+            results.append(batcher.get('1', lambda: self.__fetch('1')))
+        threads = [threading.Thread(target=get) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        release_fetch.set()
+        busy_thread.join(5)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(batcher.stats()['batches'], 1)
+        list_stacks.assert_called_once_with(['1'])
+
+    def test_batch_larger_than_max_batch_size_is_split(self):
+        list_stacks = MagicMock(side_effect=self.__list_stacks)
+        batcher = StackStatusBatcher(list_stacks, window_seconds=0.2, max_batch_size=2)
+        results = self.__get_concurrently(batcher, ['1', '2', '3', '4'])
+        self.assertEqual(len(results), 4)
+        for call in list_stacks.call_args_list:
+            self.assertLessEqual(len(call[0][0]), 2)
+
+    def test_lookup_waiting_on_batch_limited_by_deadline(self):
+        release_list = threading.Event()
+        def slow_list_stacks(stack_ids):
+            release_list.wait(5)
+            return self.__list_stacks(stack_ids)
+        batcher = StackStatusBatcher(slow_list_stacks, window_seconds=0.1)
+        fetch_started = threading.Event()
+        release_fetch = threading.Event()
+        def slow_fetch():
+            fetch_started.set()
+            release_fetch.wait(5)
+        busy_thread = threading.Thread(target=batcher.get, args=('busy', slow_fetch))
+        busy_thread.start()
+        fetch_started.wait(5)
+        leader_thread = threading.Thread(target=batcher.get, args=('1', lambda: self.__fetch('1')))
+        leader_thread.start()
+        # Collecting the batch the next lookup joins
+        time.sleep(0.02)
+        errors = []
+        def get_with_deadline():
+            with deadline('poll', 0.2):
+                try:
+                    batcher.get('2', lambda: self.__fetch('2'))
+                except DeadlineExceededError as e:
+                    errors.append(e)
+        started_at = time.monotonic()
+        follower_thread = threading.Thread(target=get_with_deadline)
+        follower_thread.start()
+        follower_thread.join(5)
+        self.assertLess(time.monotonic() - started_at, 2)
+        release_list.set()
+        release_fetch.set()
+        leader_thread.join(5)
+        busy_thread.join(5)
+        self.assertEqual(len(errors), 1)
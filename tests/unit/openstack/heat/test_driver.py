@@ -1,11 +1,30 @@
+import threading
 import unittest
 from unittest.mock import patch, MagicMock
 from osvimdriver.openstack.heat.driver import HeatDriver, StackNotFoundError
+from osvimdriver.openstack.heat.stackcache import StackCache
+from osvimdriver.openstack.retry import RetryPolicy
+from osvimdriver.openstack.breaker import CircuitBreaker, CircuitOpenError
+from osvimdriver.openstack.limiter import FairScheduler
+from osvimdriver.openstack.heat.hedging import Hedger
+from keystoneauth1 import exceptions as keystoneexceptions
 from heatclient import exc as heatexc
 
 
 class TestHeatDriver(unittest.TestCase):
 
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_init_with_endpoint(self, mock_heat_client_init):
+        mock_session = MagicMock()
+        HeatDriver(mock_session, endpoint='http://heat:8004/v1/project')
+        mock_heat_client_init.assert_called_once_with('1', session=mock_session, endpoint_override='http://heat:8004/v1/project')
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_init_without_endpoint(self, mock_heat_client_init):
+        mock_session = MagicMock()
+        HeatDriver(mock_session)
+        mock_heat_client_init.assert_called_once_with('1', session=mock_session)
+
     @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
     def test_create_stack(self, mock_heat_client_init):
         mock_heat_client = mock_heat_client_init.return_value
@@ -16,6 +35,83 @@ class TestHeatDriver(unittest.TestCase):
         mock_heat_client.stacks.create.assert_called_once_with(stack_name='test_stack', template='heat_template_text', parameters={'propA': 1}, files={})
         self.assertEqual(stack_id, 'mock_stack_id','request1234')
 
+    @patch('osvimdriver.openstack.retry.time.sleep')
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_create_stack_not_retried_after_connection_failure(self, mock_heat_client_init, mock_sleep):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.stacks.create.side_effect = keystoneexceptions.ConnectFailure()
+        heat_driver = HeatDriver(MagicMock(), retry_policy=RetryPolicy())
+        with self.assertRaises(keystoneexceptions.ConnectFailure):
+            heat_driver.create_stack('test_stack', 'heat_template_text')
+        mock_heat_client.stacks.create.assert_called_once()
+
+    @patch('osvimdriver.openstack.retry.time.sleep')
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_create_stack_retried_when_unavailable(self, mock_heat_client_init, mock_sleep):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.stacks.create.side_effect = [heatexc.HTTPServiceUnavailable(), {'stack': {'id': 'mock_stack_id'}}]
+        heat_driver = HeatDriver(MagicMock(), retry_policy=RetryPolicy())
+        stack_id, request_id = heat_driver.create_stack('test_stack', 'heat_template_text')
+        self.assertEqual(stack_id, 'mock_stack_id')
+        self.assertEqual(mock_heat_client.stacks.create.call_count, 2)
+
+    @patch('osvimdriver.openstack.retry.time.sleep')
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_retried_after_connection_failure(self, mock_heat_client_init, mock_sleep):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_stack = MagicMock()
+        mock_stack.to_dict.return_value = {'id': '1', 'stack_status': 'CREATE_COMPLETE'}
+        mock_heat_client.stacks.get.side_effect = [keystoneexceptions.ConnectFailure(), mock_stack]
+        heat_driver = HeatDriver(MagicMock(), retry_policy=RetryPolicy())
+        self.assertEqual(heat_driver.get_stack('1'), {'id': '1', 'stack_status': 'CREATE_COMPLETE'})
+        self.assertEqual(mock_heat_client.stacks.get.call_count, 2)
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_fails_fast_when_circuit_open(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.stacks.get.side_effect = keystoneexceptions.ConnectFailure()
+        heat_driver = HeatDriver(MagicMock(), circuit_breaker=CircuitBreaker('testdl', failure_threshold=1))
+        with self.assertRaises(keystoneexceptions.ConnectFailure):
+            heat_driver.get_stack('1')
+        with self.assertRaises(CircuitOpenError):
+            heat_driver.get_stack('1')
+        mock_heat_client.stacks.get.assert_called_once()
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_hedged(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_stack = MagicMock()
+        mock_stack.to_dict.return_value = {'id': '1', 'stack_status': 'CREATE_COMPLETE'}
+        mock_heat_client.stacks.get.return_value = mock_stack
+        hedger = MagicMock(spec=Hedger)
+        hedger.call.side_effect = lambda request: request()
+        heat_driver = HeatDriver(MagicMock(), hedger=hedger, retry_policy=RetryPolicy())
+        self.assertEqual(heat_driver.get_stack('1'), {'id': '1', 'stack_status': 'CREATE_COMPLETE'})
+        hedger.call.assert_called_once()
+        mock_heat_client.stacks.get.assert_called_once_with('1')
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_create_stack_not_hedged(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.stacks.create.return_value = {'stack': {'id': 'mock_stack_id'}}
+        hedger = MagicMock(spec=Hedger)
+        heat_driver = HeatDriver(MagicMock(), hedger=hedger)
+        heat_driver.create_stack('test_stack', 'heat_template_text')
+        hedger.call.assert_not_called()
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_create_stack_takes_turn(self, mock_heat_client_init):
+        scheduler = FairScheduler()
+        mock_heat_client = mock_heat_client_init.return_value
+
+        def create(**kwargs):
+            self.assertEqual(scheduler.stats()['in_flight'], 1)
+            return {'stack': {'id': 'mock_stack_id'}}
+        mock_heat_client.stacks.create.side_effect = create
+        heat_driver = HeatDriver(MagicMock(), concurrency_gate=scheduler.gate('fingerprint', 'testdl'))
+        heat_driver.create_stack('test_stack', 'heat_template_text')
+        self.assertEqual(scheduler.stats()['in_flight'], 0)
+
     @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
     def test_create_stack_without_name(self, mock_heat_client_init):
         mock_session = MagicMock()
@@ -96,6 +192,53 @@ class TestHeatDriver(unittest.TestCase):
         mock_heat_client.stacks.get.assert_called_once_with('12345')
         self.assertEqual(stack, expected_stack)
 
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_create_stack_request_id_has_three_parts(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.stacks.create.return_value = {'stack': {'id': 'mock_stack_id'}}
+        heat_driver = HeatDriver(MagicMock())
+        stack_id, request_id = heat_driver.create_stack('test_stack', 'heat_template_text')
+        # Pods from before the stack name could be included reject any other format
+        request_type, request_stack_id, operation_id = request_id.split('::')
+        self.assertEqual(request_type, 'Create')
+        self.assertEqual(request_stack_id, 'mock_stack_id')
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_with_stack_name(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.stacks.get.return_value.to_dict.return_value = {'id': '12345', 'stack_name': 'test_stack'}
+        heat_driver = HeatDriver(MagicMock())
+        heat_driver.get_stack('12345', stack_name='test_stack')
+        mock_heat_client.stacks.get.assert_called_once_with('test_stack/12345')
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_remembers_stack_name(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.stacks.get.return_value.to_dict.return_value = {'id': '12345', 'stack_name': 'test_stack'}
+        heat_driver = HeatDriver(MagicMock())
+        heat_driver.get_stack('12345')
+        heat_driver.get_stack('12345')
+        self.assertEqual(mock_heat_client.stacks.get.call_args_list[0][0], ('12345',))
+        self.assertEqual(mock_heat_client.stacks.get.call_args_list[1][0], ('test_stack/12345',))
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_remembers_name_of_created_stack(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.stacks.create.return_value = {'stack': {'id': 'mock_stack_id'}}
+        heat_driver = HeatDriver(MagicMock())
+        heat_driver.create_stack('test_stack', 'heat_template_text')
+        heat_driver.get_stack('mock_stack_id')
+        mock_heat_client.stacks.get.assert_called_once_with('test_stack/mock_stack_id')
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_without_outputs(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.stacks.get.return_value.to_dict.return_value = {'id': 'mock_id'}
+        heat_driver = HeatDriver(MagicMock())
+        stack = heat_driver.get_stack('12345', resolve_outputs=False)
+        mock_heat_client.stacks.get.assert_called_once_with('12345', resolve_outputs=False)
+        self.assertEqual(stack, {'id': 'mock_id'})
+
     @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
     def test_get_stack_without_id_fails(self, mock_heat_client_init):
         mock_session = MagicMock()
@@ -113,3 +256,112 @@ class TestHeatDriver(unittest.TestCase):
         with self.assertRaises(StackNotFoundError) as context:
             heat_driver.get_stack('12345')
         self.assertEqual(str(context.exception), 'ERROR: Not found')
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_without_outputs_alone_is_not_batched(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.stacks.get.return_value.to_dict.return_value = {'id': '12345', 'stack_status': 'CREATE_IN_PROGRESS'}
+        heat_driver = HeatDriver(MagicMock(), batch_window_seconds=1)
+        stack = heat_driver.get_stack('12345', resolve_outputs=False)
+        self.assertEqual(stack, {'id': '12345', 'stack_status': 'CREATE_IN_PROGRESS'})
+        mock_heat_client.stacks.get.assert_called_once_with('12345', resolve_outputs=False)
+        mock_heat_client.stacks.list.assert_not_called()
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_without_outputs_batches_concurrent_status_lookups(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        get_started = threading.Event()
+        release_get = threading.Event()
+        def get(stack_identifier, **kwargs):
+            get_started.set()
+            release_get.wait(5)
+            return MagicMock(to_dict=MagicMock(return_value={'id': 'busy'}))
+        mock_heat_client.stacks.get.side_effect = get
+        mock_stack = MagicMock()
+        mock_stack.to_dict.return_value = {'id': '12345', 'stack_name': 'test_stack', 'stack_status': 'CREATE_IN_PROGRESS'}
+        mock_heat_client.stacks.list.return_value = [mock_stack]
+        heat_driver = HeatDriver(MagicMock(), batch_window_seconds=0)
+        busy_thread = threading.Thread(target=heat_driver.get_stack, args=('busy',), kwargs={'resolve_outputs': False})
+        busy_thread.start()
+        get_started.wait(5)
+        try:
+            stack = heat_driver.get_stack('12345', resolve_outputs=False)
+        finally:
+            release_get.set()
+            busy_thread.join(5)
+        self.assertEqual(stack, {'id': '12345', 'stack_name': 'test_stack', 'stack_status': 'CREATE_IN_PROGRESS'})
+        mock_heat_client.stacks.list.assert_called_once_with(filters={'id': ['12345']}, limit=1, show_deleted=True)
+        # The name from the list is used for later lookups
+        mock_heat_client.stacks.get.side_effect = None
+        heat_driver.get_stack('12345')
+        mock_heat_client.stacks.get.assert_called_with('test_stack/12345')
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_with_outputs_is_not_batched(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.stacks.get.return_value.to_dict.return_value = {'id': '12345'}
+        heat_driver = HeatDriver(MagicMock(), batch_window_seconds=0)
+        heat_driver.get_stack('12345')
+        mock_heat_client.stacks.list.assert_not_called()
+        mock_heat_client.stacks.get.assert_called_once_with('12345')
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_with_stack_cache(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.stacks.get.return_value.to_dict.return_value = {'id': '12345', 'stack_status': 'CREATE_IN_PROGRESS'}
+        heat_driver = HeatDriver(MagicMock(), stack_cache=StackCache(), location_fingerprint='fp')
+        first_stack = heat_driver.get_stack('12345', resolve_outputs=False)
+        second_stack = heat_driver.get_stack('12345', resolve_outputs=False)
+        self.assertEqual(first_stack, second_stack)
+        mock_heat_client.stacks.get.assert_called_once_with('12345', resolve_outputs=False)
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_delete_stack_invalidates_stack_cache(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.stacks.get.return_value.to_dict.return_value = {'id': '12345', 'stack_status': 'CREATE_COMPLETE'}
+        heat_driver = HeatDriver(MagicMock(), stack_cache=StackCache(), location_fingerprint='fp')
+        heat_driver.get_stack('12345')
+        heat_driver.delete_stack('12345')
+        heat_driver.get_stack('12345')
+        self.assertEqual(mock_heat_client.stacks.get.call_count, 2)
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stacks_by_status(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        def stack(stack_id):
+            mock_stack = MagicMock()
+            mock_stack.to_dict.return_value = {'id': stack_id, 'stack_status': 'CREATE_IN_PROGRESS'}
+            return mock_stack
+        mock_heat_client.stacks.list.side_effect = [[stack('1'), stack('2')], [stack('3')]]
+        heat_driver = HeatDriver(MagicMock())
+        stacks = heat_driver.get_stacks_by_status('IN_PROGRESS', page_size=2)
+        self.assertEqual([s['id'] for s in stacks], ['1', '2', '3'])
+        self.assertEqual(mock_heat_client.stacks.list.call_args_list[0][1], {'filters': {'status': 'IN_PROGRESS'}, 'limit': 2, 'marker': None})
+        self.assertEqual(mock_heat_client.stacks.list.call_args_list[1][1], {'filters': {'status': 'IN_PROGRESS'}, 'limit': 2, 'marker': '2'})
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_events_latest(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_event = MagicMock()
+        mock_event.to_dict.return_value = {'id': 'event1'}
+        mock_heat_client.events.list.return_value = [mock_event]
+        heat_driver = HeatDriver(MagicMock())
+        events = heat_driver.get_stack_events('12345', stack_name='test_stack')
+        self.assertEqual(events, [{'id': 'event1'}])
+        mock_heat_client.events.list.assert_called_once_with('test_stack/12345', sort_dir='desc', limit=1)
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_events_after_marker(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.events.list.return_value = []
+        heat_driver = HeatDriver(MagicMock())
+        heat_driver.get_stack_events('12345', marker='event1')
+        mock_heat_client.events.list.assert_called_once_with('12345', marker='event1', sort_dir='asc')
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_stack_events_not_found_fails(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        mock_heat_client.events.list.side_effect = heatexc.HTTPNotFound('Not found')
+        heat_driver = HeatDriver(MagicMock())
+        with self.assertRaises(StackNotFoundError):
+            heat_driver.get_stack_events('12345')
@@ -0,0 +1,202 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from osvimdriver.openstack.deadline import deadline, remaining_seconds, DeadlineExceededError
+from osvimdriver.openstack.heat.hedging import Hedger, HedgerRegistry
+from osvimdriver.openstack.retry import RetryBudget, note_retry_after, take_retry_after
+
+
+class TestHedger(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+
+    def __warm_up(self, hedger, count=5):
+        for _ in range(count):
+            hedger.call(lambda: 'warm')
+
+    def test_no_hedge_until_enough_samples(self):
+        hedger = Hedger(self.executor, min_samples=5)
+        self.assertIsNone(hedger.hedge_delay())
+        request = MagicMock(return_value='result')
+        self.assertEqual(hedger.call(request), 'result')
+        request.assert_called_once()
+        self.__warm_up(hedger, 4)
+        self.assertIsNotNone(hedger.hedge_delay())
+
+    def test_runs_on_calling_thread_until_enough_samples(self):
+        hedger = Hedger(self.executor, min_samples=5)
+        self.assertIs(hedger.call(threading.current_thread), threading.current_thread())
+
+    def test_runs_on_calling_thread_when_saturated(self):
+        hedger = Hedger(self.executor, min_delay_seconds=0.01, max_delay_seconds=0.01, min_samples=5, slots=threading.Semaphore(0))
+        self.__warm_up(hedger)
+        request = MagicMock(side_effect=lambda: time.sleep(0.03) or threading.current_thread())
+        self.assertIs(hedger.call(request), threading.current_thread())
+        request.assert_called_once()
+        stats = hedger.metrics.stats()
+        self.assertEqual(stats['hedged'], 0)
+        self.assertEqual(stats['saturated'], 1)
+
+    def test_hedge_skipped_when_saturated(self):
+        hedger = Hedger(self.executor, min_delay_seconds=0.01, max_delay_seconds=0.01, min_samples=5, slots=threading.Semaphore(1))
+        self.__warm_up(hedger)
+        request = MagicMock(side_effect=lambda: time.sleep(0.03) or 'result')
+        self.assertEqual(hedger.call(request), 'result')
+        request.assert_called_once()
+        self.assertEqual(hedger.metrics.stats()['saturated'], 1)
+        # Threads are given back once finished
+        self.assertTrue(hedger.slots.acquire(timeout=1))
+
+    def test_retry_after_handed_to_caller(self):
+        hedger = Hedger(self.executor, min_delay_seconds=0.01, max_delay_seconds=0.01, min_samples=5)
+        self.__warm_up(hedger)
+        take_retry_after()
+
+        def request():
+            note_retry_after(MagicMock(status_code=503, headers={'Retry-After': '7'}))
+            raise ValueError('unavailable')
+        with self.assertRaises(ValueError):
+            hedger.call(request)
+        self.assertEqual(take_retry_after(), 7)
+
+    def test_wait_limited_by_deadline(self):
+        hedger = Hedger(self.executor, min_delay_seconds=0.01, max_delay_seconds=0.01, min_samples=5, budget=RetryBudget(burst=0, ratio=0))
+        self.__warm_up(hedger)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        with deadline('poll', 0.1):
+            with self.assertRaises(DeadlineExceededError):
+                hedger.call(lambda: release.wait(5))
+
+    def test_hedge_delay_is_percentile_within_bounds(self):
+        hedger = Hedger(self.executor, percentile=50, min_delay_seconds=0.01, max_delay_seconds=0.2, min_samples=5)
+        self.__warm_up(hedger)
+        # Near instant samples are raised to the minimum delay
+        self.assertEqual(hedger.hedge_delay(), 0.01)
+        hedger = Hedger(self.executor, percentile=50, min_delay_seconds=0.001, max_delay_seconds=0.2, min_samples=3)
+        for seconds in (0.03, 0.05, 0.3):
+            hedger.call(lambda: time.sleep(seconds))
+        self.assertGreaterEqual(hedger.hedge_delay(), 0.05)
+        self.assertLess(hedger.hedge_delay(), 0.2)
+        hedger = Hedger(self.executor, percentile=99, min_delay_seconds=0.001, max_delay_seconds=0.02, min_samples=1)
+        hedger.call(lambda: time.sleep(0.05))
+        self.assertEqual(hedger.hedge_delay(), 0.02)
+
+    def test_fast_request_not_hedged(self):
+        hedger = Hedger(self.executor, min_delay_seconds=0.5, min_samples=5)
+        self.__warm_up(hedger)
+        request = MagicMock(return_value='result')
+        self.assertEqual(hedger.call(request), 'result')
+        request.assert_called_once()
+        self.assertEqual(hedger.metrics.stats()['hedged'], 0)
+
+    def test_slow_request_hedged_and_fastest_returned(self):
+        hedger = Hedger(self.executor, min_delay_seconds=0.01, max_delay_seconds=0.01, min_samples=5)
+        self.__warm_up(hedger)
+        release_primary = threading.Event()
+        self.addCleanup(release_primary.set)
+        calls = []
+
+        def request():
+            calls.append(1)
+            if len(calls) == 1:
+                release_primary.wait(5)
+                return 'slow'
+            return 'fast'
+        self.assertEqual(hedger.call(request), 'fast')
+        self.assertEqual(len(calls), 2)
+        stats = hedger.metrics.stats()
+        self.assertEqual(stats['hedged'], 1)
+        self.assertEqual(stats['hedge_wins'], 1)
+
+    def test_primary_answering_first_wins(self):
+        hedger = Hedger(self.executor, min_delay_seconds=0.01, max_delay_seconds=0.01, min_samples=5)
+        self.__warm_up(hedger)
+        release_hedge = threading.Event()
+        self.addCleanup(release_hedge.set)
+        calls = []
+
+        def request():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.05)
+                return 'primary'
+            release_hedge.wait(5)
+            return 'hedge'
+        self.assertEqual(hedger.call(request), 'primary')
+        stats = hedger.metrics.stats()
+        self.assertEqual(stats['hedged'], 1)
+        self.assertEqual(stats['hedge_wins'], 0)
+
+    def test_error_from_one_waits_for_the_other(self):
+        hedger = Hedger(self.executor, min_delay_seconds=0.01, max_delay_seconds=0.01, min_samples=5)
+        self.__warm_up(hedger)
+        calls = []
+
+        def request():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                return 'primary'
+            raise ValueError('hedge failed')
+        self.assertEqual(hedger.call(request), 'primary')
+
+    def test_error_raised_when_both_fail(self):
+        hedger = Hedger(self.executor, min_delay_seconds=0.01, max_delay_seconds=0.01, min_samples=5)
+        self.__warm_up(hedger)
+
+        def request():
+            time.sleep(0.05)
+            raise ValueError('failed')
+        with self.assertRaises(ValueError) as context:
+            hedger.call(request)
+        self.assertEqual(str(context.exception), 'failed')
+
+    def test_error_raised_without_hedge(self):
+        hedger = Hedger(self.executor, min_samples=5)
+        with self.assertRaises(ValueError):
+            hedger.call(MagicMock(side_effect=ValueError('failed')))
+
+    def test_budget_limits_hedges(self):
+        hedger = Hedger(self.executor, min_delay_seconds=0.01, max_delay_seconds=0.01, min_samples=5, budget=RetryBudget(burst=1, ratio=0))
+        self.__warm_up(hedger)
+        request = MagicMock(side_effect=lambda: time.sleep(0.03))
+        hedger.call(request)
+        self.assertEqual(request.call_count, 2)
+        request.reset_mock()
+        hedger.call(request)
+        self.assertEqual(request.call_count, 1)
+        stats = hedger.metrics.stats()
+        self.assertEqual(stats['hedged'], 1)
+        self.assertEqual(stats['budget_exhausted'], 1)
+
+    def test_deadline_carried_to_requests(self):
+        hedger = Hedger(self.executor, min_samples=5)
+        with deadline('poll', 30):
+            remaining = hedger.call(remaining_seconds)
+        self.assertIsNotNone(remaining)
+        self.assertLessEqual(remaining, 30)
+
+
+class TestHedgerRegistry(unittest.TestCase):
+
+    def test_get_per_location(self):
+        registry = HedgerRegistry(percentile=90, min_samples=3, budget_burst=2)
+        self.addCleanup(registry.executor.shutdown)
+        hedger = registry.get('fingerprint')
+        self.assertIs(registry.get('fingerprint'), hedger)
+        other_hedger = registry.get('other_fingerprint')
+        self.assertIsNot(other_hedger, hedger)
+        self.assertIsNot(other_hedger.budget, hedger.budget)
+        self.assertIs(other_hedger.executor, hedger.executor)
+        self.assertIs(other_hedger.slots, hedger.slots)
+        self.assertEqual(hedger.percentile, 90)
+        self.assertEqual(hedger.min_samples, 3)
+        self.assertEqual(hedger.budget.burst, 2)
+        hedger.call(lambda: 'result')
+        other_hedger.call(lambda: 'result')
+        self.assertEqual(registry.stats(), {'requests': 2, 'hedged': 0, 'hedge_wins': 0, 'budget_exhausted': 0, 'saturated': 0})
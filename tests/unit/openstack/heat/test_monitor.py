@@ -0,0 +1,87 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+from osvimdriver.openstack.heat.monitor import StackStatusMonitor
+
+
+class TestStackStatusMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_heat_driver = MagicMock()
+        self.mock_heat_driver.get_stacks_by_status.return_value = [
+            {'id': '1', 'stack_status': 'CREATE_IN_PROGRESS'},
+            {'id': '2', 'stack_status': 'DELETE_IN_PROGRESS'},
+            {'id': 'untracked', 'stack_status': 'CREATE_IN_PROGRESS'}
+        ]
+
+    def test_init_without_heat_driver_fails(self):
+        with self.assertRaises(ValueError) as context:
+            StackStatusMonitor(None)
+        self.assertEqual(str(context.exception), 'heat_driver must be provided')
+
+    def test_get_before_refresh(self):
+        monitor = StackStatusMonitor(self.mock_heat_driver)
+        monitor.track('1')
+        self.assertIsNone(monitor.get('1'))
+
+    def test_refresh(self):
+        monitor = StackStatusMonitor(self.mock_heat_driver, page_size=100)
+        monitor.track('1')
+        monitor.track('2')
+        monitor.track('3')
+        monitor.refresh()
+        self.mock_heat_driver.get_stacks_by_status.assert_called_once_with('IN_PROGRESS', page_size=100)
+        self.assertEqual(monitor.get('1'), {'id': '1', 'stack_status': 'CREATE_IN_PROGRESS'})
+        self.assertEqual(monitor.get('2'), {'id': '2', 'stack_status': 'DELETE_IN_PROGRESS'})
+        # No longer in progress, so left to the poll to retrieve
+        self.assertIsNone(monitor.get('3'))
+        self.assertIsNone(monitor.get('untracked'))
+        self.assertEqual(monitor.stats(), {'tracked': 3, 'in_progress': 2, 'refreshes': 1, 'failures': 0})
+
+    def test_refresh_without_tracked_stacks(self):
+        monitor = StackStatusMonitor(self.mock_heat_driver)
+        monitor.refresh()
+        self.mock_heat_driver.get_stacks_by_status.assert_not_called()
+
+    def test_refresh_failure_keeps_snapshot(self):
+        monitor = StackStatusMonitor(self.mock_heat_driver)
+        monitor.track('1')
+        monitor.refresh()
+        self.mock_heat_driver.get_stacks_by_status.side_effect = Exception('Service Unavailable')
+        monitor.refresh()
+        self.assertIsNotNone(monitor.get('1'))
+        self.assertEqual(monitor.stats()['failures'], 1)
+
+    def test_get_stale_snapshot(self):
+        monitor = StackStatusMonitor(self.mock_heat_driver, max_age_seconds=0.05)
+        monitor.track('1')
+        monitor.refresh()
+        time.sleep(0.1)
+        self.assertIsNone(monitor.get('1'))
+
+    def test_untrack(self):
+        monitor = StackStatusMonitor(self.mock_heat_driver)
+        monitor.track('1')
+        monitor.refresh()
+        monitor.untrack('1')
+        self.assertIsNone(monitor.get('1'))
+        self.assertEqual(monitor.stats()['tracked'], 0)
+
+    def test_idle_stacks_are_no_longer_tracked(self):
+        monitor = StackStatusMonitor(self.mock_heat_driver, idle_timeout_seconds=0.05)
+        monitor.track('1')
+        time.sleep(0.1)
+        monitor.refresh()
+        self.mock_heat_driver.get_stacks_by_status.assert_not_called()
+
+    def test_start_refreshes_in_background(self):
+        monitor = StackStatusMonitor(self.mock_heat_driver, interval_seconds=0.01)
+        monitor.track('1')
+        monitor.start()
+        try:
+            deadline = time.monotonic() + 5
+            while monitor.get('1') is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertIsNotNone(monitor.get('1'))
+        finally:
+            monitor.stop()
@@ -0,0 +1,133 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from osvimdriver.openstack.heat.stackcache import StackCache
+
+
+class TestStackCache(unittest.TestCase):
+
+    def test_get_loads_stack(self):
+        stack_cache = StackCache()
+        load = MagicMock(return_value={'id': '1', 'stack_status': 'CREATE_IN_PROGRESS'})
+        self.assertEqual(stack_cache.get(('fp', '1', False), load), {'id': '1', 'stack_status': 'CREATE_IN_PROGRESS'})
+        load.assert_called_once()
+
+    def test_get_reuses_cached_stack(self):
+        stack_cache = StackCache()
+        load = MagicMock(return_value={'id': '1', 'stack_status': 'CREATE_IN_PROGRESS'})
+        stack_cache.get(('fp', '1', False), load)
+        stack_cache.get(('fp', '1', False), load)
+        load.assert_called_once()
+
+    def test_get_returns_copy(self):
+        stack_cache = StackCache()
+        load = MagicMock(return_value={'id': '1', 'outputs': []})
+        stack = stack_cache.get(('fp', '1', True), load)
+        stack['outputs'].append({'output_key': 'a'})
+        self.assertEqual(stack_cache.get(('fp', '1', True), load), {'id': '1', 'outputs': []})
+
+    def test_get_reloads_stack_of_another_action(self):
+        stack_cache = StackCache(terminal_ttl_seconds=60)
+        load = MagicMock(side_effect=[{'id': '1', 'stack_status': 'CREATE_COMPLETE'}, {'id': '1', 'stack_status': 'DELETE_IN_PROGRESS'}])
+        stack_cache.get(('fp', '1', False), load, actions=('CREATE',))
+        self.assertEqual(stack_cache.get(('fp', '1', False), load, actions=('DELETE',)), {'id': '1', 'stack_status': 'DELETE_IN_PROGRESS'})
+        self.assertEqual(load.call_count, 2)
+        self.assertEqual(stack_cache.stats()['stale'], 1)
+        # Matches now, so reused
+        stack_cache.get(('fp', '1', False), load, actions=('DELETE',))
+        self.assertEqual(load.call_count, 2)
+
+    def test_get_keyed_by_location(self):
+        stack_cache = StackCache()
+        load = MagicMock(return_value={'id': '1'})
+        stack_cache.get(('fp', '1', False), load)
+        stack_cache.get(('other-fp', '1', False), load)
+        self.assertEqual(load.call_count, 2)
+
+    def test_get_in_progress_stack_expires(self):
+        stack_cache = StackCache(ttl_seconds=0.05, terminal_ttl_seconds=60)
+        load = MagicMock(return_value={'id': '1', 'stack_status': 'CREATE_IN_PROGRESS'})
+        stack_cache.get(('fp', '1', False), load)
+        time.sleep(0.1)
+        stack_cache.get(('fp', '1', False), load)
+        self.assertEqual(load.call_count, 2)
+
+    def test_get_terminal_stack_cached_for_longer(self):
+        stack_cache = StackCache(ttl_seconds=0.05, terminal_ttl_seconds=60)
+        load = MagicMock(return_value={'id': '1', 'stack_status': 'CREATE_COMPLETE'})
+        stack_cache.get(('fp', '1', False), load)
+        time.sleep(0.1)
+        stack_cache.get(('fp', '1', False), load)
+        load.assert_called_once()
+
+    def test_get_does_not_cache_errors(self):
+        stack_cache = StackCache()
+        load = MagicMock(side_effect=[ValueError('Not found'), {'id': '1'}])
+        with self.assertRaises(ValueError):
+            stack_cache.get(('fp', '1', False), load)
+        self.assertEqual(stack_cache.get(('fp', '1', False), load), {'id': '1'})
+
+    def test_invalidate(self):
+        stack_cache = StackCache()
+        load = MagicMock(return_value={'id': '1', 'stack_status': 'CREATE_COMPLETE'})
+        stack_cache.get(('fp', '1', False), load)
+        stack_cache.get(('fp', '1', True), load)
+        stack_cache.invalidate('fp', '1')
+        stack_cache.get(('fp', '1', False), load)
+        stack_cache.get(('fp', '1', True), load)
+        self.assertEqual(load.call_count, 4)
+
+    def test_concurrent_lookups_share_load(self):
+        stack_cache = StackCache()
+        loading = threading.Event()
+        release = threading.Event()
+        load_count = []
+        def load():
+            load_count.append(1)
+            loading.set()
+            release.wait(5)
+            return {'id': '1', 'stack_status': 'CREATE_IN_PROGRESS'}
+        results = []
+        def get():
+            results.append(stack_cache.get(('fp', '1', False), load))
+        leader = threading.Thread(target=get)
+        leader.start()
+        loading.wait(5)
+        followers = [threading.Thread(target=get) for i in range(3)]
+        for follower in followers:
+            follower.start()
+        while stack_cache.stats()['shared'] < 3:
+            time.sleep(0.01)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        self.assertEqual(len(load_count), 1)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(stack_cache.stats()['shared'], 3)
+
+    def test_concurrent_lookups_share_error(self):
+        stack_cache = StackCache()
+        loading = threading.Event()
+        release = threading.Event()
+        def load():
+            loading.set()
+            release.wait(5)
+            raise ValueError('Not found')
+        errors = []
+        def get():
+            try:
+                stack_cache.get(('fp', '1', False), load)
+            except ValueError as e:
+                errors.append(e)
+        leader = threading.Thread(target=get)
+        leader.start()
+        loading.wait(5)
+        follower = threading.Thread(target=get)
+        follower.start()
+        while stack_cache.stats()['shared'] < 1:
+            time.sleep(0.01)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(len(errors), 2)
@@ -2,10 +2,17 @@ import unittest
 from unittest.mock import patch, MagicMock
 from osvimdriver.openstack.neutron.driver import NeutronDriver
 from neutronclient.common import exceptions as neutronexceptions
+from osvimdriver.openstack.retry import RetryPolicy
 
 
 class TestNeutronDriver(unittest.TestCase):
 
+    @patch('osvimdriver.openstack.neutron.driver.neutronclient.Client')
+    def test_init_with_endpoint(self, mock_neutron_client_init):
+        mock_session = MagicMock()
+        NeutronDriver(mock_session, endpoint='http://neutron:9696')
+        mock_neutron_client_init.assert_called_once_with(session=mock_session, endpoint_override='http://neutron:9696')
+
     @patch('osvimdriver.openstack.neutron.driver.neutronclient.Client')
     def test_get_network_by_id(self, mock_neutron_client_init):
         mock_neutron_client = mock_neutron_client_init.return_value
@@ -16,6 +23,16 @@ class TestNeutronDriver(unittest.TestCase):
         mock_neutron_client.show_network.assert_called_once_with('mock_network_id')
         self.assertEqual(network, {'id': 'mock_network_id'})
 
+    @patch('osvimdriver.openstack.retry.time.sleep')
+    @patch('osvimdriver.openstack.neutron.driver.neutronclient.Client')
+    def test_get_network_by_id_retried_when_unavailable(self, mock_neutron_client_init, mock_sleep):
+        mock_neutron_client = mock_neutron_client_init.return_value
+        mock_neutron_client.show_network.side_effect = [neutronexceptions.ServiceUnavailable(), {'network': {'id': 'mock_network_id'}}]
+        neutron_driver = NeutronDriver(MagicMock(), retry_policy=RetryPolicy())
+        network = neutron_driver.get_network_by_id('mock_network_id')
+        self.assertEqual(network, {'id': 'mock_network_id'})
+        self.assertEqual(mock_neutron_client.show_network.call_count, 2)
+
     @patch('osvimdriver.openstack.neutron.driver.neutronclient.Client')
     def test_get_network_by_id_without_id_fails(self, mock_neutron_client_init):
         mock_session = MagicMock()
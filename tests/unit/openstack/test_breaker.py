@@ -0,0 +1,149 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from keystoneauth1 import exceptions as keystoneexceptions
+from heatclient import exc as heatexc
+from osvimdriver.openstack.breaker import CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+from ignition.service.resourcedriver import InvalidRequestError, TemporaryResourceDriverError
+from osvimdriver.openstack.deadline import DeadlineExceededError
+from osvimdriver.openstack.retry import RetryPolicy
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        monotonic_patcher = patch('osvimdriver.openstack.breaker.time.monotonic')
+        self.mock_monotonic = monotonic_patcher.start()
+        self.mock_monotonic.return_value = 100
+        self.addCleanup(monotonic_patcher.stop)
+
+    def __fail(self, breaker, times=1):
+        for _ in range(times):
+            with self.assertRaises(keystoneexceptions.ConnectFailure):
+                breaker.call('get_stack', MagicMock(side_effect=keystoneexceptions.ConnectFailure()))
+
+    def test_call_success(self):
+        breaker = CircuitBreaker('testdl')
+        self.assertEqual(breaker.call('get_stack', lambda: 'result'), 'result')
+        self.assertEqual(breaker.state, STATE_CLOSED)
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=3)
+        self.__fail(breaker, 2)
+        self.assertEqual(breaker.state, STATE_CLOSED)
+        self.__fail(breaker)
+        self.assertEqual(breaker.state, STATE_OPEN)
+        request = MagicMock()
+        with self.assertRaises(CircuitOpenError) as context:
+            breaker.call('get_stack', request)
+        request.assert_not_called()
+        self.assertIn('testdl', str(context.exception))
+        self.assertEqual(breaker.stats()['rejected'], 1)
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=2)
+        self.__fail(breaker)
+        breaker.call('get_stack', lambda: 'result')
+        self.__fail(breaker)
+        self.assertEqual(breaker.state, STATE_CLOSED)
+
+    def test_client_errors_are_not_failures(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=1)
+        with self.assertRaises(heatexc.HTTPNotFound):
+            breaker.call('get_stack', MagicMock(side_effect=heatexc.HTTPNotFound()))
+        self.assertEqual(breaker.state, STATE_CLOSED)
+
+    def test_validation_errors_are_not_failures(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=1)
+        with self.assertRaises(InvalidRequestError):
+            breaker.call('create_stack', MagicMock(side_effect=InvalidRequestError('Invalid template')))
+        self.assertEqual(breaker.state, STATE_CLOSED)
+
+    def test_temporary_errors_are_failures(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=1)
+        with self.assertRaises(TemporaryResourceDriverError):
+            breaker.call('get_stack', MagicMock(side_effect=TemporaryResourceDriverError('Try again')))
+        self.assertEqual(breaker.state, STATE_OPEN)
+
+    def test_unexpected_errors_are_failures(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=1)
+        with self.assertRaises(ValueError):
+            breaker.call('get_stack', MagicMock(side_effect=ValueError('Unreadable response')))
+        self.assertEqual(breaker.state, STATE_OPEN)
+
+    def test_half_open_probe_past_deadline_reopens(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=1, open_seconds=30)
+        self.__fail(breaker)
+        self.mock_monotonic.return_value = 131
+        with self.assertRaises(DeadlineExceededError):
+            breaker.call('get_stack', MagicMock(side_effect=DeadlineExceededError('Deadline of poll request exceeded')))
+        self.assertEqual(breaker.state, STATE_OPEN)
+
+    def test_server_errors_are_failures(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=1)
+        with self.assertRaises(heatexc.HTTPServiceUnavailable):
+            breaker.call('get_stack', MagicMock(side_effect=heatexc.HTTPServiceUnavailable()))
+        self.assertEqual(breaker.state, STATE_OPEN)
+
+    def test_slow_calls_are_failures(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=1, slow_call_seconds=5)
+        self.mock_monotonic.side_effect = [100, 110, 110]
+        self.assertEqual(breaker.call('get_stack', lambda: 'result'), 'result')
+        self.assertEqual(breaker.state, STATE_OPEN)
+
+    def test_half_open_probe_closes(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=1, open_seconds=30)
+        self.__fail(breaker)
+        self.mock_monotonic.return_value = 131
+        self.assertEqual(breaker.call('get_stack', lambda: 'result'), 'result')
+        self.assertEqual(breaker.state, STATE_CLOSED)
+
+    def test_half_open_probe_reopens(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=3, open_seconds=30)
+        self.__fail(breaker, 3)
+        self.mock_monotonic.return_value = 131
+        self.__fail(breaker)
+        self.assertEqual(breaker.state, STATE_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.call('get_stack', lambda: 'result')
+
+    def test_half_open_allows_one_probe(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=1, open_seconds=30)
+        self.__fail(breaker)
+        self.mock_monotonic.return_value = 131
+
+        def probe():
+            self.assertEqual(breaker.state, STATE_HALF_OPEN)
+            with self.assertRaises(CircuitOpenError):
+                breaker.call('get_stack', lambda: 'other')
+            return 'result'
+        self.assertEqual(breaker.call('get_stack', probe), 'result')
+
+    def test_open_circuit_not_retried(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=1)
+        self.__fail(breaker)
+        request = MagicMock()
+        with patch('osvimdriver.openstack.retry.time.sleep') as mock_sleep:
+            with self.assertRaises(CircuitOpenError):
+                RetryPolicy().call('get_stack', lambda: breaker.call('get_stack', request))
+        mock_sleep.assert_not_called()
+
+    def test_stats(self):
+        breaker = CircuitBreaker('testdl', failure_threshold=1, open_seconds=30)
+        self.__fail(breaker)
+        self.mock_monotonic.return_value = 110
+        self.assertEqual(breaker.stats(), {'name': 'testdl', 'state': STATE_OPEN, 'consecutive_failures': 1, 'rejected': 0, 'times_opened': 1, 'retry_in_seconds': 20})
+
+
+class TestCircuitBreakerRegistry(unittest.TestCase):
+
+    def test_get_shares_breaker_per_fingerprint(self):
+        registry = CircuitBreakerRegistry(failure_threshold=2)
+        breaker = registry.get('fingerprintA', 'testdlA')
+        self.assertIs(registry.get('fingerprintA', 'testdlA'), breaker)
+        self.assertIsNot(registry.get('fingerprintB', 'testdlB'), breaker)
+        self.assertEqual(breaker.failure_threshold, 2)
+
+    def test_stats(self):
+        registry = CircuitBreakerRegistry()
+        registry.get('fingerprintA', 'testdlA')
+        self.assertEqual([stats['name'] for stats in registry.stats()], ['testdlA'])
@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from osvimdriver.openstack.cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_init_invalid_max_size(self):
+        with self.assertRaises(ValueError) as context:
+            LRUCache(max_size=0)
+        self.assertEqual(str(context.exception), 'max_size must be greater than 0')
+
+    def test_get_and_put(self):
+        cache = LRUCache(max_size=2)
+        cache.put('A', 'valueA')
+        self.assertEqual(cache.get('A'), 'valueA')
+        self.assertIsNone(cache.get('B'))
+        self.assertEqual(cache.stats(), {'size': 1, 'hits': 1, 'misses': 1, 'evictions': 0})
+
+    def test_put_evicts_least_recently_used(self):
+        on_evict = MagicMock()
+        cache = LRUCache(max_size=2, on_evict=on_evict)
+        cache.put('A', 'valueA')
+        cache.put('B', 'valueB')
+        cache.get('A')
+        cache.put('C', 'valueC')
+        self.assertIn('A', cache)
+        self.assertNotIn('B', cache)
+        self.assertIn('C', cache)
+        on_evict.assert_called_once_with('B', 'valueB')
+
+    @patch('osvimdriver.openstack.cache.time.monotonic')
+    def test_get_expired(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        on_evict = MagicMock()
+        cache = LRUCache(ttl=10, on_evict=on_evict)
+        cache.put('A', 'valueA')
+        mock_monotonic.return_value = 109
+        self.assertEqual(cache.get('A'), 'valueA')
+        mock_monotonic.return_value = 110
+        self.assertIsNone(cache.get('A'))
+        self.assertEqual(len(cache), 0)
+        on_evict.assert_called_once_with('A', 'valueA')
+
+    @patch('osvimdriver.openstack.cache.time.monotonic')
+    def test_touch_extends_expiry(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        cache = LRUCache(ttl=10)
+        cache.put('A', 'valueA')
+        mock_monotonic.return_value = 105
+        self.assertTrue(cache.touch('A'))
+        mock_monotonic.return_value = 112
+        self.assertEqual(cache.get('A'), 'valueA')
+        self.assertFalse(cache.touch('B'))
+
+    @patch('osvimdriver.openstack.cache.time.monotonic')
+    def test_expire(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        cache = LRUCache()
+        cache.put('A', 'valueA', ttl=5)
+        cache.put('B', 'valueB', ttl=20)
+        cache.put('C', 'valueC')
+        mock_monotonic.return_value = 110
+        self.assertEqual(cache.expire(), 1)
+        self.assertEqual(cache.keys(), ['B', 'C'])
+
+    def test_remove(self):
+        cache = LRUCache()
+        cache.put('A', 'valueA')
+        self.assertEqual(cache.remove('A'), 'valueA')
+        self.assertIsNone(cache.remove('A'))
+        self.assertEqual(len(cache), 0)
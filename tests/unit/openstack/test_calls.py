@@ -0,0 +1,29 @@
+import unittest
+from unittest.mock import MagicMock
+from osvimdriver.openstack.calls import OpenstackCaller
+
+
+class TestOpenstackCaller(unittest.TestCase):
+
+    def test_call_without_protection(self):
+        self.assertEqual(OpenstackCaller().call('get_stack', lambda: 'result'), 'result')
+
+    def test_call_order(self):
+        calls = []
+        def wrapper(name):
+            def call(operation, request, **kwargs):
+                calls.append(name)
+                return request()
+            return call
+        retry_policy = MagicMock()
+        retry_policy.call.side_effect = wrapper('retry')
+        circuit_breaker = MagicMock()
+        circuit_breaker.call.side_effect = wrapper('breaker')
+        concurrency_gate = MagicMock()
+        concurrency_gate.call.side_effect = wrapper('gate')
+        caller = OpenstackCaller(retry_policy=retry_policy, circuit_breaker=circuit_breaker, concurrency_gate=concurrency_gate)
+        self.assertEqual(caller.call('create_stack', lambda: 'result', idempotent=False), 'result')
+        self.assertEqual(calls, ['retry', 'gate', 'breaker'])
+        self.assertFalse(retry_policy.call.call_args[1]['idempotent'])
+        self.assertEqual(circuit_breaker.call.call_args[0][0], 'create_stack')
+        self.assertEqual(concurrency_gate.call.call_args[0][0], 'create_stack')
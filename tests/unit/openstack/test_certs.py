@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from osvimdriver.openstack.certs import CertificateStore
+
+
+class TestCertificateStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = os.path.join(tempfile.mkdtemp(), 'certs')
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.directory))
+
+    def test_init_creates_directory(self):
+        CertificateStore(self.directory)
+        self.assertTrue(os.path.isdir(self.directory))
+
+    def test_init_refuses_permissive_directory(self):
+        os.makedirs(self.directory, mode=0o777)
+        os.chmod(self.directory, 0o777)
+        store = CertificateStore(self.directory)
+        self.addCleanup(shutil.rmtree, store.directory)
+        self.assertNotEqual(store.directory, self.directory)
+        self.assertEqual(os.stat(store.directory).st_mode & 0o777, 0o700)
+
+    def test_init_refuses_symlink(self):
+        target = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, target)
+        os.symlink(target, self.directory)
+        store = CertificateStore(self.directory)
+        self.addCleanup(shutil.rmtree, store.directory)
+        self.assertNotEqual(store.directory, self.directory)
+        self.assertFalse(store.acquire('certA').startswith(target))
+
+    def test_init_refuses_directory_owned_by_another_user(self):
+        os.makedirs(self.directory, mode=0o700)
+        with patch('osvimdriver.openstack.certs.os.getuid', return_value=os.getuid() + 1):
+            store = CertificateStore(self.directory)
+        self.addCleanup(shutil.rmtree, store.directory)
+        self.assertNotEqual(store.directory, self.directory)
+
+    @patch('osvimdriver.openstack.certs.atexit.register')
+    def test_init_removes_fallback_directory_at_exit(self, mock_register):
+        os.makedirs(self.directory, mode=0o777)
+        os.chmod(self.directory, 0o777)
+        store = CertificateStore(self.directory)
+        mock_register.assert_called_once_with(shutil.rmtree, store.directory, ignore_errors=True)
+        remove, directory = mock_register.call_args[0]
+        remove(directory, **mock_register.call_args[1])
+        self.assertFalse(os.path.exists(store.directory))
+
+    @patch('osvimdriver.openstack.certs.atexit.register')
+    def test_init_leaves_shared_directory_at_exit(self, mock_register):
+        CertificateStore(self.directory)
+        mock_register.assert_not_called()
+
+    def test_init_uses_existing_private_directory(self):
+        os.makedirs(self.directory, mode=0o700)
+        self.assertEqual(CertificateStore(self.directory).directory, self.directory)
+
+    def test_init_without_directory_fails(self):
+        with self.assertRaises(ValueError) as context:
+            CertificateStore(None)
+        self.assertEqual(str(context.exception), 'directory must be provided')
+
+    def test_acquire_writes_file_named_by_content(self):
+        store = CertificateStore(self.directory)
+        path = store.acquire('certA')
+        with open(path, 'r') as f:
+            self.assertEqual(f.read(), 'certA')
+        self.assertEqual(oct(os.stat(path).st_mode & 0o777), oct(0o600))
+        self.assertEqual(store.acquire('certA'), path)
+        self.assertNotEqual(store.acquire('certB'), path)
+        self.assertEqual(store.stats(), {'files': 2, 'referenced': 2})
+
+    def test_acquire_shares_files_between_stores(self):
+        first_store = CertificateStore(self.directory)
+        second_store = CertificateStore(self.directory)
+        self.assertEqual(first_store.acquire('certA'), second_store.acquire('certA'))
+        self.assertEqual(first_store.stats()['files'], 1)
+
+    def test_release_keeps_file_until_swept(self):
+        store = CertificateStore(self.directory, max_age_seconds=60)
+        path = store.acquire('certA')
+        store.release(path)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(store.stats(), {'files': 1, 'referenced': 0})
+        self.assertEqual(store.sweep(), 0)
+        old_time = time.time() - 120
+        os.utime(path, (old_time, old_time))
+        self.assertEqual(store.sweep(), 1)
+        self.assertFalse(os.path.exists(path))
+
+    def test_sweep_keeps_referenced_files(self):
+        store = CertificateStore(self.directory, max_age_seconds=60)
+        path = store.acquire('certA')
+        store.acquire('certA')
+        store.release(path)
+        old_time = time.time() - 120
+        os.utime(path, (old_time, old_time))
+        self.assertEqual(store.sweep(), 0)
+        self.assertTrue(os.path.exists(path))
+        self.assertGreater(os.path.getmtime(path), old_time)
+
+    def test_sweep_restores_referenced_files_removed_by_another_process(self):
+        store = CertificateStore(self.directory)
+        path = store.acquire('certA')
+        os.remove(path)
+        store.sweep()
+        with open(path, 'r') as f:
+            self.assertEqual(f.read(), 'certA')
+
+    def test_destroy_removes_directory(self):
+        store = CertificateStore(self.directory)
+        store.acquire('certA')
+        store.destroy()
+        self.assertFalse(os.path.exists(self.directory))
@@ -0,0 +1,161 @@
+import unittest
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest.mock import patch, MagicMock
+from osvimdriver.openstack.connections import ConnectionPool, PooledHTTPAdapter, DeadlineHTTPAdapter
+from osvimdriver.openstack.retry import take_retry_after
+from osvimdriver.openstack.deadline import deadline, DeadlineExceededError, DEFAULT_CONNECT_TIMEOUT_SECONDS, DEFAULT_READ_TIMEOUT_SECONDS
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{}'
+        if self.path == '/busy':
+            self.send_response(503)
+            self.send_header('Retry-After', '3')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+        self.url = 'http://127.0.0.1:{0}/'.format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_session_uses_pooled_adapter(self):
+        pool = ConnectionPool()
+        self.assertIs(pool.session.get_adapter('https://heat'), pool.adapter)
+        self.assertIs(pool.session.get_adapter('http://heat'), pool.adapter)
+        self.assertIsInstance(pool.adapter, PooledHTTPAdapter)
+
+    def test_requests_reuse_connections(self):
+        pool = ConnectionPool()
+        try:
+            for _ in range(3):
+                pool.session.get(self.url).raise_for_status()
+            self.assertEqual(pool.stats(), {'requests': 3, 'connections_opened': 1, 'connections_reused': 2, 'idle_resets': 0})
+        finally:
+            pool.close()
+
+    def test_retry_after_captured(self):
+        pool = ConnectionPool()
+        try:
+            pool.session.get(self.url + 'busy')
+            self.assertEqual(take_retry_after(), 3)
+            pool.session.get(self.url)
+            self.assertIsNone(take_retry_after())
+        finally:
+            pool.close()
+
+    @patch('osvimdriver.openstack.connections.requests.adapters.HTTPAdapter.send')
+    def test_timeout_limited_by_deadline(self, mock_send):
+        pool = ConnectionPool()
+        with deadline('poll', 30, connect_timeout_seconds=5):
+            pool.adapter.send(MagicMock(), timeout=None)
+        connect_timeout, read_timeout = mock_send.call_args[1]['timeout']
+        self.assertEqual(connect_timeout, 5)
+        self.assertAlmostEqual(read_timeout, 30, delta=1)
+
+    @patch('osvimdriver.openstack.connections.requests.adapters.HTTPAdapter.send')
+    def test_default_timeout_without_deadline(self, mock_send):
+        DeadlineHTTPAdapter().send(MagicMock(), timeout=None)
+        self.assertEqual(mock_send.call_args[1]['timeout'], (DEFAULT_CONNECT_TIMEOUT_SECONDS, DEFAULT_READ_TIMEOUT_SECONDS))
+
+    @patch('osvimdriver.openstack.connections.requests.adapters.HTTPAdapter.send')
+    def test_unpooled_timeout_limited_by_deadline(self, mock_send):
+        with deadline('poll', 30, connect_timeout_seconds=5):
+            DeadlineHTTPAdapter().send(MagicMock(), timeout=None)
+        connect_timeout, read_timeout = mock_send.call_args[1]['timeout']
+        self.assertEqual(connect_timeout, 5)
+        self.assertAlmostEqual(read_timeout, 30, delta=1)
+
+    @patch('osvimdriver.openstack.deadline.time.monotonic')
+    def test_request_not_sent_after_deadline(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        pool = ConnectionPool()
+        with deadline('poll', 30):
+            mock_monotonic.return_value = 131
+            with self.assertRaises(DeadlineExceededError):
+                pool.session.get(self.url)
+        self.assertEqual(pool.stats()['requests'], 0)
+
+    @patch('osvimdriver.openstack.connections.time.monotonic')
+    def test_idle_connections_are_closed(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        pool = ConnectionPool(idle_timeout_seconds=30)
+        try:
+            pool.session.get(self.url).raise_for_status()
+            mock_monotonic.return_value = 200
+            pool.session.get(self.url).raise_for_status()
+            self.assertEqual(pool.stats(), {'requests': 2, 'connections_opened': 2, 'connections_reused': 0, 'idle_resets': 1})
+        finally:
+            pool.close()
+
+    def test_session_for_reuses_session_per_fingerprint(self):
+        pool = ConnectionPool()
+        ssl_context = MagicMock()
+        first = pool.session_for('fingerprintA', ssl_context)
+        second = pool.session_for('fingerprintA', ssl_context)
+        other = pool.session_for('fingerprintB', MagicMock())
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertIsNot(first, pool.session)
+        self.assertIs(first.get_adapter('https://heat').ssl_context, ssl_context)
+
+    def test_session_for_evicts_least_recently_used(self):
+        pool = ConnectionPool(max_tls_sessions=1)
+        first = pool.session_for('fingerprintA', MagicMock())
+        with patch.object(first, 'close') as mock_close:
+            pool.session_for('fingerprintB', MagicMock())
+            mock_close.assert_called_once()
+        self.assertIsNot(pool.session_for('fingerprintA', MagicMock()), first)
+
+    def test_stats_include_tls_sessions(self):
+        pool = ConnectionPool()
+        try:
+            pool.session.get(self.url).raise_for_status()
+            pool.session_for('fingerprintA', MagicMock()).get(self.url).raise_for_status()
+            self.assertEqual(pool.stats()['requests'], 2)
+        finally:
+            pool.close()
+
+
+class TestPooledHTTPAdapter(unittest.TestCase):
+
+    def test_ssl_context_passed_to_pool_manager(self):
+        ssl_context = MagicMock()
+        adapter = PooledHTTPAdapter(ssl_context=ssl_context)
+        self.assertIs(adapter.poolmanager.connection_pool_kw['ssl_context'], ssl_context)
+
+    def test_cert_verify_with_ssl_context_does_not_load_files(self):
+        adapter = PooledHTTPAdapter(ssl_context=MagicMock())
+        conn = MagicMock()
+        adapter.cert_verify(conn, 'https://heat', '/certs/ca.pem', ('/certs/cert.pem', '/certs/key.pem'))
+        self.assertEqual(conn.cert_reqs, 'CERT_REQUIRED')
+        self.assertIsNone(conn.ca_certs)
+        self.assertIsNone(conn.ca_cert_dir)
+        self.assertIsNone(conn.cert_file)
+        self.assertIsNone(conn.key_file)
+
+    def test_cert_verify_without_ssl_context(self):
+        adapter = PooledHTTPAdapter()
+        conn = MagicMock()
+        with patch('osvimdriver.openstack.connections.keystonesession.TCPKeepAliveAdapter.cert_verify') as mock_cert_verify:
+            adapter.cert_verify(conn, 'https://heat', True, None)
+        mock_cert_verify.assert_called_once_with(conn, 'https://heat', True, None)
@@ -0,0 +1,44 @@
+import unittest
+from unittest.mock import patch
+from osvimdriver.openstack.deadline import deadline, current_deadline, remaining_seconds, timeout_for_request, DeadlineExceededError, DEFAULT_CONNECT_TIMEOUT_SECONDS, DEFAULT_READ_TIMEOUT_SECONDS
+
+
+class TestDeadline(unittest.TestCase):
+
+    def test_deadline(self):
+        self.assertIsNone(current_deadline())
+        with deadline('create', 60) as create_deadline:
+            self.assertIs(current_deadline(), create_deadline)
+            self.assertAlmostEqual(remaining_seconds(), 60, delta=1)
+        self.assertIsNone(current_deadline())
+        self.assertIsNone(remaining_seconds())
+
+    def test_deadline_without_seconds(self):
+        with deadline('create', None) as create_deadline:
+            self.assertIsNone(create_deadline)
+            self.assertIsNone(current_deadline())
+
+    def test_nested_deadline_keeps_tightest(self):
+        with deadline('poll', 10) as poll_deadline:
+            with deadline('create', 60) as inner_deadline:
+                self.assertIs(inner_deadline, poll_deadline)
+            with deadline('find_reference', 5) as inner_deadline:
+                self.assertEqual(inner_deadline.name, 'find_reference')
+            self.assertIs(current_deadline(), poll_deadline)
+
+    def test_timeout_for_request_without_deadline(self):
+        self.assertEqual(timeout_for_request(None), (DEFAULT_CONNECT_TIMEOUT_SECONDS, DEFAULT_READ_TIMEOUT_SECONDS))
+        self.assertEqual(timeout_for_request(5), 5)
+
+    @patch('osvimdriver.openstack.deadline.time.monotonic')
+    def test_timeout_for_request(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        with deadline('poll', 30, connect_timeout_seconds=5):
+            self.assertEqual(timeout_for_request(None), (5, 30))
+            self.assertEqual(timeout_for_request(3), (3, 3))
+            self.assertEqual(timeout_for_request((10, 60)), (5, 30))
+            mock_monotonic.return_value = 128
+            self.assertEqual(timeout_for_request(None), (2, 2))
+            mock_monotonic.return_value = 130
+            with self.assertRaises(DeadlineExceededError):
+                timeout_for_request(None)
@@ -0,0 +1,41 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from osvimdriver.openstack.endpoints import EndpointCache
+
+
+class TestEndpointCache(unittest.TestCase):
+
+    def test_get_endpoint_resolves_once(self):
+        session = MagicMock()
+        session.get_endpoint.return_value = 'http://heat:8004/v1/project'
+        cache = EndpointCache(interface='internal', region_name='RegionOne')
+        self.assertEqual(cache.get_endpoint(session, 'fingerprintA', 'orchestration'), 'http://heat:8004/v1/project')
+        self.assertEqual(cache.get_endpoint(session, 'fingerprintA', 'orchestration'), 'http://heat:8004/v1/project')
+        session.get_endpoint.assert_called_once_with(service_type='orchestration', interface='internal', region_name='RegionOne')
+
+    def test_get_endpoint_per_fingerprint_and_service_type(self):
+        session = MagicMock()
+        cache = EndpointCache()
+        cache.get_endpoint(session, 'fingerprintA', 'orchestration')
+        cache.get_endpoint(session, 'fingerprintA', 'network')
+        cache.get_endpoint(session, 'fingerprintB', 'orchestration')
+        self.assertEqual(session.get_endpoint.call_count, 3)
+        self.assertEqual(cache.stats()['size'], 3)
+
+    def test_get_endpoint_does_not_cache_missing_endpoint(self):
+        session = MagicMock()
+        session.get_endpoint.return_value = None
+        cache = EndpointCache()
+        self.assertIsNone(cache.get_endpoint(session, 'fingerprintA', 'orchestration'))
+        self.assertIsNone(cache.get_endpoint(session, 'fingerprintA', 'orchestration'))
+        self.assertEqual(session.get_endpoint.call_count, 2)
+
+    @patch('osvimdriver.openstack.cache.time.monotonic')
+    def test_get_endpoint_resolves_again_after_ttl(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        session = MagicMock()
+        cache = EndpointCache(ttl_seconds=60)
+        cache.get_endpoint(session, 'fingerprintA', 'orchestration')
+        mock_monotonic.return_value = 170
+        cache.get_endpoint(session, 'fingerprintA', 'orchestration')
+        self.assertEqual(session.get_endpoint.call_count, 2)
@@ -1,9 +1,14 @@
 import os
+import shutil
+import tempfile
 import unittest
+from cryptography.fernet import Fernet
 import yaml
 import tests.unit.openstack.certs as certs
-from osvimdriver.openstack.environment import OpenstackDeploymentLocationTranslator, OpenstackDeploymentLocation, OpenstackPasswordAuth, OS_URL_PROP, AUTH_ENABLED_PROP, AUTH_API_PROP
-from unittest.mock import patch, MagicMock
+from osvimdriver.openstack.environment import OpenstackDeploymentLocationTranslator, OpenstackDeploymentLocation, OpenstackPasswordAuth, OpenstackProperties, LocationGauge, location_gauge, OS_URL_PROP, AUTH_ENABLED_PROP, AUTH_API_PROP
+from osvimdriver.openstack.tokens import TokenCache, CachedPassword
+from osvimdriver.openstack.connections import ConnectionPool, DeadlineHTTPAdapter
+from unittest.mock import patch, MagicMock, ANY
 
 
 class TestOpenstackPasswordAuth(unittest.TestCase):
@@ -21,6 +26,15 @@ class TestOpenstackPasswordAuth(unittest.TestCase):
         self.assertEqual(os_auth, mock_password)
         mock_keystone_password_init.assert_called_with(auth_url='http://testip/identity/v3', username='test', password='secret')
 
+    def test_build_os_auth_with_token_cache(self):
+        token_cache = TokenCache()
+        auth = OpenstackPasswordAuth('identity/v3', auth_properties={'username': 'test', 'password': 'secret'})
+        os_auth = auth.build_os_auth('http://testip', token_cache=token_cache, fingerprint='fingerprintA')
+        self.assertIsInstance(os_auth, CachedPassword)
+        self.assertEqual(os_auth.token_cache, token_cache)
+        self.assertEqual(os_auth.fingerprint, 'fingerprintA')
+        self.assertEqual(os_auth.auth_url, 'http://testip/identity/v3')
+
 
 class TestOpenstackDeploymentLocation(unittest.TestCase):
 
@@ -33,9 +47,59 @@ class TestOpenstackDeploymentLocation(unittest.TestCase):
         location = OpenstackDeploymentLocation('testdl', 'http://testip', mock_auth)
         session = location.create_session()
         mock_auth.build_os_auth.assert_called_once_with('http://testip')
-        mock_keystone_session_init.assert_called_once_with(auth=mock_os_auth)
+        mock_keystone_session_init.assert_called_once_with(auth=mock_os_auth, session=ANY)
         self.assertEqual(session, mock_keystone_session)
 
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    def test_create_session_with_token_cache(self, mock_keystone_session_init):
+        mock_auth = MagicMock()
+        token_cache = TokenCache()
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', mock_auth, token_cache=token_cache)
+        location.create_session()
+        mock_auth.build_os_auth.assert_called_once_with('http://testip', token_cache=token_cache, fingerprint=location.fingerprint)
+        mock_keystone_session_init.assert_called_once_with(auth=mock_auth.build_os_auth.return_value, session=ANY)
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    def test_create_session_with_connection_pool(self, mock_keystone_session_init):
+        mock_auth = MagicMock()
+        mock_connection_pool = MagicMock()
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', mock_auth, connection_pool=mock_connection_pool)
+        location.create_session()
+        mock_keystone_session_init.assert_called_once_with(auth=mock_auth.build_os_auth.return_value, session=mock_connection_pool.session)
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    def test_create_session_without_connection_pool_applies_deadlines(self, mock_keystone_session_init):
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', MagicMock())
+        location.create_session()
+        requests_session = mock_keystone_session_init.call_args[1]['session']
+        self.assertIsInstance(requests_session.get_adapter('https://'), DeadlineHTTPAdapter)
+        self.assertIsInstance(requests_session.get_adapter('http://'), DeadlineHTTPAdapter)
+
+    def test_fingerprint_matches_for_equivalent_locations(self):
+        auth = OpenstackPasswordAuth('identity/v3', auth_properties={'username': 'test', 'password': 'secret'})
+        same_auth = OpenstackPasswordAuth('identity/v3', auth_properties={'password': 'secret', 'username': 'test'})
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', auth, ca_cert='cacert')
+        same_location = OpenstackDeploymentLocation('otherdl', 'http://testip', same_auth, ca_cert='cacert')
+        try:
+            self.assertEqual(location.fingerprint, same_location.fingerprint)
+        finally:
+            location.close()
+            same_location.close()
+
+    def test_fingerprint_differs_for_different_credentials(self):
+        auth = OpenstackPasswordAuth('identity/v3', auth_properties={'username': 'test', 'password': 'secret'})
+        other_auth = OpenstackPasswordAuth('identity/v3', auth_properties={'username': 'test', 'password': 'other'})
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', auth)
+        other_location = OpenstackDeploymentLocation('testdl', 'http://testip', other_auth)
+        other_url_location = OpenstackDeploymentLocation('testdl', 'http://otherip', auth)
+        try:
+            self.assertNotEqual(location.fingerprint, other_location.fingerprint)
+            self.assertNotEqual(location.fingerprint, other_url_location.fingerprint)
+        finally:
+            location.close()
+            other_location.close()
+            other_url_location.close()
+
     @patch('osvimdriver.openstack.environment.keystonesession.Session')
     def test_get_session(self, mock_keystone_session_init):
         mock_os_auth = MagicMock()
@@ -45,7 +109,7 @@ class TestOpenstackDeploymentLocation(unittest.TestCase):
         location = OpenstackDeploymentLocation('testdl', 'http://testip', mock_auth)
         session = location.get_session()
         mock_auth.build_os_auth.assert_called_once_with('http://testip')
-        mock_keystone_session_init.assert_called_once_with(auth=mock_os_auth)
+        mock_keystone_session_init.assert_called_once_with(auth=mock_os_auth, session=ANY)
         self.assertEqual(session, mock_keystone_session)
 
     @patch('osvimdriver.openstack.environment.keystonesession.Session')
@@ -57,11 +121,11 @@ class TestOpenstackDeploymentLocation(unittest.TestCase):
         location = OpenstackDeploymentLocation('testdl', 'http://testip', mock_auth)
         created_session = location.create_session()
         mock_auth.build_os_auth.assert_called_once_with('http://testip')
-        mock_keystone_session_init.assert_called_once_with(auth=mock_os_auth)
+        mock_keystone_session_init.assert_called_once_with(auth=mock_os_auth, session=ANY)
         get_session = location.get_session()
         self.assertEqual(get_session, created_session)
         mock_auth.build_os_auth.assert_called_once_with('http://testip')
-        mock_keystone_session_init.assert_called_once_with(auth=mock_os_auth)
+        mock_keystone_session_init.assert_called_once_with(auth=mock_os_auth, session=ANY)
 
     @patch('osvimdriver.openstack.environment.keystonesession.Session')
     @patch('osvimdriver.openstack.environment.HeatDriver')
@@ -77,6 +141,101 @@ class TestOpenstackDeploymentLocation(unittest.TestCase):
         self.assertEqual(location._OpenstackDeploymentLocation__heat_driver, mock_heat_driver)
         self.assertIsNotNone(location._OpenstackDeploymentLocation__session)
 
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    @patch('osvimdriver.openstack.environment.HeatDriver')
+    def test_get_heat_driver_with_endpoint_cache(self, mock_heat_driver_init, mock_keystone_session_init):
+        mock_session = mock_keystone_session_init.return_value
+        mock_endpoint_cache = MagicMock()
+        mock_endpoint_cache.get_endpoint.return_value = 'http://heat:8004/v1/project'
+        mock_auth = MagicMock()
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', mock_auth, endpoint_cache=mock_endpoint_cache)
+        location.heat_driver
+        mock_endpoint_cache.get_endpoint.assert_called_once_with(mock_session, location.fingerprint, 'orchestration')
+        mock_heat_driver_init.assert_called_once_with(mock_session, endpoint='http://heat:8004/v1/project')
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    def test_get_endpoint(self, mock_keystone_session_init):
+        mock_session = mock_keystone_session_init.return_value
+        mock_endpoint_cache = MagicMock()
+        mock_endpoint_cache.get_endpoint.return_value = 'http://neutron:9696'
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', MagicMock(), endpoint_cache=mock_endpoint_cache)
+        self.assertEqual(location.get_endpoint('network'), 'http://neutron:9696')
+        mock_endpoint_cache.get_endpoint.assert_called_once_with(mock_session, location.fingerprint, 'network')
+
+    def test_get_endpoint_without_endpoint_cache(self):
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', MagicMock())
+        self.assertIsNone(location.get_endpoint('network'))
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    @patch('osvimdriver.openstack.environment.HeatDriver')
+    def test_get_heat_driver_with_status_batching(self, mock_heat_driver_init, mock_keystone_session_init):
+        mock_session = mock_keystone_session_init.return_value
+        status_batching = OpenstackProperties().status_batching
+        status_batching.enabled = True
+        status_batching.window_ms = 50
+        status_batching.max_batch_size = 10
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', MagicMock(), status_batching=status_batching)
+        location.heat_driver
+        mock_heat_driver_init.assert_called_once_with(mock_session, batch_window_seconds=0.05, max_batch_size=10)
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    @patch('osvimdriver.openstack.environment.HeatDriver')
+    def test_get_heat_driver_with_status_batching_disabled(self, mock_heat_driver_init, mock_keystone_session_init):
+        mock_session = mock_keystone_session_init.return_value
+        status_batching = OpenstackProperties().status_batching
+        status_batching.enabled = False
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', MagicMock(), status_batching=status_batching)
+        location.heat_driver
+        mock_heat_driver_init.assert_called_once_with(mock_session)
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    @patch('osvimdriver.openstack.environment.HeatDriver')
+    def test_get_heat_driver_with_stack_cache(self, mock_heat_driver_init, mock_keystone_session_init):
+        mock_session = mock_keystone_session_init.return_value
+        mock_stack_cache = MagicMock()
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', MagicMock(), stack_cache=mock_stack_cache)
+        location.heat_driver
+        mock_heat_driver_init.assert_called_once_with(mock_session, stack_cache=mock_stack_cache, location_fingerprint=location.fingerprint)
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    @patch('osvimdriver.openstack.environment.StackStatusMonitor')
+    def test_stack_status_monitor(self, mock_monitor_init, mock_keystone_session_init):
+        monitor_properties = OpenstackProperties().stack_status_monitor
+        monitor_properties.enabled = True
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', MagicMock(), stack_status_monitor=monitor_properties)
+        location.shared = True
+        self.assertEqual(location.stack_status_monitor, mock_monitor_init.return_value)
+        self.assertEqual(location.stack_status_monitor, mock_monitor_init.return_value)
+        mock_monitor_init.assert_called_once()
+        mock_monitor_init.return_value.start.assert_called_once()
+        location.dispose()
+        mock_monitor_init.return_value.stop.assert_called_once_with(timeout=0)
+
+    @patch('osvimdriver.openstack.environment.StackStatusMonitor')
+    def test_stack_status_monitor_not_shared(self, mock_monitor_init):
+        monitor_properties = OpenstackProperties().stack_status_monitor
+        monitor_properties.enabled = True
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', MagicMock(), stack_status_monitor=monitor_properties)
+        self.assertIsNone(location.stack_status_monitor)
+        mock_monitor_init.assert_not_called()
+
+    @patch('osvimdriver.openstack.environment.StackStatusMonitor')
+    def test_stack_status_monitor_disabled(self, mock_monitor_init):
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', MagicMock(), stack_status_monitor=OpenstackProperties().stack_status_monitor)
+        location.shared = True
+        self.assertIsNone(location.stack_status_monitor)
+        mock_monitor_init.assert_not_called()
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    @patch('osvimdriver.openstack.environment.NeutronDriver')
+    def test_get_neutron_driver_endpoint_resolution_error(self, mock_neutron_driver_init, mock_keystone_session_init):
+        mock_session = mock_keystone_session_init.return_value
+        mock_endpoint_cache = MagicMock()
+        mock_endpoint_cache.get_endpoint.side_effect = Exception('Unauthorized')
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', MagicMock(), endpoint_cache=mock_endpoint_cache)
+        location.neutron_driver
+        mock_neutron_driver_init.assert_called_once_with(mock_session)
+
     @patch('osvimdriver.openstack.environment.keystonesession.Session')
     @patch('osvimdriver.openstack.environment.HeatDriver')
     def test_get_heat_driver_existing(self, mock_heat_driver_init, mock_keystone_session_init):
@@ -132,7 +291,7 @@ class TestOpenstackDeploymentLocation(unittest.TestCase):
         location = OpenstackDeploymentLocation('testdl', 'http://testip', mock_auth, ca_cert=ca_cert, client_cert=client_cert, client_key=client_key)
         try:
             created_session = location.create_session()
-            mock_keystone_session_init.assert_called_once_with(auth=mock_os_auth, verify=location._OpenstackDeploymentLocation__ca_cert_path, cert=(location._OpenstackDeploymentLocation__client_cert_path, location._OpenstackDeploymentLocation__client_key_path))
+            mock_keystone_session_init.assert_called_once_with(auth=mock_os_auth, session=ANY, verify=location._OpenstackDeploymentLocation__ca_cert_path, cert=(location._OpenstackDeploymentLocation__client_cert_path, location._OpenstackDeploymentLocation__client_key_path))
             self.assertTrue(os.path.exists(location._OpenstackDeploymentLocation__ca_cert_path))
             self.assertTrue(os.path.exists(location._OpenstackDeploymentLocation__client_cert_path))
             self.assertTrue(os.path.exists(location._OpenstackDeploymentLocation__client_key_path))
@@ -148,7 +307,7 @@ class TestOpenstackDeploymentLocation(unittest.TestCase):
         location = OpenstackDeploymentLocation('testdl', 'http://testip', mock_auth, ca_cert='cacert', client_cert='clientcert', client_key='clientkey')
         try:
             created_session = location.create_session()
-            mock_keystone_session_init.assert_called_once_with(auth=mock_os_auth, verify=location._OpenstackDeploymentLocation__ca_cert_path, cert=(location._OpenstackDeploymentLocation__client_cert_path, location._OpenstackDeploymentLocation__client_key_path))
+            mock_keystone_session_init.assert_called_once_with(auth=mock_os_auth, session=ANY, verify=location._OpenstackDeploymentLocation__ca_cert_path, cert=(location._OpenstackDeploymentLocation__client_cert_path, location._OpenstackDeploymentLocation__client_key_path))
             self.assertTrue(os.path.exists(location._OpenstackDeploymentLocation__ca_cert_path))
             self.assertTrue(os.path.exists(location._OpenstackDeploymentLocation__client_cert_path))
             self.assertTrue(os.path.exists(location._OpenstackDeploymentLocation__client_key_path))
@@ -159,6 +318,83 @@ class TestOpenstackDeploymentLocation(unittest.TestCase):
         finally:
             location.close()
 
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    def test_create_session_with_cert_store(self, mock_keystone_session_init):
+        mock_cert_store = MagicMock()
+        mock_cert_store.acquire.side_effect = lambda content: '/certs/' + content
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', None, ca_cert='cacert', client_cert='clientcert', client_key='clientkey', cert_store=mock_cert_store)
+        location.create_session()
+        mock_keystone_session_init.assert_called_once_with(auth=None, session=ANY, verify='/certs/cacert', cert=('/certs/clientcert', '/certs/clientkey'))
+        location.close()
+        mock_cert_store.release.assert_any_call('/certs/cacert')
+        mock_cert_store.release.assert_any_call('/certs/clientcert')
+        mock_cert_store.release.assert_any_call('/certs/clientkey')
+
+    @patch('osvimdriver.openstack.environment.tempfile.mkdtemp')
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    def test_create_session_without_certs_does_not_create_workspace(self, mock_keystone_session_init, mock_mkdtemp):
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', None)
+        location.create_session()
+        location.close()
+        mock_mkdtemp.assert_not_called()
+
+    def test_close_shared_location_keeps_files(self):
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', None, ca_cert='cacert')
+        location.shared = True
+        try:
+            location.create_session()
+            location.close()
+            self.assertTrue(os.path.exists(location._OpenstackDeploymentLocation__ca_cert_path))
+            location.dispose()
+            self.assertFalse(os.path.exists(location._OpenstackDeploymentLocation__ca_cert_path))
+        finally:
+            location.dispose()
+
+    def test_dispose_in_use_shared_location_waits_for_close(self):
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', None, ca_cert='cacert')
+        location.shared = True
+        location.acquire()
+        try:
+            location.create_session()
+            location.dispose()
+            self.assertTrue(os.path.exists(location._OpenstackDeploymentLocation__ca_cert_path))
+            location.close()
+            self.assertFalse(os.path.exists(location._OpenstackDeploymentLocation__ca_cert_path))
+        finally:
+            location.dispose()
+
+    def test_context_manager_closes_location(self):
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', None, ca_cert='cacert')
+        with location:
+            location.create_session()
+            ca_cert_path = location._OpenstackDeploymentLocation__ca_cert_path
+            self.assertTrue(os.path.exists(ca_cert_path))
+        self.assertFalse(os.path.exists(ca_cert_path))
+
+    def test_gauge_tracks_live_locations_and_workspaces(self):
+        before = location_gauge.stats()
+        location = OpenstackDeploymentLocation('testdl', 'http://testip', None, ca_cert='cacert')
+        location.create_session()
+        during = location_gauge.stats()
+        self.assertEqual(during['live_locations'], before['live_locations'] + 1)
+        self.assertEqual(during['live_workspaces'], before['live_workspaces'] + 1)
+        location.close()
+        location.close()
+        self.assertEqual(location_gauge.stats(), before)
+
+
+class TestLocationGauge(unittest.TestCase):
+
+    def test_stats(self):
+        gauge = LocationGauge()
+        gauge.location_opened()
+        gauge.location_opened()
+        gauge.workspace_created()
+        gauge.location_disposed()
+        self.assertEqual(gauge.stats(), {'live_locations': 1, 'live_workspaces': 1})
+        gauge.workspace_removed()
+        self.assertEqual(gauge.stats(), {'live_locations': 1, 'live_workspaces': 0})
+
 class TestOpenstackDeploymentLocationTranslator(unittest.TestCase):
 
     def test_from_deployment_location_missing_name(self):
@@ -190,6 +426,322 @@ class TestOpenstackDeploymentLocationTranslator(unittest.TestCase):
         }})
         self.assertIsNone(openstack_location._OpenstackDeploymentLocation__auth)
 
+    def test_from_deployment_location_without_properties_has_no_token_cache(self):
+        translator = OpenstackDeploymentLocationTranslator()
+        openstack_location = translator.from_deployment_location({'name': 'testdl', 'properties': {
+            OS_URL_PROP: 'testip',
+            AUTH_API_PROP: 'identity/v3'
+        }})
+        self.assertIsNone(openstack_location._OpenstackDeploymentLocation__token_cache)
+
+    def test_from_deployment_location_shares_token_cache(self):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.location_registry.enabled = False
+        openstack_properties.token_cache.max_size = 5
+        openstack_properties.token_cache.expiry_margin_seconds = 30
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        deployment_location = {'name': 'testdl', 'properties': {
+            OS_URL_PROP: 'testip',
+            AUTH_API_PROP: 'identity/v3'
+        }}
+        first_location = translator.from_deployment_location(deployment_location)
+        second_location = translator.from_deployment_location(deployment_location)
+        token_cache = first_location._OpenstackDeploymentLocation__token_cache
+        self.assertIsInstance(token_cache, TokenCache)
+        self.assertEqual(token_cache.expiry_margin_seconds, 30)
+        self.assertIs(second_location._OpenstackDeploymentLocation__token_cache, token_cache)
+
+    def test_from_deployment_location_reuses_registered_location(self):
+        translator = OpenstackDeploymentLocationTranslator(OpenstackProperties())
+        deployment_location = {'name': 'testdl', 'properties': {
+            OS_URL_PROP: 'testip',
+            AUTH_API_PROP: 'identity/v3'
+        }}
+        first_location = translator.from_deployment_location(deployment_location)
+        second_location = translator.from_deployment_location(deployment_location)
+        self.assertIs(first_location, second_location)
+        self.assertTrue(first_location.shared)
+
+    def test_from_deployment_location_shares_connection_pool(self):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.location_registry.enabled = False
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        first_location = translator.from_deployment_location({'name': 'testdlA', 'properties': {OS_URL_PROP: 'testipA', AUTH_ENABLED_PROP: False}})
+        second_location = translator.from_deployment_location({'name': 'testdlB', 'properties': {OS_URL_PROP: 'testipB', AUTH_ENABLED_PROP: False}})
+        connection_pool = first_location._OpenstackDeploymentLocation__connection_pool
+        self.assertIsInstance(connection_pool, ConnectionPool)
+        self.assertIs(second_location._OpenstackDeploymentLocation__connection_pool, connection_pool)
+        self.assertEqual(connection_pool._ConnectionPool__tls_sessions.max_size, openstack_properties.ssl_context_cache.max_size)
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    def test_from_deployment_location_shares_cert_store(self, mock_keystone_session_init):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.location_registry.enabled = False
+        openstack_properties.ssl_context_cache.enabled = False
+        openstack_properties.cert_store.directory = os.path.join(tempfile.mkdtemp(), 'certs')
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        try:
+            first_location = translator.from_deployment_location({'name': 'testdlA', 'properties': {OS_URL_PROP: 'testipA', AUTH_ENABLED_PROP: False, 'os_cacert': 'cacert'}})
+            second_location = translator.from_deployment_location({'name': 'testdlB', 'properties': {OS_URL_PROP: 'testipB', AUTH_ENABLED_PROP: False, 'os_cacert': 'cacert'}})
+            first_location.create_session()
+            second_location.create_session()
+            self.assertEqual(first_location._OpenstackDeploymentLocation__ca_cert_path, second_location._OpenstackDeploymentLocation__ca_cert_path)
+            self.assertEqual(os.path.dirname(first_location._OpenstackDeploymentLocation__ca_cert_path), openstack_properties.cert_store.directory)
+            first_location.close()
+            second_location.close()
+            self.assertTrue(os.path.exists(first_location._OpenstackDeploymentLocation__ca_cert_path))
+        finally:
+            shutil.rmtree(os.path.dirname(openstack_properties.cert_store.directory))
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    @patch('osvimdriver.openstack.environment.HeatDriver')
+    def test_from_deployment_location_retry_budget_per_location(self, mock_heat_driver_init, mock_keystone_session_init):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.location_registry.enabled = False
+        openstack_properties.endpoint_cache.enabled = False
+        openstack_properties.retry.max_attempts = 5
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        first_location = translator.from_deployment_location({'name': 'testdlA', 'properties': {OS_URL_PROP: 'testipA', AUTH_ENABLED_PROP: False}})
+        second_location = translator.from_deployment_location({'name': 'testdlB', 'properties': {OS_URL_PROP: 'testipB', AUTH_ENABLED_PROP: False}})
+        first_location.heat_driver
+        first_policy = mock_heat_driver_init.call_args[1]['retry_policy']
+        second_location.heat_driver
+        second_policy = mock_heat_driver_init.call_args[1]['retry_policy']
+        self.assertEqual(first_policy.max_attempts, 5)
+        self.assertIsNot(first_policy.budget, second_policy.budget)
+        self.assertIs(first_policy.metrics, second_policy.metrics)
+        self.assertIn('retries', translator.stats()['retries'])
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    @patch('osvimdriver.openstack.environment.HeatDriver')
+    def test_from_deployment_location_retry_budget_kept_when_location_rebuilt(self, mock_heat_driver_init, mock_keystone_session_init):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.location_registry.enabled = False
+        openstack_properties.endpoint_cache.enabled = False
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        first_location = translator.from_deployment_location({'name': 'testdlA', 'properties': {OS_URL_PROP: 'testipA', AUTH_ENABLED_PROP: False}})
+        first_location.heat_driver
+        first_policy = mock_heat_driver_init.call_args[1]['retry_policy']
+        first_location.close()
+        rebuilt_location = translator.from_deployment_location({'name': 'testdlA', 'properties': {OS_URL_PROP: 'testipA', AUTH_ENABLED_PROP: False}})
+        rebuilt_location.heat_driver
+        rebuilt_policy = mock_heat_driver_init.call_args[1]['retry_policy']
+        self.assertIsNot(first_policy, rebuilt_policy)
+        self.assertIs(first_policy.budget, rebuilt_policy.budget)
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    @patch('osvimdriver.openstack.environment.NeutronDriver')
+    @patch('osvimdriver.openstack.environment.HeatDriver')
+    def test_from_deployment_location_shares_circuit_breaker(self, mock_heat_driver_init, mock_neutron_driver_init, mock_keystone_session_init):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.location_registry.enabled = False
+        openstack_properties.endpoint_cache.enabled = False
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        first_location = translator.from_deployment_location({'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_ENABLED_PROP: False}})
+        second_location = translator.from_deployment_location({'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_ENABLED_PROP: False}})
+        other_location = translator.from_deployment_location({'name': 'otherdl', 'properties': {OS_URL_PROP: 'otherip', AUTH_ENABLED_PROP: False}})
+        self.assertIs(first_location.circuit_breaker, second_location.circuit_breaker)
+        self.assertIsNot(first_location.circuit_breaker, other_location.circuit_breaker)
+        first_location.heat_driver
+        first_location.neutron_driver
+        self.assertIs(mock_heat_driver_init.call_args[1]['circuit_breaker'], first_location.circuit_breaker)
+        self.assertIs(mock_neutron_driver_init.call_args[1]['circuit_breaker'], first_location.circuit_breaker)
+        self.assertEqual([breaker['name'] for breaker in translator.circuit_breakers()], ['testdl', 'otherdl'])
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    @patch('osvimdriver.openstack.environment.NeutronDriver')
+    @patch('osvimdriver.openstack.environment.HeatDriver')
+    def test_from_deployment_location_concurrency_gate(self, mock_heat_driver_init, mock_neutron_driver_init, mock_keystone_session_init):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.location_registry.enabled = False
+        openstack_properties.endpoint_cache.enabled = False
+        openstack_properties.concurrency_limit.max_per_location = 3
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        first_location = translator.from_deployment_location({'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_ENABLED_PROP: False}})
+        other_location = translator.from_deployment_location({'name': 'otherdl', 'properties': {OS_URL_PROP: 'otherip', AUTH_ENABLED_PROP: False}})
+        self.assertIs(first_location.concurrency_gate.scheduler, other_location.concurrency_gate.scheduler)
+        self.assertEqual(first_location.concurrency_gate.scheduler.max_per_location, 3)
+        self.assertNotEqual(first_location.concurrency_gate.key, other_location.concurrency_gate.key)
+        first_location.heat_driver
+        first_location.neutron_driver
+        self.assertIs(mock_heat_driver_init.call_args[1]['concurrency_gate'], first_location.concurrency_gate)
+        self.assertIs(mock_neutron_driver_init.call_args[1]['concurrency_gate'], first_location.concurrency_gate)
+        self.assertEqual(translator.stats()['concurrency']['in_flight'], 0)
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    @patch('osvimdriver.openstack.environment.HeatDriver')
+    def test_from_deployment_location_stack_read_hedging(self, mock_heat_driver_init, mock_keystone_session_init):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.location_registry.enabled = False
+        openstack_properties.endpoint_cache.enabled = False
+        openstack_properties.stack_read_hedging.enabled = True
+        openstack_properties.stack_read_hedging.percentile = 99
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        first_location = translator.from_deployment_location({'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_ENABLED_PROP: False}})
+        second_location = translator.from_deployment_location({'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_ENABLED_PROP: False}})
+        other_location = translator.from_deployment_location({'name': 'otherdl', 'properties': {OS_URL_PROP: 'otherip', AUTH_ENABLED_PROP: False}})
+        self.assertIs(first_location.hedger, second_location.hedger)
+        self.assertIsNot(first_location.hedger, other_location.hedger)
+        self.assertEqual(first_location.hedger.percentile, 99)
+        first_location.heat_driver
+        self.assertIs(mock_heat_driver_init.call_args[1]['hedger'], first_location.hedger)
+        self.assertEqual(translator.stats()['stack_read_hedging']['hedged'], 0)
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    @patch('osvimdriver.openstack.environment.HeatDriver')
+    def test_from_deployment_location_stack_read_hedging_disabled_by_default(self, mock_heat_driver_init, mock_keystone_session_init):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.endpoint_cache.enabled = False
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        location = translator.from_deployment_location({'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_ENABLED_PROP: False}})
+        self.assertIsNone(location.hedger)
+        location.heat_driver
+        self.assertNotIn('hedger', mock_heat_driver_init.call_args[1])
+        self.assertNotIn('stack_read_hedging', translator.stats())
+
+    def test_from_deployment_location_circuit_breaker_disabled(self):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.circuit_breaker.enabled = False
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        location = translator.from_deployment_location({'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_ENABLED_PROP: False}})
+        self.assertIsNone(location.circuit_breaker)
+        self.assertEqual(translator.circuit_breakers(), [])
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    @patch('osvimdriver.openstack.environment.HeatDriver')
+    def test_from_deployment_location_retry_disabled(self, mock_heat_driver_init, mock_keystone_session_init):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.endpoint_cache.enabled = False
+        openstack_properties.retry.enabled = False
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        location = translator.from_deployment_location({'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_ENABLED_PROP: False}})
+        location.heat_driver
+        self.assertNotIn('retry_policy', mock_heat_driver_init.call_args[1])
+
+    def test_stats(self):
+        translator = OpenstackDeploymentLocationTranslator(OpenstackProperties())
+        location = translator.from_deployment_location({'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_API_PROP: 'identity/v3'}})
+        location.close()
+        stats = translator.stats()
+        self.assertIn('live_locations', stats['locations'])
+        self.assertEqual(stats['location_registry']['size'], 1)
+        self.assertIn('size', stats['token_cache'])
+        self.assertIn('requests', stats['connection_pool'])
+        self.assertIn('shared', stats['stack_cache'])
+
+    def test_stats_without_properties(self):
+        translator = OpenstackDeploymentLocationTranslator()
+        stats = translator.stats()
+        self.assertEqual(list(stats.keys()), ['locations'])
+
+    @patch('osvimdriver.openstack.environment.PeriodicTask')
+    def test_from_deployment_location_starts_reaper_once(self, mock_periodic_task_init):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.reaper_interval_seconds = 30
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        deployment_location = {'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_API_PROP: 'identity/v3'}}
+        translator.from_deployment_location(deployment_location)
+        translator.from_deployment_location(deployment_location)
+        mock_periodic_task_init.assert_called_once_with('ovd-location-reaper', 30, translator.reap)
+        mock_periodic_task_init.return_value.start.assert_called_once()
+
+    @patch('osvimdriver.openstack.environment.PeriodicTask')
+    def test_reap_expires_idle_locations(self, mock_periodic_task_init):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.location_registry.idle_timeout_seconds = 60
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        with patch('osvimdriver.openstack.cache.time.monotonic') as mock_monotonic:
+            mock_monotonic.return_value = 100
+            location = translator.from_deployment_location({'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_API_PROP: 'identity/v3'}})
+            location.close()
+            mock_monotonic.return_value = 170
+            translator.reap()
+        self.assertEqual(translator.stats()['location_registry']['size'], 0)
+
+    @patch('osvimdriver.openstack.environment.keystonesession.Session')
+    def test_from_deployment_location_shares_ssl_context(self, mock_keystone_session_init):
+        certs_dir = os.path.dirname(os.path.abspath(certs.__file__))
+        with open(os.path.join(certs_dir, 'ca.cert'), 'r') as f:
+            ca_cert = f.read()
+        openstack_properties = OpenstackProperties()
+        openstack_properties.location_registry.enabled = False
+        openstack_properties.cert_store.enabled = False
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        first_location = translator.from_deployment_location({'name': 'testdlA', 'properties': {OS_URL_PROP: 'testipA', AUTH_ENABLED_PROP: False, 'os_cacert': ca_cert}})
+        second_location = translator.from_deployment_location({'name': 'testdlB', 'properties': {OS_URL_PROP: 'testipB', AUTH_ENABLED_PROP: False, 'os_cacert': ca_cert}})
+        try:
+            first_location.create_session()
+            second_location.create_session()
+            first_session = mock_keystone_session_init.call_args_list[0][1]['session']
+            second_session = mock_keystone_session_init.call_args_list[1][1]['session']
+            self.assertIs(first_session, second_session)
+            self.assertIsNotNone(first_session.get_adapter('https://testipA').ssl_context)
+            self.assertEqual(translator.stats()['ssl_context_cache']['size'], 1)
+        finally:
+            first_location.close()
+            second_location.close()
+
+    def test_from_deployment_location_with_shared_token_store(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            openstack_properties = OpenstackProperties()
+            openstack_properties.token_cache.shared_store.enabled = True
+            openstack_properties.token_cache.shared_store.path = os.path.join(tmp_dir, 'tokens.db')
+            translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+            with patch.dict(os.environ, {'OVD_TOKEN_STORE_KEY': Fernet.generate_key().decode('utf-8')}):
+                location = translator.from_deployment_location({'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_API_PROP: 'identity/v3'}})
+            token_cache = location._OpenstackDeploymentLocation__token_cache
+            self.assertEqual(token_cache.shared_store.path, openstack_properties.token_cache.shared_store.path)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    @patch('osvimdriver.openstack.environment.SharedTokenStore')
+    def test_from_deployment_location_shared_token_store_unavailable(self, mock_shared_token_store_init):
+        mock_shared_token_store_init.side_effect = PermissionError('denied')
+        openstack_properties = OpenstackProperties()
+        openstack_properties.token_cache.shared_store.enabled = True
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        location = translator.from_deployment_location({'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_API_PROP: 'identity/v3'}})
+        token_cache = location._OpenstackDeploymentLocation__token_cache
+        self.assertIsInstance(token_cache, TokenCache)
+        self.assertIsNone(token_cache.shared_store)
+
+    def test_from_deployment_location_shared_token_store_without_key(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            openstack_properties = OpenstackProperties()
+            openstack_properties.token_cache.shared_store.enabled = True
+            openstack_properties.token_cache.shared_store.path = os.path.join(tmp_dir, 'tokens.db')
+            translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+            with patch.dict(os.environ, {}, clear=True):
+                location = translator.from_deployment_location({'name': 'testdl', 'properties': {OS_URL_PROP: 'testip', AUTH_API_PROP: 'identity/v3'}})
+            self.assertIsNone(location._OpenstackDeploymentLocation__token_cache.shared_store)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_from_deployment_location_registry_disabled(self):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.location_registry.enabled = False
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        deployment_location = {'name': 'testdl', 'properties': {
+            OS_URL_PROP: 'testip',
+            AUTH_API_PROP: 'identity/v3'
+        }}
+        first_location = translator.from_deployment_location(deployment_location)
+        second_location = translator.from_deployment_location(deployment_location)
+        self.assertIsNot(first_location, second_location)
+        self.assertFalse(first_location.shared)
+
+    def test_from_deployment_location_token_cache_disabled(self):
+        openstack_properties = OpenstackProperties()
+        openstack_properties.token_cache.enabled = False
+        translator = OpenstackDeploymentLocationTranslator(openstack_properties)
+        openstack_location = translator.from_deployment_location({'name': 'testdl', 'properties': {
+            OS_URL_PROP: 'testip',
+            AUTH_API_PROP: 'identity/v3'
+        }})
+        self.assertIsNone(openstack_location._OpenstackDeploymentLocation__token_cache)
+
     def test_from_deployment_location_auth_enabled_not_a_bool(self):
         translator = OpenstackDeploymentLocationTranslator()
         with self.assertRaises(ValueError) as context:
@@ -0,0 +1,136 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+from osvimdriver.openstack.limiter import FairScheduler, ConcurrencyLimitError
+from osvimdriver.openstack.deadline import deadline
+
+
+class TestFairScheduler(unittest.TestCase):
+
+    def __start_waiting(self, scheduler, key, name, granted):
+        def acquire():
+            scheduler.acquire(key, name)
+            granted.append(name)
+        thread = threading.Thread(target=acquire, daemon=True)
+        thread.start()
+        return thread
+
+    def __wait_for_queued(self, scheduler, queued):
+        for _ in range(200):
+            if scheduler.stats()['queued'] == queued:
+                return
+            threading.Event().wait(0.01)
+        self.fail('Expected {0} queued requests'.format(queued))
+
+    def test_acquire_without_waiting(self):
+        scheduler = FairScheduler(max_per_location=2, max_total=2)
+        scheduler.acquire('a', 'dlA')
+        scheduler.acquire('a', 'dlA')
+        self.assertEqual(scheduler.stats()['in_flight'], 2)
+        scheduler.release('a')
+        scheduler.release('a')
+        self.assertEqual(scheduler.stats()['in_flight'], 0)
+
+    def test_acquire_times_out_when_location_is_busy(self):
+        scheduler = FairScheduler(max_per_location=1, max_total=10, max_wait_seconds=0.05)
+        scheduler.acquire('a', 'dlA')
+        with self.assertRaises(ConcurrencyLimitError) as context:
+            scheduler.acquire('a', 'dlA')
+        self.assertIn('dlA', str(context.exception))
+        location_stats = scheduler.stats()['locations'][0]
+        self.assertEqual(location_stats['timeouts'], 1)
+        self.assertEqual(location_stats['queued'], 0)
+
+    def test_acquire_waits_no_longer_than_deadline(self):
+        scheduler = FairScheduler(max_per_location=1, max_total=10, max_wait_seconds=60)
+        scheduler.acquire('a', 'dlA')
+        with deadline('poll', 0.05):
+            with self.assertRaises(ConcurrencyLimitError):
+                scheduler.acquire('a', 'dlA')
+
+    def test_other_locations_not_held_up_by_busy_location(self):
+        scheduler = FairScheduler(max_per_location=1, max_total=10, max_wait_seconds=5)
+        scheduler.acquire('a', 'dlA')
+        granted = []
+        self.__start_waiting(scheduler, 'a', 'dlA', granted)
+        self.__wait_for_queued(scheduler, 1)
+        scheduler.acquire('b', 'dlB')
+        self.assertEqual(granted, [])
+        scheduler.release('a')
+        self.__wait_for_queued(scheduler, 0)
+
+    def __release_in_turn(self, scheduler, holder, granted, count):
+        keys = {'dlA': 'a', 'dlB': 'b', 'dlC': 'c'}
+        for released in range(count):
+            scheduler.release(holder)
+            self.__wait_for_granted(granted, released + 1)
+            holder = keys[granted[-1]]
+
+    def __wait_for_granted(self, granted, count):
+        for _ in range(200):
+            if len(granted) == count:
+                return
+            threading.Event().wait(0.01)
+        self.fail('Expected {0} granted requests'.format(count))
+
+    def test_queued_locations_take_turns(self):
+        scheduler = FairScheduler(max_per_location=10, max_total=1, max_wait_seconds=5)
+        scheduler.acquire('a', 'dlA')
+        granted = []
+        for queued in range(1, 4):
+            self.__start_waiting(scheduler, 'a', 'dlA', granted)
+            self.__wait_for_queued(scheduler, queued)
+        self.__start_waiting(scheduler, 'b', 'dlB', granted)
+        self.__wait_for_queued(scheduler, 4)
+        self.__release_in_turn(scheduler, 'a', granted, 4)
+        # dlB goes ahead of the requests dlA queued before it, as dlA has already had a turn
+        self.assertEqual(granted, ['dlB', 'dlA', 'dlA', 'dlA'])
+
+    def test_weights(self):
+        scheduler = FairScheduler(max_per_location=10, max_total=1, max_wait_seconds=5, weights={'dlA': 2})
+        scheduler.acquire('c', 'dlC')
+        granted = []
+        for queued in range(0, 6, 2):
+            self.__start_waiting(scheduler, 'a', 'dlA', granted)
+            self.__wait_for_queued(scheduler, queued + 1)
+            self.__start_waiting(scheduler, 'b', 'dlB', granted)
+            self.__wait_for_queued(scheduler, queued + 2)
+        self.__release_in_turn(scheduler, 'c', granted, 6)
+        self.assertEqual(granted[:3].count('dlA'), 2)
+        self.assertEqual(sorted(granted), ['dlA', 'dlA', 'dlA', 'dlB', 'dlB', 'dlB'])
+
+    def test_stats_record_waits(self):
+        scheduler = FairScheduler(max_per_location=1, max_total=10, max_wait_seconds=5)
+        scheduler.acquire('a', 'dlA')
+        granted = []
+        self.__start_waiting(scheduler, 'a', 'dlA', granted)
+        self.__wait_for_queued(scheduler, 1)
+        threading.Event().wait(0.05)
+        scheduler.release('a')
+        self.__wait_for_granted(granted, 1)
+        location_stats = scheduler.stats()['locations'][0]
+        self.assertEqual(location_stats['name'], 'dlA')
+        self.assertEqual(location_stats['waited'], 1)
+        self.assertEqual(location_stats['max_queue_depth'], 1)
+        self.assertGreater(location_stats['longest_wait_seconds'], 0)
+
+    def test_idle_locations_forgotten(self):
+        scheduler = FairScheduler(max_tracked_locations=1)
+        scheduler.acquire('a', 'dlA')
+        scheduler.acquire('b', 'dlB')
+        scheduler.release('a')
+        self.assertEqual([location['name'] for location in scheduler.stats()['locations']], ['dlB'])
+
+    def test_gate(self):
+        scheduler = FairScheduler()
+        gate = scheduler.gate('a', 'dlA')
+        request = MagicMock(return_value='result')
+        self.assertEqual(gate.call('get_stack', request), 'result')
+        self.assertEqual(scheduler.stats()['in_flight'], 0)
+
+    def test_gate_releases_on_error(self):
+        scheduler = FairScheduler()
+        gate = scheduler.gate('a', 'dlA')
+        with self.assertRaises(ValueError):
+            gate.call('get_stack', MagicMock(side_effect=ValueError('failed')))
+        self.assertEqual(scheduler.stats()['in_flight'], 0)
@@ -0,0 +1,119 @@
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+from osvimdriver.openstack.registry import OpenstackLocationRegistry, deployment_location_fingerprint
+
+
+class TestDeploymentLocationFingerprint(unittest.TestCase):
+
+    def test_fingerprint_ignores_key_order(self):
+        first = deployment_location_fingerprint({'name': 'testdl', 'properties': {'a': 1, 'b': 2}})
+        second = deployment_location_fingerprint({'properties': {'b': 2, 'a': 1}, 'name': 'testdl'})
+        self.assertEqual(first, second)
+
+    def test_fingerprint_changes_with_properties(self):
+        first = deployment_location_fingerprint({'name': 'testdl', 'properties': {'a': 1}})
+        second = deployment_location_fingerprint({'name': 'testdl', 'properties': {'a': 2}})
+        self.assertNotEqual(first, second)
+
+
+class TestOpenstackLocationRegistry(unittest.TestCase):
+
+    def test_get_or_create_reuses_location(self):
+        location_factory = MagicMock()
+        registry = OpenstackLocationRegistry()
+        first = registry.get_or_create({'name': 'testdl'}, location_factory)
+        second = registry.get_or_create({'name': 'testdl'}, location_factory)
+        self.assertIs(first, second)
+        self.assertTrue(first.shared)
+        location_factory.assert_called_once_with({'name': 'testdl'})
+        self.assertEqual(registry.stats()['hits'], 1)
+        self.assertEqual(registry.stats()['misses'], 1)
+
+    def test_get_or_create_with_changed_payload_creates_location(self):
+        location_factory = MagicMock(side_effect=lambda dl: MagicMock(name=dl['name']))
+        registry = OpenstackLocationRegistry()
+        first = registry.get_or_create({'name': 'testdl', 'properties': {'a': 1}}, location_factory)
+        second = registry.get_or_create({'name': 'testdl', 'properties': {'a': 2}}, location_factory)
+        self.assertIsNot(first, second)
+        self.assertEqual(location_factory.call_count, 2)
+
+    def test_get_or_create_does_not_register_invalid_location(self):
+        location_factory = MagicMock(side_effect=ValueError('invalid'))
+        registry = OpenstackLocationRegistry()
+        with self.assertRaises(ValueError):
+            registry.get_or_create({'name': 'testdl'}, location_factory)
+        self.assertEqual(registry.stats()['size'], 0)
+
+    def test_get_or_create_evicts_least_recently_used(self):
+        first_location = MagicMock()
+        location_factory = MagicMock(side_effect=[first_location, MagicMock()])
+        registry = OpenstackLocationRegistry(max_size=1)
+        registry.get_or_create({'name': 'testdlA'}, location_factory)
+        registry.get_or_create({'name': 'testdlB'}, location_factory)
+        first_location.dispose.assert_called_once()
+        self.assertEqual(registry.stats()['size'], 1)
+
+    @patch('osvimdriver.openstack.cache.time.monotonic')
+    def test_get_or_create_evicts_idle_location(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        idle_location = MagicMock()
+        location_factory = MagicMock(side_effect=[idle_location, MagicMock()])
+        registry = OpenstackLocationRegistry(idle_timeout_seconds=60)
+        registry.get_or_create({'name': 'testdlA'}, location_factory)
+        mock_monotonic.return_value = 170
+        registry.get_or_create({'name': 'testdlB'}, location_factory)
+        idle_location.dispose.assert_called_once()
+        self.assertEqual(registry.stats()['size'], 1)
+
+    def test_get_or_create_acquires_location(self):
+        location = MagicMock()
+        registry = OpenstackLocationRegistry()
+        registry.get_or_create({'name': 'testdl'}, MagicMock(return_value=location))
+        registry.get_or_create({'name': 'testdl'}, MagicMock(return_value=location))
+        self.assertEqual(location.acquire.call_count, 2)
+
+    @patch('osvimdriver.openstack.cache.time.monotonic')
+    def test_expire_disposes_idle_locations(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        location = MagicMock()
+        registry = OpenstackLocationRegistry(idle_timeout_seconds=60)
+        registry.get_or_create({'name': 'testdl'}, MagicMock(return_value=location))
+        mock_monotonic.return_value = 170
+        self.assertEqual(registry.expire(), 1)
+        location.dispose.assert_called_once()
+
+    @patch('osvimdriver.openstack.cache.time.monotonic')
+    def test_expire_waits_for_location_being_acquired(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        location = MagicMock()
+        registry = OpenstackLocationRegistry(idle_timeout_seconds=60)
+        registry.get_or_create({'name': 'testdl'}, MagicMock(return_value=location))
+        acquiring = threading.Event()
+        release_acquire = threading.Event()
+        def acquire():
+            acquiring.set()
+            release_acquire.wait(5)
+            return location
+        location.acquire.side_effect = acquire
+        mock_monotonic.return_value = 159
+        getter = threading.Thread(target=registry.get_or_create, args=({'name': 'testdl'}, MagicMock()))
+        getter.start()
+        acquiring.wait(5)
+        # Idle for longer than the timeout by now, but found by the request above before it could be reaped
+        mock_monotonic.return_value = 161
+        reaper = threading.Thread(target=registry.expire)
+        reaper.start()
+        reaper.join(0.1)
+        self.assertTrue(reaper.is_alive())
+        release_acquire.set()
+        getter.join(5)
+        reaper.join(5)
+        location.dispose.assert_not_called()
+
+    def test_clear_disposes_locations(self):
+        location = MagicMock()
+        registry = OpenstackLocationRegistry()
+        registry.get_or_create({'name': 'testdl'}, MagicMock(return_value=location))
+        registry.clear()
+        location.dispose.assert_called_once()
@@ -0,0 +1,181 @@
+import unittest
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+from keystoneauth1 import exceptions as keystoneexceptions
+from heatclient import exc as heatexc
+from neutronclient.common import exceptions as neutronexceptions
+from osvimdriver.openstack.deadline import deadline, DeadlineExceededError
+from osvimdriver.openstack.retry import RetryPolicy, RetryBudget, RetryBudgetRegistry, RetryMetrics, parse_retry_after, note_retry_after, take_retry_after
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        sleep_patcher = patch('osvimdriver.openstack.retry.time.sleep')
+        self.mock_sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+        take_retry_after()
+
+    def test_call_success(self):
+        policy = RetryPolicy()
+        self.assertEqual(policy.call('get_stack', lambda: 'result'), 'result')
+        self.mock_sleep.assert_not_called()
+
+    def test_call_retries_service_unavailable(self):
+        request = MagicMock(side_effect=[heatexc.HTTPServiceUnavailable(), 'result'])
+        policy = RetryPolicy(base_delay_seconds=1)
+        self.assertEqual(policy.call('get_stack', request), 'result')
+        self.assertEqual(request.call_count, 2)
+        self.mock_sleep.assert_called_once()
+        self.assertLessEqual(self.mock_sleep.call_args[0][0], 1)
+        self.assertEqual(policy.metrics.stats()['retries'], 1)
+        self.assertEqual(policy.metrics.stats()['recovered'], 1)
+
+    def test_call_retries_too_many_requests(self):
+        request = MagicMock(side_effect=[neutronexceptions.NeutronClientException(status_code=429), 'result'])
+        policy = RetryPolicy()
+        self.assertEqual(policy.call('get_network', request), 'result')
+
+    def test_call_retries_connection_failure(self):
+        request = MagicMock(side_effect=[keystoneexceptions.ConnectFailure(), 'result'])
+        policy = RetryPolicy()
+        self.assertEqual(policy.call('get_stack', request), 'result')
+
+    def test_call_does_not_retry_client_errors(self):
+        request = MagicMock(side_effect=heatexc.HTTPNotFound())
+        policy = RetryPolicy()
+        with self.assertRaises(heatexc.HTTPNotFound):
+            policy.call('get_stack', request)
+        request.assert_called_once()
+        self.mock_sleep.assert_not_called()
+
+    def test_call_gives_up_after_max_attempts(self):
+        request = MagicMock(side_effect=heatexc.HTTPServiceUnavailable())
+        policy = RetryPolicy(max_attempts=3)
+        with self.assertRaises(heatexc.HTTPServiceUnavailable):
+            policy.call('get_stack', request)
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(policy.metrics.stats()['exhausted'], 1)
+
+    def test_call_backoff_grows(self):
+        request = MagicMock(side_effect=[heatexc.HTTPServiceUnavailable(), heatexc.HTTPServiceUnavailable(), 'result'])
+        policy = RetryPolicy(base_delay_seconds=1, max_delay_seconds=10)
+        with patch('osvimdriver.openstack.retry.random.uniform', side_effect=lambda low, high: high):
+            policy.call('get_stack', request)
+        self.assertEqual([c[0][0] for c in self.mock_sleep.call_args_list], [1, 2])
+
+    def test_call_not_idempotent_only_retries_rejections(self):
+        policy = RetryPolicy()
+        request = MagicMock(side_effect=keystoneexceptions.ConnectFailure())
+        with self.assertRaises(keystoneexceptions.ConnectFailure):
+            policy.call('create_stack', request, idempotent=False)
+        request.assert_called_once()
+        request = MagicMock(side_effect=[heatexc.HTTPException(code=429), 'result'])
+        self.assertEqual(policy.call('create_stack', request, idempotent=False), 'result')
+
+    def test_call_waits_for_retry_after(self):
+        def rejected():
+            note_retry_after(MagicMock(status_code=503, headers={'Retry-After': '7'}))
+            raise heatexc.HTTPServiceUnavailable()
+        calls = iter([rejected, lambda: 'result'])
+        policy = RetryPolicy()
+        self.assertEqual(policy.call('get_stack', lambda: next(calls)()), 'result')
+        self.mock_sleep.assert_called_once_with(7.0)
+        self.assertEqual(policy.metrics.stats()['retry_after_waits'], 1)
+
+    def test_call_does_not_wait_for_long_retry_after(self):
+        def rejected():
+            note_retry_after(MagicMock(status_code=429, headers={'Retry-After': '120'}))
+            raise heatexc.HTTPException(code=429)
+        policy = RetryPolicy(max_retry_after_seconds=30)
+        with self.assertRaises(heatexc.HTTPException):
+            policy.call('get_stack', rejected)
+        self.mock_sleep.assert_not_called()
+
+    def test_call_stops_retrying_when_budget_spent(self):
+        metrics = RetryMetrics()
+        policy = RetryPolicy(max_attempts=5, budget=RetryBudget(burst=2, ratio=0.5), metrics=metrics)
+        request = MagicMock(side_effect=heatexc.HTTPServiceUnavailable())
+        with self.assertRaises(heatexc.HTTPServiceUnavailable):
+            policy.call('get_stack', request)
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(metrics.stats()['budget_exhausted'], 1)
+        # Earned back by successful requests
+        policy.call('get_stack', lambda: 'result')
+        policy.call('get_stack', lambda: 'result')
+        request = MagicMock(side_effect=[heatexc.HTTPServiceUnavailable(), 'result'])
+        self.assertEqual(policy.call('get_stack', request), 'result')
+
+
+    def test_call_not_retried_beyond_deadline(self):
+        def rejected():
+            note_retry_after(MagicMock(status_code=503, headers={'Retry-After': '20'}))
+            raise heatexc.HTTPServiceUnavailable()
+        policy = RetryPolicy()
+        with deadline('poll', 10):
+            with self.assertRaises(heatexc.HTTPServiceUnavailable):
+                policy.call('get_stack', rejected)
+        self.mock_sleep.assert_not_called()
+
+    def test_call_does_not_retry_driver_errors(self):
+        request = MagicMock(side_effect=DeadlineExceededError('Out of time'))
+        with self.assertRaises(DeadlineExceededError):
+            RetryPolicy().call('get_stack', request)
+        request.assert_called_once()
+
+
+class TestRetryBudget(unittest.TestCase):
+
+    def test_burst_then_earned(self):
+        budget = RetryBudget(burst=1, ratio=0.5)
+        self.assertTrue(budget.try_retry())
+        self.assertFalse(budget.try_retry())
+        budget.succeeded()
+        self.assertFalse(budget.try_retry())
+        budget.succeeded()
+        self.assertTrue(budget.try_retry())
+
+    def test_limited_to_burst(self):
+        budget = RetryBudget(burst=1, ratio=1)
+        for _ in range(5):
+            budget.succeeded()
+        self.assertTrue(budget.try_retry())
+        self.assertFalse(budget.try_retry())
+
+
+class TestRetryBudgetRegistry(unittest.TestCase):
+
+    def test_get_shares_budget_per_fingerprint(self):
+        registry = RetryBudgetRegistry(burst=1, ratio=0.5)
+        budget = registry.get('fingerprintA')
+        self.assertIs(registry.get('fingerprintA'), budget)
+        self.assertIsNot(registry.get('fingerprintB'), budget)
+        self.assertEqual(budget.burst, 1)
+        self.assertEqual(budget.ratio, 0.5)
+
+    def test_spent_budget_kept_for_fingerprint(self):
+        registry = RetryBudgetRegistry(burst=1)
+        self.assertTrue(registry.get('fingerprintA').try_retry())
+        self.assertFalse(registry.get('fingerprintA').try_retry())
+
+
+class TestRetryAfter(unittest.TestCase):
+
+    def test_parse_seconds(self):
+        self.assertEqual(parse_retry_after('5'), 5)
+
+    def test_parse_date(self):
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=60)
+        self.assertAlmostEqual(parse_retry_after(format_datetime(retry_at, usegmt=True)), 60, delta=2)
+
+    def test_parse_invalid(self):
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after('soon'))
+
+    def test_note_only_kept_for_retryable_responses(self):
+        note_retry_after(MagicMock(status_code=200, headers={'Retry-After': '5'}))
+        self.assertIsNone(take_retry_after())
+        note_retry_after(MagicMock(status_code=503, headers={'Retry-After': '5'}))
+        self.assertEqual(take_retry_after(), 5)
+        self.assertIsNone(take_retry_after())
@@ -0,0 +1,30 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+from osvimdriver.openstack.tasks import PeriodicTask
+
+
+class TestPeriodicTask(unittest.TestCase):
+
+    def test_init_invalid_interval(self):
+        with self.assertRaises(ValueError) as context:
+            PeriodicTask('test', 0, MagicMock())
+        self.assertEqual(str(context.exception), 'interval_seconds must be greater than 0')
+
+    def test_runs_task_until_stopped(self):
+        called = threading.Event()
+        task = MagicMock(side_effect=lambda: called.set())
+        periodic_task = PeriodicTask('test', 0.01, task)
+        periodic_task.start()
+        try:
+            self.assertTrue(called.wait(2))
+            self.assertTrue(periodic_task.running)
+        finally:
+            periodic_task.stop(timeout=2)
+        self.assertFalse(periodic_task.running)
+
+    def test_run_once_handles_error(self):
+        task = MagicMock(side_effect=ValueError('failed'))
+        periodic_task = PeriodicTask('test', 1, task)
+        periodic_task.run_once()
+        task.assert_called_once()
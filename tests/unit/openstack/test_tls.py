@@ -0,0 +1,95 @@
+import os
+import ssl
+import unittest
+import tests.unit.openstack.certs as certs
+from unittest.mock import patch, MagicMock
+from osvimdriver.openstack.tls import SSLContextCache, ResumableSSLContext, ResumableSSLSocket, tls_fingerprint
+
+
+class TestTlsFingerprint(unittest.TestCase):
+
+    def test_fingerprint_changes_with_certs(self):
+        self.assertEqual(tls_fingerprint('ca'), tls_fingerprint('ca'))
+        self.assertNotEqual(tls_fingerprint('ca'), tls_fingerprint('other-ca'))
+        self.assertNotEqual(tls_fingerprint('ca'), tls_fingerprint('ca', client_cert='cert'))
+
+
+class TestSSLContextCache(unittest.TestCase):
+
+    def setUp(self):
+        self.certs_dir = os.path.dirname(os.path.abspath(certs.__file__))
+        with open(os.path.join(self.certs_dir, 'ca.cert'), 'r') as f:
+            self.ca_cert = f.read()
+
+    def test_get_missing_fingerprint(self):
+        with self.assertRaises(ValueError) as context:
+            SSLContextCache().get(ca_cert=self.ca_cert)
+        self.assertEqual(str(context.exception), 'fingerprint must be provided')
+
+    def test_get_reuses_context(self):
+        cache = SSLContextCache()
+        fingerprint = tls_fingerprint(self.ca_cert)
+        first = cache.get(ca_cert=self.ca_cert, fingerprint=fingerprint)
+        second = cache.get(ca_cert=self.ca_cert, fingerprint=fingerprint)
+        self.assertIs(first, second)
+        self.assertIsInstance(first, ResumableSSLContext)
+        self.assertEqual(first.verify_mode, ssl.CERT_REQUIRED)
+        self.assertEqual(len(first.get_ca_certs()), 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_get_builds_context_per_fingerprint(self):
+        cache = SSLContextCache()
+        first = cache.get(ca_cert=self.ca_cert, fingerprint=tls_fingerprint(self.ca_cert))
+        second = cache.get(ca_cert=self.ca_cert, client_cert_path=os.path.join(self.certs_dir, 'client.cert'), client_key_path=os.path.join(self.certs_dir, 'client.key'),
+                           fingerprint=tls_fingerprint(self.ca_cert, client_cert='cert', client_key='key'))
+        self.assertIsNot(first, second)
+        self.assertEqual(cache.stats()['size'], 2)
+
+    @patch('osvimdriver.openstack.tls.certifi.where')
+    def test_get_with_client_cert_only_trusts_certifi_bundle(self, mock_where):
+        mock_where.return_value = os.path.join(self.certs_dir, 'ca.cert')
+        cache = SSLContextCache()
+        context = cache.get(client_cert_path=os.path.join(self.certs_dir, 'client.cert'), client_key_path=os.path.join(self.certs_dir, 'client.key'),
+                            fingerprint=tls_fingerprint(client_cert='cert', client_key='key'))
+        mock_where.assert_called_once()
+        self.assertEqual(len(context.get_ca_certs()), 1)
+
+    def test_get_invalid_ca_cert(self):
+        cache = SSLContextCache()
+        with self.assertRaises(ssl.SSLError):
+            cache.get(ca_cert='not a cert', fingerprint=tls_fingerprint('not a cert'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+
+class TestResumableSSLContext(unittest.TestCase):
+
+    def test_wraps_with_resumable_socket(self):
+        context = ResumableSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        self.assertIs(context.sslsocket_class, ResumableSSLSocket)
+
+    @patch('osvimdriver.openstack.tls.ssl.SSLContext.wrap_socket')
+    def test_wrap_socket_resumes_session_per_host(self, mock_wrap_socket):
+        session = MagicMock(has_ticket=True)
+        context = ResumableSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        context.wrap_socket(MagicMock(), server_hostname='heat')
+        self.assertIsNone(mock_wrap_socket.call_args[1]['session'])
+        context.remember_session('heat', session)
+        context.wrap_socket(MagicMock(), server_hostname='heat')
+        self.assertIs(mock_wrap_socket.call_args[1]['session'], session)
+        context.wrap_socket(MagicMock(), server_hostname='keystone')
+        self.assertIsNone(mock_wrap_socket.call_args[1]['session'])
+
+    def test_remember_session_ignores_sessions_without_ticket(self):
+        context = ResumableSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        context.remember_session('heat', None)
+        context.remember_session('heat', MagicMock(has_ticket=False))
+        self.assertEqual(context.session_count(), 0)
+
+    @patch('osvimdriver.openstack.tls.ssl.SSLContext.wrap_socket')
+    def test_wrap_socket_forgets_session_on_error(self, mock_wrap_socket):
+        context = ResumableSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        context.remember_session('heat', MagicMock(has_ticket=True))
+        mock_wrap_socket.side_effect = ssl.SSLError('failed')
+        with self.assertRaises(ssl.SSLError):
+            context.wrap_socket(MagicMock(), server_hostname='heat')
+        self.assertEqual(context.session_count(), 0)
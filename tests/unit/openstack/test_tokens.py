@@ -0,0 +1,275 @@
+import unittest
+import datetime
+import json
+import threading
+import time
+from unittest.mock import patch, MagicMock
+from keystoneauth1.identity import v3 as keystonev3
+from osvimdriver.openstack.tokens import TokenCache, CachedPassword, TokenRefresher, serialize_auth_ref
+from osvimdriver.openstack.deadline import deadline, DeadlineExceededError
+
+
+def build_auth_ref(token, expires_in_seconds):
+    expires = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=expires_in_seconds)
+    auth_ref = MagicMock(auth_token=token, expires=expires)
+    auth_ref._data = {'token': {'expires_at': expires.isoformat(), 'methods': ['password']}}
+    return auth_ref
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def test_put_and_get(self):
+        cache = TokenCache(max_size=10, expiry_margin_seconds=60)
+        expires_at = datetime.datetime.now().timestamp() + 3600
+        cache.put('fingerprintA', 'stateA', expires_at)
+        self.assertEqual(cache.get('fingerprintA'), 'stateA')
+        self.assertIsNone(cache.get('fingerprintB'))
+
+    def test_put_ignores_tokens_within_expiry_margin(self):
+        cache = TokenCache(max_size=10, expiry_margin_seconds=60)
+        expires_at = datetime.datetime.now().timestamp() + 30
+        cache.put('fingerprintA', 'stateA', expires_at)
+        self.assertIsNone(cache.get('fingerprintA'))
+
+    def test_put_evicts_least_recently_used(self):
+        cache = TokenCache(max_size=1, expiry_margin_seconds=60)
+        expires_at = datetime.datetime.now().timestamp() + 3600
+        cache.put('fingerprintA', 'stateA', expires_at)
+        cache.put('fingerprintB', 'stateB', expires_at)
+        self.assertIsNone(cache.get('fingerprintA'))
+        self.assertEqual(cache.get('fingerprintB'), 'stateB')
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_invalidate(self):
+        cache = TokenCache()
+        cache.put('fingerprintA', 'stateA', datetime.datetime.now().timestamp() + 3600)
+        cache.invalidate('fingerprintA')
+        self.assertIsNone(cache.get('fingerprintA'))
+
+    def test_get_falls_back_to_shared_store(self):
+        shared_store = MagicMock()
+        expires_at = datetime.datetime.now().timestamp() + 3600
+        shared_store.get.return_value = ('stateA', expires_at)
+        cache = TokenCache(shared_store=shared_store)
+        self.assertEqual(cache.get('fingerprintA'), 'stateA')
+        self.assertEqual(cache.get('fingerprintA'), 'stateA')
+        shared_store.get.assert_called_once_with('fingerprintA')
+
+    def test_get_ignores_shared_token_within_expiry_margin(self):
+        shared_store = MagicMock()
+        shared_store.get.return_value = ('stateA', datetime.datetime.now().timestamp() + 30)
+        cache = TokenCache(expiry_margin_seconds=60, shared_store=shared_store)
+        self.assertIsNone(cache.get('fingerprintA'))
+
+    def test_get_survives_shared_store_error(self):
+        shared_store = MagicMock()
+        shared_store.get.side_effect = Exception('locked')
+        cache = TokenCache(shared_store=shared_store)
+        self.assertIsNone(cache.get('fingerprintA'))
+
+    def test_put_and_invalidate_shared_store(self):
+        shared_store = MagicMock()
+        expires_at = datetime.datetime.now().timestamp() + 3600
+        cache = TokenCache(shared_store=shared_store)
+        cache.put('fingerprintA', 'stateA', expires_at)
+        shared_store.put.assert_called_once_with('fingerprintA', 'stateA', expires_at)
+        cache.invalidate('fingerprintA')
+        shared_store.invalidate.assert_called_once_with('fingerprintA')
+
+    def test_lock_uses_shared_store(self):
+        shared_store = MagicMock()
+        cache = TokenCache(shared_store=shared_store)
+        with cache.lock('fingerprintA'):
+            shared_store.lock.assert_called_once_with('fingerprintA')
+            shared_store.lock.return_value.__enter__.assert_called_once()
+
+    def test_lock_is_single_flight_per_fingerprint(self):
+        cache = TokenCache()
+        events = []
+        def lock_and_record(fingerprint):
+            with cache.lock(fingerprint):
+                events.append(fingerprint)
+        with cache.lock('fingerprintA'):
+            waiter = threading.Thread(target=lock_and_record, args=('fingerprintA',))
+            other = threading.Thread(target=lock_and_record, args=('fingerprintB',))
+            waiter.start()
+            other.start()
+            other.join(2)
+            time.sleep(0.05)
+            events.append('released')
+        waiter.join(2)
+        self.assertEqual(events, ['fingerprintB', 'released', 'fingerprintA'])
+
+    def test_lock_wait_limited_by_deadline(self):
+        cache = TokenCache()
+        errors = []
+        def lock_within_deadline():
+            with deadline('poll', 0.1):
+                try:
+                    with cache.lock('fingerprintA'):
+                        pass
+                except DeadlineExceededError as e:
+                    errors.append(e)
+        with cache.lock('fingerprintA'):
+            waiter = threading.Thread(target=lock_within_deadline)
+            waiter.start()
+            waiter.join(2)
+        self.assertEqual(len(errors), 1)
+        # Released as normal after waiting, so later requests still get the lock
+        with cache.lock('fingerprintA'):
+            pass
+
+    def test_expires_at(self):
+        cache = TokenCache()
+        expires_at = datetime.datetime.now().timestamp() + 3600
+        cache.put('fingerprintA', 'stateA', expires_at)
+        self.assertEqual(cache.expires_at('fingerprintA'), expires_at)
+        cache.invalidate('fingerprintA')
+        self.assertIsNone(cache.expires_at('fingerprintA'))
+
+    @patch('osvimdriver.openstack.tokens.time.monotonic')
+    def test_active_auths_drops_idle_locations(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        cache = TokenCache()
+        cache.track('fingerprintA', 'authA', 'sessionA')
+        mock_monotonic.return_value = 500
+        cache.track('fingerprintB', 'authB', 'sessionB')
+        self.assertEqual(cache.active_auths(idle_timeout_seconds=300), [('fingerprintB', 'authB', 'sessionB')])
+        self.assertEqual(cache.stats()['active'], 1)
+
+
+class TestCachedPassword(unittest.TestCase):
+
+    @patch.object(keystonev3.Password, 'get_auth_ref')
+    def test_get_auth_ref_reuses_token_fetched_whilst_waiting_for_lock(self, mock_get_auth_ref):
+        shared_store = MagicMock()
+        auth_state = serialize_auth_ref(build_auth_ref('tokenA', 3600))
+        expires_at = datetime.datetime.now().timestamp() + 3600
+        shared_store.get.side_effect = [None, (auth_state, expires_at)]
+        auth = CachedPassword(TokenCache(shared_store=shared_store), 'fingerprintA', auth_url='http://testip/identity/v3', username='test', password='secret')
+        auth_ref = auth.get_auth_ref(MagicMock())
+        self.assertEqual(auth_ref.auth_token, 'tokenA')
+        shared_store.lock.assert_called_once_with('fingerprintA')
+        mock_get_auth_ref.assert_not_called()
+
+    def test_init_without_token_cache_fails(self):
+        with self.assertRaises(ValueError) as context:
+            CachedPassword(None, 'fingerprintA', auth_url='http://testip/identity/v3', username='test', password='secret')
+        self.assertEqual(str(context.exception), 'token_cache must be provided')
+
+    def test_init_sets_token_life_from_expiry_margin(self):
+        auth = CachedPassword(TokenCache(expiry_margin_seconds=300), 'fingerprintA', auth_url='http://testip/identity/v3', username='test', password='secret')
+        self.assertEqual(auth.MIN_TOKEN_LIFE_SECONDS, 300)
+
+    @patch.object(keystonev3.Password, 'get_auth_ref')
+    def test_get_auth_ref_requests_and_caches_token(self, mock_get_auth_ref):
+        auth_ref = build_auth_ref('tokenA', 3600)
+        mock_get_auth_ref.return_value = auth_ref
+        token_cache = TokenCache()
+        auth = CachedPassword(token_cache, 'fingerprintA', auth_url='http://testip/identity/v3', username='test', password='secret')
+        mock_session = MagicMock()
+        result = auth.get_auth_ref(mock_session)
+        self.assertEqual(result, auth_ref)
+        mock_get_auth_ref.assert_called_once_with(mock_session)
+        self.assertEqual(token_cache.get('fingerprintA'), serialize_auth_ref(auth_ref))
+
+    @patch.object(keystonev3.Password, 'get_auth_ref')
+    def test_get_auth_ref_reuses_cached_token(self, mock_get_auth_ref):
+        token_cache = TokenCache()
+        auth_ref = build_auth_ref('tokenA', 3600)
+        token_cache.put('fingerprintA', serialize_auth_ref(auth_ref), auth_ref.expires.timestamp())
+        auth = CachedPassword(token_cache, 'fingerprintA', auth_url='http://testip/identity/v3', username='test', password='secret')
+        result = auth.get_auth_ref(MagicMock())
+        mock_get_auth_ref.assert_not_called()
+        self.assertEqual(result.auth_token, 'tokenA')
+
+    def test_invalidate_removes_cached_token(self):
+        token_cache = TokenCache()
+        token_cache.put('fingerprintA', json.dumps({'auth_token': 'tokenA', 'body': {}}), datetime.datetime.now().timestamp() + 3600)
+        auth = CachedPassword(token_cache, 'fingerprintA', auth_url='http://testip/identity/v3', username='test', password='secret')
+        auth.invalidate()
+        self.assertIsNone(token_cache.get('fingerprintA'))
+
+
+class TestCachedPasswordRefresh(unittest.TestCase):
+
+    @patch.object(keystonev3.Password, 'get_auth_ref')
+    def test_refresh_renews_token(self, mock_get_auth_ref):
+        token_cache = TokenCache(expiry_margin_seconds=60)
+        token_cache.put('fingerprintA', serialize_auth_ref(build_auth_ref('tokenA', 200)), datetime.datetime.now().timestamp() + 200)
+        mock_get_auth_ref.return_value = build_auth_ref('tokenB', 3600)
+        auth = CachedPassword(token_cache, 'fingerprintA', auth_url='http://testip/identity/v3', username='test', password='secret')
+        self.assertTrue(auth.refresh(MagicMock(), 300))
+        self.assertEqual(json.loads(token_cache.get('fingerprintA'))['auth_token'], 'tokenB')
+
+    @patch.object(keystonev3.Password, 'get_auth_ref')
+    def test_refresh_skipped_when_already_renewed(self, mock_get_auth_ref):
+        token_cache = TokenCache(expiry_margin_seconds=60)
+        token_cache.put('fingerprintA', serialize_auth_ref(build_auth_ref('tokenA', 3600)), datetime.datetime.now().timestamp() + 3600)
+        auth = CachedPassword(token_cache, 'fingerprintA', auth_url='http://testip/identity/v3', username='test', password='secret')
+        self.assertFalse(auth.refresh(MagicMock(), 300))
+        mock_get_auth_ref.assert_not_called()
+
+    @patch.object(keystonev3.Password, 'get_auth_ref')
+    def test_get_access_tracks_location(self, mock_get_auth_ref):
+        mock_get_auth_ref.return_value = build_auth_ref('tokenA', 3600)
+        token_cache = TokenCache()
+        session = MagicMock()
+        auth = CachedPassword(token_cache, 'fingerprintA', auth_url='http://testip/identity/v3', username='test', password='secret')
+        auth.get_access(session)
+        self.assertEqual(token_cache.active_auths(), [('fingerprintA', auth, session)])
+
+    @patch('osvimdriver.openstack.tokens.time.monotonic')
+    @patch.object(keystonev3.Password, 'get_auth_ref')
+    def test_location_in_continuous_use_stays_refreshed(self, mock_get_auth_ref, mock_monotonic):
+        # Due for renewal, but not yet close enough to expiry for requests to ask Keystone themselves
+        auth_ref = build_auth_ref('tokenA', 200)
+        auth_ref.will_expire_soon.return_value = False
+        mock_get_auth_ref.return_value = auth_ref
+        token_cache = TokenCache()
+        refresher = TokenRefresher(token_cache, idle_timeout_seconds=600)
+        auth = CachedPassword(token_cache, 'fingerprintA', auth_url='http://testip/identity/v3', username='test', password='secret')
+        for now in range(100, 1300, 100):
+            mock_monotonic.return_value = now
+            auth.get_access(MagicMock())
+        # Keystone was only asked once, the token being reused by every later request
+        mock_get_auth_ref.assert_called_once()
+        with patch.object(auth, 'refresh', return_value=True) as mock_refresh:
+            self.assertEqual(refresher.refresh_due_tokens(), 1)
+        mock_refresh.assert_called_once()
+
+
+class TestTokenRefresher(unittest.TestCase):
+
+    def test_init_without_token_cache_fails(self):
+        with self.assertRaises(ValueError) as context:
+            TokenRefresher(None)
+        self.assertEqual(str(context.exception), 'token_cache must be provided')
+
+    def test_refresh_due_tokens(self):
+        token_cache = TokenCache(expiry_margin_seconds=60)
+        now = datetime.datetime.now().timestamp()
+        token_cache.put('fingerprintA', 'stateA', now + 200)
+        token_cache.put('fingerprintB', 'stateB', now + 3600)
+        due_auth = MagicMock()
+        due_auth.refresh.return_value = True
+        fresh_auth = MagicMock()
+        token_cache.track('fingerprintA', due_auth, 'sessionA')
+        token_cache.track('fingerprintB', fresh_auth, 'sessionB')
+        refresher = TokenRefresher(token_cache, refresh_margin_seconds=300)
+        self.assertEqual(refresher.refresh_due_tokens(), 1)
+        due_auth.refresh.assert_called_once_with('sessionA', 300)
+        fresh_auth.refresh.assert_not_called()
+        self.assertEqual(refresher.stats(), {'refreshes': 1, 'failures': 0})
+
+    def test_refresh_due_tokens_continues_after_failure(self):
+        token_cache = TokenCache()
+        failing_auth = MagicMock()
+        failing_auth.refresh.side_effect = Exception('Keystone unavailable')
+        other_auth = MagicMock()
+        other_auth.refresh.return_value = True
+        token_cache.track('fingerprintA', failing_auth, 'sessionA')
+        token_cache.track('fingerprintB', other_auth, 'sessionB')
+        refresher = TokenRefresher(token_cache)
+        self.assertEqual(refresher.refresh_due_tokens(), 1)
+        self.assertEqual(refresher.stats(), {'refreshes': 1, 'failures': 1})
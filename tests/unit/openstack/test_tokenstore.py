@@ -0,0 +1,105 @@
+import os
+import shutil
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from cryptography.fernet import Fernet
+from osvimdriver.openstack.tokenstore import SharedTokenStore
+from osvimdriver.openstack.deadline import deadline, DeadlineExceededError
+
+
+class TestSharedTokenStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'db', 'tokens.db')
+        os.makedirs(os.path.join(self.tmp_dir, 'secrets'))
+        self.key_file = os.path.join(self.tmp_dir, 'secrets', 'key')
+        with open(self.key_file, 'wb') as f:
+            f.write(Fernet.generate_key() + b'\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_init_missing_path(self):
+        with self.assertRaises(ValueError) as context:
+            SharedTokenStore(None)
+        self.assertEqual(str(context.exception), 'path must be provided')
+
+    def test_init_missing_key(self):
+        with self.assertRaises(ValueError) as context:
+            SharedTokenStore(self.path)
+        self.assertEqual(str(context.exception), 'key or key_file must be provided')
+
+    def test_init_refuses_key_file_beside_database(self):
+        with self.assertRaises(ValueError) as context:
+            SharedTokenStore(self.path, key_file=self.path + '.key')
+        self.assertEqual(str(context.exception), 'key_file must not be in the same directory as the token store')
+
+    def test_init_with_key(self):
+        key = Fernet.generate_key()
+        SharedTokenStore(self.path, key=key).put('fingerprintA', 'stateA', time.time() + 3600)
+        self.assertEqual(SharedTokenStore(self.path, key=key).get('fingerprintA')[0], 'stateA')
+
+    def test_put_and_get_across_stores(self):
+        expires_at = time.time() + 3600
+        SharedTokenStore(self.path, key_file=self.key_file).put('fingerprintA', 'stateA', expires_at)
+        self.assertEqual(SharedTokenStore(self.path, key_file=self.key_file).get('fingerprintA'), ('stateA', expires_at))
+        self.assertIsNone(SharedTokenStore(self.path, key_file=self.key_file).get('fingerprintB'))
+
+    def test_tokens_encrypted_at_rest(self):
+        store = SharedTokenStore(self.path, key_file=self.key_file)
+        store.put('fingerprintA', 'secret-token-state', time.time() + 3600)
+        connection = sqlite3.connect(self.path)
+        try:
+            token = connection.execute('SELECT token FROM tokens').fetchone()[0]
+        finally:
+            connection.close()
+        self.assertNotIn(b'secret-token-state', token)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_get_ignores_expired_tokens(self):
+        store = SharedTokenStore(self.path, key_file=self.key_file)
+        store.put('fingerprintA', 'stateA', time.time() - 1)
+        self.assertIsNone(store.get('fingerprintA'))
+
+    def test_get_ignores_tokens_written_with_another_key(self):
+        SharedTokenStore(self.path, key_file=self.key_file).put('fingerprintA', 'stateA', time.time() + 3600)
+        other_store = SharedTokenStore(self.path, key=Fernet.generate_key())
+        self.assertIsNone(other_store.get('fingerprintA'))
+
+    def test_invalidate(self):
+        store = SharedTokenStore(self.path, key_file=self.key_file)
+        store.put('fingerprintA', 'stateA', time.time() + 3600)
+        store.invalidate('fingerprintA')
+        self.assertIsNone(store.get('fingerprintA'))
+        self.assertEqual(store.stats(), {'shared_tokens': 0})
+
+    def test_lock_is_exclusive(self):
+        store = SharedTokenStore(self.path, key_file=self.key_file)
+        events = []
+        with store.lock('fingerprintA'):
+            waiter = threading.Thread(target=lambda: self.__lock_and_record(store, events))
+            waiter.start()
+            time.sleep(0.1)
+            events.append('released')
+        waiter.join(2)
+        self.assertEqual(events, ['released', 'acquired'])
+
+    def test_lock_wait_limited_by_deadline(self):
+        store = SharedTokenStore(self.path, key_file=self.key_file)
+        other_worker_store = SharedTokenStore(self.path, key_file=self.key_file)
+        with store.lock('fingerprintA'):
+            with deadline('poll', 0.1):
+                with self.assertRaises(DeadlineExceededError):
+                    with other_worker_store.lock('fingerprintA'):
+                        pass
+        with other_worker_store.lock('fingerprintA'):
+            pass
+
+    def __lock_and_record(self, store, events):
+        with store.lock('fingerprintA'):
+            events.append('acquired')
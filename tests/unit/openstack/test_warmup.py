@@ -0,0 +1,93 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+from osvimdriver.openstack.deadline import remaining_seconds
+from osvimdriver.openstack.warmup import LocationWarmer, LocationWarmupProperties
+
+
+class TestLocationWarmer(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_location_translator = MagicMock()
+        self.mock_location = self.mock_location_translator.from_deployment_location.return_value
+        self.mock_session = self.mock_location.get_session.return_value
+        self.mock_session.get_endpoint.side_effect = lambda service_type, interface: 'http://{0}'.format(service_type)
+        # Endpoint cache disabled
+        self.mock_location.get_endpoint.return_value = None
+        self.warmup_properties = LocationWarmupProperties()
+        self.warmup_properties.locations = [{'name': 'testdl', 'properties': {'os_api_url': 'http://testip'}}]
+
+    def test_init_without_translator(self):
+        with self.assertRaises(ValueError) as context:
+            LocationWarmer(None, self.warmup_properties)
+        self.assertEqual(str(context.exception), 'location_translator must be provided')
+
+    def test_warm_authenticates_and_opens_connections(self):
+        results = LocationWarmer(self.mock_location_translator, self.warmup_properties).warm()
+        self.assertEqual(results, {'testdl': True})
+        self.mock_location_translator.from_deployment_location.assert_called_once_with(self.warmup_properties.locations[0])
+        self.mock_session.get_token.assert_called_once()
+        self.mock_session.get_endpoint.assert_any_call(service_type='orchestration', interface='public')
+        self.mock_session.get_endpoint.assert_any_call(service_type='network', interface='public')
+        self.mock_session.get.assert_any_call('http://orchestration', raise_exc=False)
+        self.mock_session.get.assert_any_call('http://network', raise_exc=False)
+        self.mock_location.close.assert_called_once()
+
+    def test_warm_without_auth_skips_catalog(self):
+        self.mock_session.auth = None
+        results = LocationWarmer(self.mock_location_translator, self.warmup_properties).warm()
+        self.assertEqual(results, {'testdl': True})
+        self.mock_session.get_token.assert_not_called()
+        self.mock_session.get_endpoint.assert_not_called()
+
+    def test_warm_disabled(self):
+        self.warmup_properties.enabled = False
+        self.assertEqual(LocationWarmer(self.mock_location_translator, self.warmup_properties).warm(), {})
+        self.mock_location_translator.from_deployment_location.assert_not_called()
+
+    def test_warm_handles_failures(self):
+        self.mock_session.get_token.side_effect = Exception('Keystone unavailable')
+        results = LocationWarmer(self.mock_location_translator, self.warmup_properties).warm()
+        self.assertEqual(results, {'testdl': False})
+        self.mock_location.close.assert_called_once()
+
+    def test_warm_resolves_endpoints_through_location(self):
+        self.mock_location.get_endpoint.side_effect = lambda service_type, session: 'http://cached-{0}'.format(service_type)
+        results = LocationWarmer(self.mock_location_translator, self.warmup_properties).warm()
+        self.assertEqual(results, {'testdl': True})
+        self.mock_location.get_endpoint.assert_any_call('orchestration', session=self.mock_session)
+        self.mock_location.get_endpoint.assert_any_call('network', session=self.mock_session)
+        self.mock_session.get_endpoint.assert_not_called()
+        self.mock_session.get.assert_any_call('http://cached-orchestration', raise_exc=False)
+
+    def test_warm_location_within_deadline(self):
+        remaining = []
+        self.mock_session.get_token.side_effect = lambda: remaining.append(remaining_seconds())
+        self.warmup_properties.deadline_seconds = 5
+        LocationWarmer(self.mock_location_translator, self.warmup_properties).warm()
+        self.assertEqual(len(remaining), 1)
+        self.assertIsNotNone(remaining[0])
+        self.assertLessEqual(remaining[0], 5)
+
+    def test_start_does_not_wait_for_warmup(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self.mock_session.get_token.side_effect = lambda: release.wait(5)
+        thread = LocationWarmer(self.mock_location_translator, self.warmup_properties).start()
+        self.assertTrue(thread.daemon)
+        self.assertTrue(thread.is_alive())
+        release.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.mock_location.close.assert_called_once()
+
+    def test_start_disabled(self):
+        self.warmup_properties.enabled = False
+        self.assertIsNone(LocationWarmer(self.mock_location_translator, self.warmup_properties).start())
+
+    def test_warm_runs_concurrently(self):
+        barrier = threading.Barrier(2, timeout=2)
+        self.mock_session.get_token.side_effect = lambda: barrier.wait()
+        self.warmup_properties.locations = [{'name': 'testdlA'}, {'name': 'testdlB'}]
+        results = LocationWarmer(self.mock_location_translator, self.warmup_properties).warm()
+        self.assertEqual(results, {'testdlA': True, 'testdlB': True})
@@ -0,0 +1,107 @@
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from osvimdriver.service.polling import PollIntervalAdvisor, SettleWindow
+
+HEAT_TEMPLATE = '''
+heat_template_version: 2016-10-14
+resources:
+  network:
+    type: OS::Neutron::Net
+  subnet:
+    type: OS::Neutron::Subnet
+'''
+
+
+def created_seconds_ago(seconds):
+    return (datetime.now(timezone.utc) - timedelta(seconds=seconds)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class TestPollIntervalAdvisor(unittest.TestCase):
+
+    def test_advise_unknown_stack_backs_off_with_elapsed_time(self):
+        advisor = PollIntervalAdvisor(min_seconds=2, max_seconds=60)
+        self.assertAlmostEqual(advisor.advise('request1', '1', {'creation_time': created_seconds_ago(5)}), 2, delta=1)
+        self.assertAlmostEqual(advisor.advise('request1', '1', {'creation_time': created_seconds_ago(300)}), 30, delta=1)
+        self.assertAlmostEqual(advisor.advise('request1', '1', {'creation_time': created_seconds_ago(3000)}), 60, delta=1)
+
+    def test_advise_uses_resource_count(self):
+        advisor = PollIntervalAdvisor(seconds_per_resource=50)
+        advisor.stack_created('1', HEAT_TEMPLATE)
+        # Expected to take 100 seconds, 80 remaining
+        self.assertAlmostEqual(advisor.advise('request1', '1', {'creation_time': created_seconds_ago(20)}), 40, delta=1)
+
+    def test_advise_uses_historical_completion_times(self):
+        advisor = PollIntervalAdvisor(seconds_per_resource=50)
+        for stack_id in ['1', '2', '3']:
+            advisor.stack_created(stack_id, HEAT_TEMPLATE)
+            advisor.stack_completed(stack_id, {'creation_time': created_seconds_ago(20)})
+        advisor.stack_created('4', HEAT_TEMPLATE)
+        # Expected to take 20 seconds, 10 remaining
+        self.assertAlmostEqual(advisor.advise('request4', '4', {'creation_time': created_seconds_ago(10)}), 5, delta=1)
+
+    def test_advise_overdue_stack_backs_off(self):
+        advisor = PollIntervalAdvisor(seconds_per_resource=1)
+        advisor.stack_created('1', HEAT_TEMPLATE)
+        self.assertAlmostEqual(advisor.advise('request1', '1', {'creation_time': created_seconds_ago(200)}), 20, delta=1)
+
+    def test_advise_without_creation_time_uses_first_poll(self):
+        advisor = PollIntervalAdvisor(min_seconds=0.1)
+        advisor.advise('request1', '1', {})
+        time.sleep(0.2)
+        self.assertLess(advisor.advise('request1', '1', {}), 1)
+        advisor.forget('request1')
+
+    def test_advise_ignores_creation_time_when_told(self):
+        advisor = PollIntervalAdvisor(min_seconds=2)
+        self.assertEqual(advisor.advise('request1', '1', {'creation_time': created_seconds_ago(3000)}, use_creation_time=False), 2)
+
+    def test_advise_invalid_creation_time(self):
+        advisor = PollIntervalAdvisor(min_seconds=2)
+        self.assertEqual(advisor.advise('request1', '1', {'creation_time': 'yesterday'}), 2)
+
+    def test_stack_created_with_invalid_template(self):
+        advisor = PollIntervalAdvisor(min_seconds=2)
+        advisor.stack_created('1', ': not yaml: [')
+        self.assertAlmostEqual(advisor.advise('request1', '1', {'creation_time': created_seconds_ago(5)}), 2, delta=1)
+
+    def test_remaining_until_advised_check(self):
+        advisor = PollIntervalAdvisor(min_seconds=5)
+        self.assertEqual(advisor.remaining('request1'), 0)
+        advisor.advise('request1', '1', {'creation_time': created_seconds_ago(5)})
+        self.assertAlmostEqual(advisor.remaining('request1'), 5, delta=0.5)
+        self.assertEqual(advisor.remaining('request2'), 0)
+
+    def test_forget_clears_remaining(self):
+        advisor = PollIntervalAdvisor(min_seconds=5)
+        advisor.advise('request1', '1', {'creation_time': created_seconds_ago(5)})
+        advisor.forget('request1')
+        self.assertEqual(advisor.remaining('request1'), 0)
+
+
+class TestSettleWindow(unittest.TestCase):
+
+    def test_remaining(self):
+        settle_window = SettleWindow(base_seconds=2, seconds_per_resource=1, max_seconds=30)
+        settle_window.stack_created('1', HEAT_TEMPLATE)
+        self.assertAlmostEqual(settle_window.remaining('1'), 4, delta=0.5)
+
+    def test_remaining_unknown_stack(self):
+        settle_window = SettleWindow()
+        self.assertEqual(settle_window.remaining('1'), 0)
+
+    def test_remaining_limited_to_max_seconds(self):
+        settle_window = SettleWindow(base_seconds=2, seconds_per_resource=100, max_seconds=10)
+        settle_window.stack_created('1', HEAT_TEMPLATE)
+        self.assertLessEqual(settle_window.remaining('1'), 10)
+
+    def test_remaining_after_window_closes(self):
+        settle_window = SettleWindow(base_seconds=0.05, seconds_per_resource=0)
+        settle_window.stack_created('1', HEAT_TEMPLATE)
+        time.sleep(0.1)
+        self.assertEqual(settle_window.remaining('1'), 0)
+
+    def test_zero_window(self):
+        settle_window = SettleWindow(base_seconds=0, seconds_per_resource=0)
+        settle_window.stack_created('1', HEAT_TEMPLATE)
+        self.assertEqual(settle_window.remaining('1'), 0)
@@ -0,0 +1,64 @@
+import os
+import shutil
+import stat
+import tempfile
+import time
+import unittest
+from osvimdriver.service.published import LocalPublishedExecutions, SharedPublishedExecutions, SENDER_WATCHER, SENDER_MONITOR
+
+
+class TestLocalPublishedExecutions(unittest.TestCase):
+
+    def test_claim_once(self):
+        published = LocalPublishedExecutions()
+        self.assertTrue(published.claim('Create::1::1', SENDER_WATCHER))
+        self.assertFalse(published.claim('Create::1::1', SENDER_MONITOR))
+        self.assertEqual(published.sender_of('Create::1::1'), SENDER_WATCHER)
+        self.assertIsNone(published.sender_of('Create::2::1'))
+
+    def test_release(self):
+        published = LocalPublishedExecutions()
+        published.claim('Create::1::1', SENDER_WATCHER)
+        published.release('Create::1::1')
+        self.assertIsNone(published.sender_of('Create::1::1'))
+        self.assertTrue(published.claim('Create::1::1', SENDER_MONITOR))
+
+
+class TestSharedPublishedExecutions(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'published.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_init_missing_path(self):
+        with self.assertRaises(ValueError) as context:
+            SharedPublishedExecutions(None)
+        self.assertEqual(str(context.exception), 'path must be provided')
+
+    def test_database_private(self):
+        SharedPublishedExecutions(self.path)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_claim_once_across_stores(self):
+        self.assertTrue(SharedPublishedExecutions(self.path).claim('Create::1::1', SENDER_WATCHER))
+        other = SharedPublishedExecutions(self.path)
+        self.assertFalse(other.claim('Create::1::1', SENDER_MONITOR))
+        self.assertEqual(other.sender_of('Create::1::1'), SENDER_WATCHER)
+        self.assertIsNone(other.sender_of('Create::2::1'))
+
+    def test_release_across_stores(self):
+        SharedPublishedExecutions(self.path).claim('Create::1::1', SENDER_WATCHER)
+        SharedPublishedExecutions(self.path).release('Create::1::1')
+        other = SharedPublishedExecutions(self.path)
+        self.assertIsNone(other.sender_of('Create::1::1'))
+        self.assertTrue(other.claim('Create::1::1', SENDER_MONITOR))
+
+    def test_expired_claim_ignored(self):
+        published = SharedPublishedExecutions(self.path, ttl_seconds=0.05)
+        published.claim('Create::1::1', SENDER_WATCHER)
+        time.sleep(0.1)
+        self.assertIsNone(published.sender_of('Create::1::1'))
+        self.assertTrue(published.claim('Create::1::1', SENDER_MONITOR))
@@ -4,15 +4,18 @@ import tempfile
 import shutil
 import os
 from unittest.mock import patch, MagicMock, ANY
-from ignition.service.resourcedriver import InfrastructureNotFoundError, InvalidDriverFilesError, InvalidRequestError, ResourceDriverError
+from ignition.service.resourcedriver import InfrastructureNotFoundError, InvalidDriverFilesError, InvalidRequestError, ResourceDriverError, RequestNotFoundError
 from ignition.model.references import FindReferenceResponse, FindReferenceResult
 from ignition.model.associated_topology import AssociatedTopology
 from ignition.model.lifecycle import LifecycleExecution, LifecycleExecuteResponse
 from ignition.utils.file import DirectoryTree
-from osvimdriver.service.resourcedriver import ResourceDriverHandler, StackNameCreator, PropertiesMerger, AdditionalResourceDriverProperties, AdoptProperties
+from osvimdriver.openstack.deadline import current_deadline
+from osvimdriver.service.resourcedriver import ResourceDriverHandler, StackNameCreator, PropertiesMerger, AdditionalResourceDriverProperties, AdoptProperties, ExecutionAlreadySentError
+from osvimdriver.service.tenancy import tenant_context
 from osvimdriver.service.tosca import ToscaValidationError
 from osvimdriver.tosca.discover import DiscoveryResult, NotDiscoveredError
-from osvimdriver.openstack.heat.driver import StackNotFoundError
+from osvimdriver.openstack.heat.driver import HeatDriver, StackNotFoundError
+from osvimdriver.openstack.heat.stackcache import StackCache
 from tests.unit.testutils.constants import TOSCA_TEMPLATES_PATH, TOSCA_HELLO_WORLD_FILE
 from ignition.utils.propvaluemap import PropValueMap
 
@@ -115,7 +118,7 @@ class TestResourceDriverHandler(unittest.TestCase):
         self.mock_heat_input_utils.filter_used_properties.return_value = {'propA': 'valueA'}
         self.mock_heat_input_utils.filter_password_from_dictionary.return_value =  self.heat_template
         self.mock_heat_driver = MagicMock()
-        self.mock_os_location = MagicMock(heat_driver=self.mock_heat_driver)
+        self.mock_os_location = MagicMock(heat_driver=self.mock_heat_driver, stack_status_monitor=None)
         self.mock_os_location.get_heat_input_util.return_value = self.mock_heat_input_utils
         self.mock_location_translator = MagicMock()
         self.mock_location_translator.from_deployment_location.return_value = self.mock_os_location
@@ -253,6 +256,20 @@ class TestResourceDriverHandler(unittest.TestCase):
         self.mock_location_translator.from_deployment_location.assert_called_once_with(self.deployment_location)
         self.mock_heat_driver.create_stack.assert_called_once_with(ANY, self.heat_template, {'propA': 'valueA'})
 
+    def test_create_infrastructure_request_id_without_stack_name(self):
+        self.mock_heat_driver.create_stack.return_value = '1', 'Create::1::request123'
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        result = driver.execute_lifecycle('Create', self.heat_driver_files, self.system_properties, self.resource_properties, {}, AssociatedTopology(), self.deployment_location)
+        self.assertEqual(result.request_id, 'Create::1::request123')
+
+    def test_create_infrastructure_request_id_with_stack_name(self):
+        self.resource_driver_config.request_id_stack_name = True
+        self.mock_heat_driver.create_stack.return_value = '1', 'Create::1::request123'
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        result = driver.execute_lifecycle('Create', self.heat_driver_files, self.system_properties, self.resource_properties, {}, AssociatedTopology(), self.deployment_location)
+        stack_name = self.mock_heat_driver.create_stack.call_args[0][0]
+        self.assertEqual(result.request_id, 'Create::1::request123::' + stack_name)
+
     def test_create_infrastructure_includes_heat_files(self):
         files_path = os.path.join(self.heat_driver_files.root_path, 'files')
         os.makedirs(files_path)
@@ -315,6 +332,17 @@ class TestResourceDriverHandler(unittest.TestCase):
         self.assert_internal_resource(result.associated_topology, '555')
         self.mock_location_translator.from_deployment_location.assert_called_once_with(self.deployment_location)
 
+    def test_adopt_infrastructure_request_id_with_stack_name(self):
+        self.mock_heat_driver.get_stack.return_value = {'id': '555', 'stack_name': 'mystack', 'stack_status': 'CREATE_COMPLETE'}
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        result = driver.execute_lifecycle('Adopt', self.heat_driver_files, self.system_properties, self.resource_properties, {}, self.created_adopted_topology, self.deployment_location)
+        self.assertEqual(len(result.request_id.split('::')), 3)
+        self.resource_driver_config.request_id_stack_name = True
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        result = driver.execute_lifecycle('Adopt', self.heat_driver_files, self.system_properties, self.resource_properties, {}, self.created_adopted_topology, self.deployment_location)
+        self.assertTrue(result.request_id.endswith('::mystack'))
+        self.assertEqual(len(result.request_id.split('::')), 4)
+
     def test_adopt_infrastructure_with_no_associated_topology(self):
         driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
         with self.assertRaises(InvalidRequestError) as context:
@@ -359,6 +387,125 @@ class TestResourceDriverHandler(unittest.TestCase):
             driver.execute_lifecycle('Start', self.heat_driver_files, self.system_properties, self.resource_properties, {}, self.created_associated_topology, self.deployment_location)
         self.assertEqual(str(context.exception), 'Openstack driver only supports Create, Adopt and Delete transitions, not Start')
 
+    def test_create_watches_stack(self):
+        self.mock_heat_driver.create_stack.return_value = ('1', 'Create::1::request123::stack')
+        mock_stack_watcher = MagicMock()
+        driver = ResourceDriverHandler(self.mock_location_translator, mock_stack_watcher, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.execute_lifecycle('Create', self.heat_driver_files, self.system_properties, self.resource_properties, {}, AssociatedTopology(), self.deployment_location)
+        mock_stack_watcher.watch.assert_called_once_with('Create::1::request123::stack', self.deployment_location, '1', stack_name='stack', operation='CREATE', tenant_id=None)
+
+    def test_create_watches_stack_for_tenant(self):
+        self.mock_heat_driver.create_stack.return_value = ('1', 'Create::1::request123::stack')
+        mock_stack_watcher = MagicMock()
+        driver = ResourceDriverHandler(self.mock_location_translator, mock_stack_watcher, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        with tenant_context('tenantA'):
+            driver.execute_lifecycle('Create', self.heat_driver_files, self.system_properties, self.resource_properties, {}, AssociatedTopology(), self.deployment_location)
+        self.assertEqual(mock_stack_watcher.watch.call_args[1]['tenant_id'], 'tenantA')
+
+    def test_delete_watches_stack(self):
+        mock_stack_watcher = MagicMock()
+        driver = ResourceDriverHandler(self.mock_location_translator, mock_stack_watcher, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        associated_topology = AssociatedTopology.from_dict({'InfrastructureStack': {'id': '1', 'type': 'Openstack'}})
+        response = driver.execute_lifecycle('Delete', self.heat_driver_files, self.system_properties, self.resource_properties, {}, associated_topology, self.deployment_location)
+        mock_stack_watcher.watch.assert_called_once_with(response.request_id, self.deployment_location, '1', stack_name=None, operation='DELETE', tenant_id=None)
+
+    def test_get_lifecycle_execution_already_sent_by_watcher(self):
+        mock_stack_watcher = MagicMock()
+        mock_stack_watcher.sent_by.return_value = 'watcher'
+        driver = ResourceDriverHandler(self.mock_location_translator, mock_stack_watcher, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        with self.assertRaises(ExecutionAlreadySentError):
+            driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        mock_stack_watcher.sent_by.assert_called_once_with('Create::1::request123')
+        self.mock_heat_driver.get_stack.assert_not_called()
+
+    def test_get_lifecycle_execution_claims_complete_execution_for_monitor(self):
+        self.mock_heat_driver.get_stack.return_value = {'id': '1', 'stack_status': 'CREATE_COMPLETE', 'outputs': []}
+        mock_stack_watcher = MagicMock()
+        mock_stack_watcher.sent_by.return_value = None
+        mock_stack_watcher.claim.return_value = True
+        driver = ResourceDriverHandler(self.mock_location_translator, mock_stack_watcher, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        execution = driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.assertEqual(execution.status, 'COMPLETE')
+        mock_stack_watcher.claim.assert_called_once_with('Create::1::request123', 'monitor')
+
+    def test_get_lifecycle_execution_sent_by_watcher_whilst_polling(self):
+        self.mock_heat_driver.get_stack.return_value = {'id': '1', 'stack_status': 'CREATE_COMPLETE', 'outputs': []}
+        mock_stack_watcher = MagicMock()
+        mock_stack_watcher.sent_by.side_effect = [None, 'watcher']
+        mock_stack_watcher.claim.return_value = False
+        driver = ResourceDriverHandler(self.mock_location_translator, mock_stack_watcher, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        with self.assertRaises(ExecutionAlreadySentError):
+            driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+
+    def test_get_lifecycle_execution_resent_when_claimed_by_monitor(self):
+        # An earlier send by the monitor failed, so the execution is returned again
+        self.mock_heat_driver.get_stack.return_value = {'id': '1', 'stack_status': 'CREATE_COMPLETE', 'outputs': []}
+        mock_stack_watcher = MagicMock()
+        mock_stack_watcher.sent_by.return_value = 'monitor'
+        mock_stack_watcher.claim.return_value = False
+        driver = ResourceDriverHandler(self.mock_location_translator, mock_stack_watcher, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        execution = driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.assertEqual(execution.status, 'COMPLETE')
+
+    def test_execute_lifecycle_create_within_deadline(self):
+        self.resource_driver_config.deadlines.create_seconds = 90
+        deadlines = []
+
+        def create_stack(*args, **kwargs):
+            deadlines.append(current_deadline())
+            return ('1', 'Create::1::request123')
+        self.mock_heat_driver.create_stack.side_effect = create_stack
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.execute_lifecycle('Create', self.heat_driver_files, self.system_properties, self.resource_properties, {}, AssociatedTopology(), self.deployment_location)
+        self.assertEqual(deadlines[0].name, 'create')
+        self.assertEqual(deadlines[0].seconds, 90)
+        self.assertIsNone(current_deadline())
+
+    def test_get_lifecycle_execution_within_deadline(self):
+        self.resource_driver_config.settle_window.enabled = False
+        deadlines = []
+
+        def get_stack(*args, **kwargs):
+            deadlines.append(current_deadline())
+            return {'id': '1', 'stack_status': 'CREATE_COMPLETE', 'outputs': []}
+        self.mock_heat_driver.get_stack.side_effect = get_stack
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.assertEqual(deadlines[0].name, 'poll')
+        self.assertEqual(deadlines[0].connect_timeout_seconds, 10)
+
+    def test_deadlines_disabled(self):
+        self.resource_driver_config.deadlines.enabled = False
+        self.resource_driver_config.settle_window.enabled = False
+        deadlines = []
+
+        def get_stack(*args, **kwargs):
+            deadlines.append(current_deadline())
+            return {'id': '1', 'stack_status': 'CREATE_COMPLETE', 'outputs': []}
+        self.mock_heat_driver.get_stack.side_effect = get_stack
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.assertEqual(deadlines, [None])
+
+    def test_get_lifecycle_execution_within_settle_window(self):
+        self.mock_heat_driver.create_stack.return_value = ('1', 'Create::1::request123')
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.execute_lifecycle('Create', self.heat_driver_files, self.system_properties, self.resource_properties, {}, AssociatedTopology(), self.deployment_location)
+        self.mock_location_translator.from_deployment_location.reset_mock()
+        execution = driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.assertEqual(execution.status, 'IN_PROGRESS')
+        self.mock_location_translator.from_deployment_location.assert_not_called()
+        self.mock_heat_driver.get_stack.assert_not_called()
+
+    def test_get_lifecycle_execution_settle_window_disabled(self):
+        self.resource_driver_config.settle_window.enabled = False
+        self.mock_heat_driver.create_stack.return_value = ('1', 'Create::1::request123')
+        self.mock_heat_driver.get_stack.return_value = {'id': '1', 'stack_status': 'CREATE_IN_PROGRESS'}
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.execute_lifecycle('Create', self.heat_driver_files, self.system_properties, self.resource_properties, {}, AssociatedTopology(), self.deployment_location)
+        driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.mock_heat_driver.get_stack.assert_called_once()
+
     def test_get_lifecycle_execution_for_delete_stack_not_found(self):
         driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
         self.mock_heat_driver.get_stack.side_effect = StackNotFoundError('Not found')
@@ -378,7 +525,145 @@ class TestResourceDriverHandler(unittest.TestCase):
         driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
         execution = driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
         self.mock_location_translator.from_deployment_location.assert_called_once_with(self.deployment_location)
-        self.mock_heat_driver.get_stack.assert_called_once_with('1',execution.request_id)
+        self.mock_heat_driver.get_stack.assert_called_once_with('1', execution.request_id, resolve_outputs=False, stack_name=None, expected_actions=('CREATE', 'ADOPT'))
+
+    def test_get_lifecycle_execution_closes_location(self):
+        self.mock_heat_driver.get_stack.return_value = {
+            'id': '1',
+            'stack_status': 'CREATE_IN_PROGRESS'
+        }
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.mock_os_location.close.assert_called_once()
+
+    def test_get_lifecycle_execution_closes_location_on_error(self):
+        self.mock_heat_driver.get_stack.side_effect = StackNotFoundError('Not found')
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        with self.assertRaises(InfrastructureNotFoundError):
+            driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.mock_os_location.close.assert_called_once()
+
+    def test_get_lifecycle_execution_with_stack_name_in_request_id(self):
+        self.mock_heat_driver.get_stack.return_value = {
+            'id': '1',
+            'stack_status': 'CREATE_IN_PROGRESS'
+        }
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        execution = driver.get_lifecycle_execution('Create::1::request123::mystack', self.deployment_location)
+        self.assertEqual(execution.status, 'IN_PROGRESS')
+        self.mock_heat_driver.get_stack.assert_called_once_with('1', 'Create::1::request123::mystack', resolve_outputs=False, stack_name='mystack', expected_actions=('CREATE', 'ADOPT'))
+
+    def test_get_lifecycle_execution_invalid_request_id(self):
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        with self.assertRaises(InvalidRequestError) as context:
+            driver.get_lifecycle_execution('Create::1::request123::mystack::extra', self.deployment_location)
+        self.assertEqual(str(context.exception), 'request_id is not valid: Create::1::request123::mystack::extra')
+
+    def test_get_lifecycle_execution_remembers_completed_execution(self):
+        self.mock_heat_driver.get_stack.return_value = {'id': '1', 'stack_status': 'DELETE_COMPLETE'}
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        first_execution = driver.get_lifecycle_execution('Delete::1::request123', self.deployment_location)
+        second_execution = driver.get_lifecycle_execution('Delete::1::request123', self.deployment_location)
+        self.assertEqual(second_execution, first_execution)
+        self.mock_location_translator.from_deployment_location.assert_called_once()
+        self.mock_heat_driver.get_stack.assert_called_once()
+
+    def test_get_lifecycle_execution_remembers_failed_execution(self):
+        self.mock_heat_driver.get_stack.return_value = {'id': '1', 'stack_status': 'CREATE_FAILED', 'stack_status_reason': 'Quota exceeded'}
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        execution = driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.assertEqual(execution.status, 'FAILED')
+        self.mock_heat_driver.get_stack.assert_called_once()
+
+    def test_get_lifecycle_execution_does_not_remember_in_progress_execution(self):
+        self.resource_driver_config.poll_hints.enabled = False
+        self.mock_heat_driver.get_stack.side_effect = [{'id': '1', 'stack_status': 'DELETE_IN_PROGRESS'}, {'id': '1', 'stack_status': 'DELETE_COMPLETE'}]
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        self.assertEqual(driver.get_lifecycle_execution('Delete::1::request123', self.deployment_location).status, 'IN_PROGRESS')
+        self.assertEqual(driver.get_lifecycle_execution('Delete::1::request123', self.deployment_location).status, 'COMPLETE')
+        self.assertEqual(self.mock_heat_driver.get_stack.call_count, 2)
+
+    def test_get_lifecycle_execution_without_execution_cache(self):
+        self.resource_driver_config.execution_cache.enabled = False
+        self.mock_heat_driver.get_stack.return_value = {'id': '1', 'stack_status': 'DELETE_COMPLETE'}
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.get_lifecycle_execution('Delete::1::request123', self.deployment_location)
+        driver.get_lifecycle_execution('Delete::1::request123', self.deployment_location)
+        self.assertEqual(self.mock_heat_driver.get_stack.call_count, 2)
+
+    def test_get_lifecycle_execution_from_stack_status_monitor(self):
+        mock_stack_status_monitor = MagicMock()
+        mock_stack_status_monitor.get.return_value = {'id': '1', 'stack_status': 'CREATE_IN_PROGRESS'}
+        self.mock_os_location.stack_status_monitor = mock_stack_status_monitor
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        execution = driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.assertEqual(execution.status, 'IN_PROGRESS')
+        mock_stack_status_monitor.get.assert_called_once_with('1')
+        mock_stack_status_monitor.track.assert_called_once_with('1')
+        self.mock_heat_driver.get_stack.assert_not_called()
+
+    def test_get_lifecycle_execution_stack_status_monitor_missing_stack(self):
+        mock_stack_status_monitor = MagicMock()
+        mock_stack_status_monitor.get.return_value = None
+        self.mock_os_location.stack_status_monitor = mock_stack_status_monitor
+        self.mock_heat_driver.get_stack.return_value = {'id': '1', 'stack_status': 'DELETE_COMPLETE'}
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        execution = driver.get_lifecycle_execution('Delete::1::request123', self.deployment_location)
+        self.assertEqual(execution.status, 'COMPLETE')
+        self.mock_heat_driver.get_stack.assert_called_once_with('1', 'Delete::1::request123', resolve_outputs=False, stack_name=None, expected_actions=('DELETE',))
+        mock_stack_status_monitor.untrack.assert_called_once_with('1')
+        mock_stack_status_monitor.track.assert_not_called()
+
+    @patch('osvimdriver.openstack.heat.driver.heatclient.Client')
+    def test_get_lifecycle_execution_delete_after_cached_create(self, mock_heat_client_init):
+        mock_heat_client = mock_heat_client_init.return_value
+        # The delete itself was sent by another worker, so this worker's stack cache still holds the completed create
+        mock_heat_client.stacks.get.return_value.to_dict.side_effect = [
+            {'id': 's1', 'stack_status': 'CREATE_COMPLETE', 'outputs': []},
+            {'id': 's1', 'stack_status': 'DELETE_IN_PROGRESS'}
+        ]
+        self.mock_os_location.heat_driver = HeatDriver(MagicMock(), stack_cache=StackCache(terminal_ttl_seconds=60), location_fingerprint='fp')
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        self.assertEqual(driver.get_lifecycle_execution('Create::s1::u1', self.deployment_location).status, 'COMPLETE')
+        self.assertEqual(driver.get_lifecycle_execution('Delete::s1::u2', self.deployment_location).status, 'IN_PROGRESS')
+
+    def test_get_lifecycle_execution_ignores_monitored_stack_of_another_action(self):
+        mock_stack_status_monitor = MagicMock()
+        mock_stack_status_monitor.get.return_value = {'id': '1', 'stack_status': 'CREATE_COMPLETE'}
+        self.mock_os_location.stack_status_monitor = mock_stack_status_monitor
+        self.mock_heat_driver.get_stack.return_value = {'id': '1', 'stack_status': 'DELETE_IN_PROGRESS'}
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        execution = driver.get_lifecycle_execution('Delete::1::request123', self.deployment_location)
+        self.assertEqual(execution.status, 'IN_PROGRESS')
+        self.mock_heat_driver.get_stack.assert_called_once()
+
+    def test_get_lifecycle_execution_in_progress_not_checked_again_until_advised(self):
+        self.mock_heat_driver.get_stack.return_value = {'id': '1', 'stack_status': 'CREATE_IN_PROGRESS', 'creation_time': '2020-01-01T00:00:00Z'}
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        execution = driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.assertEqual(execution.status, 'IN_PROGRESS')
+        self.mock_location_translator.from_deployment_location.assert_called_once()
+        self.mock_heat_driver.get_stack.assert_called_once()
+
+    @patch('osvimdriver.service.polling.time.monotonic')
+    def test_get_lifecycle_execution_in_progress_checked_again_once_advised(self, mock_monotonic):
+        mock_monotonic.return_value = 1000
+        self.mock_heat_driver.get_stack.return_value = {'id': '1', 'stack_status': 'CREATE_IN_PROGRESS', 'creation_time': '2020-01-01T00:00:00Z'}
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        mock_monotonic.return_value = 1000 + self.resource_driver_config.poll_hints.max_seconds + 1
+        driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.assertEqual(self.mock_heat_driver.get_stack.call_count, 2)
+
+    def test_get_lifecycle_execution_poll_hints_disabled(self):
+        self.resource_driver_config.poll_hints.enabled = False
+        self.mock_heat_driver.get_stack.return_value = {'id': '1', 'stack_status': 'CREATE_IN_PROGRESS', 'creation_time': '2020-01-01T00:00:00Z'}
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.assertEqual(self.mock_heat_driver.get_stack.call_count, 2)
 
     def test_get_lifecycle_execution_create_in_progress(self):
         self.mock_heat_driver.get_stack.return_value = {
@@ -394,6 +679,33 @@ class TestResourceDriverHandler(unittest.TestCase):
         self.assertEqual(execution.outputs, None)
         self.assertEqual(execution.associated_topology, None)
 
+    def test_get_lifecycle_execution_create_in_progress_does_not_resolve_outputs(self):
+        self.mock_heat_driver.get_stack.return_value = {
+            'id': '1',
+            'stack_status': 'CREATE_IN_PROGRESS'
+        }
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.mock_heat_driver.get_stack.assert_called_once_with('1', 'Create::1::request123', resolve_outputs=False, stack_name=None, expected_actions=('CREATE', 'ADOPT'))
+
+    def test_get_lifecycle_execution_create_complete_resolves_outputs_once(self):
+        self.mock_heat_driver.get_stack.side_effect = [
+            {'id': '1', 'stack_status': 'CREATE_COMPLETE'},
+            {'id': '1', 'stack_status': 'CREATE_COMPLETE', 'outputs': [{'output_key': 'outputA', 'output_value': 'valueA'}]}
+        ]
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        execution = driver.get_lifecycle_execution('Create::1::request123', self.deployment_location)
+        self.assertEqual(execution.status, 'COMPLETE')
+        self.assertEqual(execution.outputs, {'outputA': 'valueA'})
+        self.assertEqual(self.mock_heat_driver.get_stack.call_count, 2)
+        self.mock_heat_driver.get_stack.assert_called_with('1', 'Create::1::request123', stack_name=None)
+
+    def test_get_lifecycle_execution_delete_complete_does_not_resolve_outputs(self):
+        self.mock_heat_driver.get_stack.return_value = {'id': '1', 'stack_status': 'DELETE_COMPLETE'}
+        driver = ResourceDriverHandler(self.mock_location_translator, resource_driver_config=self.resource_driver_config, heat_translator_service=self.mock_heat_translator, tosca_discovery_service=self.mock_tosca_discover_service)
+        driver.get_lifecycle_execution('Delete::1::request123', self.deployment_location)
+        self.mock_heat_driver.get_stack.assert_called_once_with('1', 'Delete::1::request123', resolve_outputs=False, stack_name=None, expected_actions=('DELETE',))
+
     def test_get_lifecycle_execution_create_complete(self):
         self.mock_heat_driver.get_stack.return_value = {
             'id': '1',
@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from ignition.boot.config import BootProperties
+from ignition.service.framework import ServiceRegister
+from ignition.service.requestqueue import LifecycleRequestQueueCapability
+from ignition.service.resourcedriver import (ResourceDriverProperties, ResourceDriverService, ResourceDriverServiceCapability, LifecycleExecutionMonitoringCapability, LifecycleMessagingCapability,
+                                             ResourceDriverHandlerCapability, DriverFilesManagerCapability)
+from osvimdriver.service.tenancy import (tenant_context, current_tenant_id, TenantResourceDriverService, TenantResourceDriverServiceConfigurator,
+                                         disable_bootstrapped_resource_driver_service)
+
+
+class TestTenantContext(unittest.TestCase):
+
+    def test_tenant_context(self):
+        self.assertIsNone(current_tenant_id())
+        with tenant_context('tenantA'):
+            self.assertEqual(current_tenant_id(), 'tenantA')
+            with tenant_context('tenantB'):
+                self.assertEqual(current_tenant_id(), 'tenantB')
+            self.assertEqual(current_tenant_id(), 'tenantA')
+        self.assertIsNone(current_tenant_id())
+
+
+class TestTenantResourceDriverService(unittest.TestCase):
+
+    @patch.object(ResourceDriverService, 'execute_lifecycle')
+    def test_execute_lifecycle_sets_tenant(self, mock_execute_lifecycle):
+        tenants = []
+        mock_execute_lifecycle.side_effect = lambda *args, **kwargs: tenants.append(current_tenant_id())
+        service = TenantResourceDriverService.__new__(TenantResourceDriverService)
+        service.execute_lifecycle('Create', 'files', {}, {}, {}, {}, {'name': 'loc'}, 'tenantA')
+        self.assertEqual(tenants, ['tenantA'])
+        mock_execute_lifecycle.assert_called_once_with('Create', 'files', {}, {}, {}, {}, {'name': 'loc'}, 'tenantA')
+        self.assertIsNone(current_tenant_id())
+
+
+class TestTenantResourceDriverServiceConfigurator(unittest.TestCase):
+
+    def __build_configuration(self, async_messaging_enabled=False, request_queue_enabled=False):
+        resource_driver_config = ResourceDriverProperties()
+        resource_driver_config.async_messaging_enabled = async_messaging_enabled
+        resource_driver_config.lifecycle_request_queue.enabled = request_queue_enabled
+        configuration = MagicMock()
+        configuration.property_groups.get_property_group.return_value = resource_driver_config
+        return configuration
+
+    def test_disable_bootstrapped_resource_driver_service(self):
+        boot_properties = BootProperties()
+        boot_properties.resource_driver.service_enabled = True
+        app_builder = MagicMock()
+        app_builder.property_groups.get_property_group.return_value = boot_properties
+        disable_bootstrapped_resource_driver_service(app_builder)
+        self.assertFalse(boot_properties.resource_driver.service_enabled)
+
+    def test_configure_with_monitoring(self):
+        service_register = ServiceRegister()
+        TenantResourceDriverServiceConfigurator().configure(self.__build_configuration(async_messaging_enabled=True), service_register)
+        self.assertEqual(service_register.get_service_offering_capability(ResourceDriverServiceCapability), TenantResourceDriverService)
+        self.assertEqual(service_register.get_service_requirements(TenantResourceDriverService), {
+            'lifecycle_monitor_service': LifecycleExecutionMonitoringCapability,
+            'handler': ResourceDriverHandlerCapability,
+            'resource_driver_config': ResourceDriverProperties,
+            'driver_files_manager': DriverFilesManagerCapability
+        })
+
+    def test_configure_with_messaging_and_request_queue(self):
+        service_register = ServiceRegister()
+        TenantResourceDriverServiceConfigurator().configure(self.__build_configuration(request_queue_enabled=True), service_register)
+        self.assertEqual(service_register.get_service_requirements(TenantResourceDriverService), {
+            'lifecycle_messaging_service': LifecycleMessagingCapability,
+            'handler': ResourceDriverHandlerCapability,
+            'resource_driver_config': ResourceDriverProperties,
+            'driver_files_manager': DriverFilesManagerCapability,
+            'lifecycle_request_queue': LifecycleRequestQueueCapability
+        })
+
+    def test_configure_fails_when_service_already_registered(self):
+        service_register = ServiceRegister()
+        TenantResourceDriverServiceConfigurator().configure(self.__build_configuration(), service_register)
+        with self.assertRaises(ValueError):
+            TenantResourceDriverServiceConfigurator().configure(self.__build_configuration(), service_register)
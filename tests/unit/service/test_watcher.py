@@ -0,0 +1,261 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+import unittest
+from unittest.mock import patch, MagicMock
+from ignition.model.lifecycle import LifecycleExecution
+from ignition.service.resourcedriver import LifecycleMessagingService, InfrastructureNotFoundError, TemporaryResourceDriverError
+from osvimdriver.openstack.heat.driver import StackNotFoundError
+from osvimdriver.service.watcher import StackWatcher, StackWatcherProperties, StackWatcherService, StackWatcherServiceConfigurator
+
+
+class PostalServiceStandIn():
+
+    def __init__(self):
+        self.envelopes = []
+
+    def post(self, envelope):
+        self.envelopes.append(envelope)
+
+    def messages(self, topic):
+        return [json.loads(envelope.message.content) for envelope in self.envelopes if envelope.address == topic]
+
+
+class TestStackWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_heat_driver = MagicMock()
+        self.mock_os_location = MagicMock(heat_driver=self.mock_heat_driver)
+        self.mock_location_translator = MagicMock()
+        self.mock_location_translator.from_deployment_location.return_value = self.mock_os_location
+        self.mock_handler = MagicMock()
+        self.postal_service = PostalServiceStandIn()
+        topics_configuration = MagicMock()
+        topics_configuration.lifecycle_execution_events.name = 'lm_vnfc_lifecycle_execution_events'
+        self.lifecycle_messaging_service = LifecycleMessagingService(postal_service=self.postal_service, topics_configuration=topics_configuration)
+        self.deployment_location = {'name': 'testdl', 'properties': {}}
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.watcher_properties = StackWatcherProperties()
+        self.watcher_properties.shared_store.path = os.path.join(self.tmp_dir, 'published.db')
+        self.watcher = StackWatcher(self.mock_location_translator, self.watcher_properties)
+        self.watcher.start(self.mock_handler, self.lifecycle_messaging_service)
+
+    def tearDown(self):
+        self.watcher.stop()
+
+    def test_init_without_location_translator_fails(self):
+        with self.assertRaises(ValueError) as context:
+            StackWatcher(None)
+        self.assertEqual(str(context.exception), 'location_translator must be provided')
+
+    def test_watch_before_start_is_ignored(self):
+        watcher = StackWatcher(self.mock_location_translator)
+        watcher.watch('Create::1::request123', self.deployment_location, '1')
+        self.assertEqual(watcher.stats(), {'watched': 0, 'published': 0})
+
+    def test_check_follows_events_from_marker(self):
+        self.mock_heat_driver.get_stack_events.side_effect = [
+            [{'id': 'event1', 'physical_resource_id': '1', 'resource_status': 'CREATE_IN_PROGRESS'}],
+            [{'id': 'event2', 'physical_resource_id': 'server1', 'resource_status': 'CREATE_COMPLETE'}]
+        ]
+        self.watcher.watch('Create::1::request123::stack', self.deployment_location, '1', stack_name='stack')
+        self.watcher.check()
+        self.watcher.check()
+        self.assertEqual(self.mock_heat_driver.get_stack_events.call_args_list[0][1], {'marker': None, 'stack_name': 'stack'})
+        self.assertEqual(self.mock_heat_driver.get_stack_events.call_args_list[1][1], {'marker': 'event1', 'stack_name': 'stack'})
+        self.mock_handler.check_lifecycle_execution.assert_not_called()
+        self.assertEqual(self.mock_os_location.close.call_count, 2)
+        self.assertEqual(self.watcher.stats(), {'watched': 1, 'published': 0})
+
+    def test_check_publishes_finished_stack(self):
+        self.mock_heat_driver.get_stack_events.return_value = [{'id': 'event2', 'physical_resource_id': '1', 'resource_status': 'CREATE_COMPLETE'}]
+        self.mock_handler.check_lifecycle_execution.return_value = LifecycleExecution('Create::1::request123', 'COMPLETE', outputs={'outputA': 'valueA'})
+        self.watcher.watch('Create::1::request123', self.deployment_location, '1')
+        self.watcher.check()
+        self.mock_handler.check_lifecycle_execution.assert_called_once_with('Create::1::request123', self.deployment_location)
+        messages = self.postal_service.messages('lm_vnfc_lifecycle_execution_events')
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0]['requestId'], 'Create::1::request123')
+        self.assertEqual(messages[0]['status'], 'COMPLETE')
+        self.assertEqual(messages[0]['outputs'], {'outputA': 'valueA'})
+        self.assertEqual(self.watcher.stats(), {'watched': 0, 'published': 1})
+
+    def test_check_publishes_for_tenant(self):
+        self.mock_heat_driver.get_stack_events.return_value = [{'id': 'event2', 'physical_resource_id': '1', 'resource_status': 'CREATE_COMPLETE'}]
+        self.mock_handler.check_lifecycle_execution.return_value = LifecycleExecution('Create::1::request123', 'COMPLETE')
+        self.watcher.watch('Create::1::request123', self.deployment_location, '1', operation='CREATE', tenant_id='tenantA')
+        self.watcher.check()
+        self.assertEqual(len(self.postal_service.envelopes), 1)
+        self.assertEqual(self.postal_service.envelopes[0].tenant_id, 'tenantA')
+
+    def test_published_request_remembered(self):
+        self.mock_heat_driver.get_stack_events.return_value = [{'id': 'event2', 'physical_resource_id': '1', 'resource_status': 'CREATE_COMPLETE'}]
+        self.mock_handler.check_lifecycle_execution.return_value = LifecycleExecution('Create::1::request123', 'COMPLETE')
+        self.watcher.watch('Create::1::request123', self.deployment_location, '1')
+        self.assertIsNone(self.watcher.sent_by('Create::1::request123'))
+        self.watcher.check()
+        self.assertEqual(self.watcher.sent_by('Create::1::request123'), 'watcher')
+        self.assertIsNone(self.watcher.sent_by('Create::2::request456'))
+
+    def test_published_request_shared_between_workers(self):
+        self.mock_heat_driver.get_stack_events.return_value = [{'id': 'event2', 'physical_resource_id': '1', 'resource_status': 'CREATE_COMPLETE'}]
+        self.mock_handler.check_lifecycle_execution.return_value = LifecycleExecution('Create::1::request123', 'COMPLETE')
+        other_watcher = StackWatcher(self.mock_location_translator, self.watcher_properties)
+        other_watcher.start(self.mock_handler, self.lifecycle_messaging_service)
+        self.addCleanup(other_watcher.stop)
+        self.watcher.watch('Create::1::request123', self.deployment_location, '1')
+        other_watcher.watch('Create::1::request123', self.deployment_location, '1')
+        self.watcher.check()
+        other_watcher.check()
+        self.assertEqual(other_watcher.sent_by('Create::1::request123'), 'watcher')
+        self.assertEqual(len(self.postal_service.messages('lm_vnfc_lifecycle_execution_events')), 1)
+        self.assertEqual(other_watcher.stats(), {'watched': 0, 'published': 0})
+
+    def test_request_claimed_by_monitor_not_sent(self):
+        self.mock_heat_driver.get_stack_events.return_value = [{'id': 'event2', 'physical_resource_id': '1', 'resource_status': 'CREATE_COMPLETE'}]
+        self.mock_handler.check_lifecycle_execution.return_value = LifecycleExecution('Create::1::request123', 'COMPLETE')
+        self.assertTrue(self.watcher.claim('Create::1::request123', 'monitor'))
+        self.watcher.watch('Create::1::request123', self.deployment_location, '1')
+        self.watcher.check()
+        self.assertEqual(len(self.postal_service.envelopes), 0)
+        self.assertEqual(self.watcher.stats()['watched'], 0)
+
+    def test_unshared_record_when_disabled(self):
+        self.watcher_properties.shared_store.enabled = False
+        self.watcher_properties.shared_store.path = os.path.join(self.tmp_dir, 'unused.db')
+        watcher = StackWatcher(self.mock_location_translator, self.watcher_properties)
+        watcher.start(self.mock_handler, self.lifecycle_messaging_service)
+        self.addCleanup(watcher.stop)
+        self.assertTrue(watcher.claim('Create::1::request123', 'watcher'))
+        self.assertFalse(watcher.claim('Create::1::request123', 'monitor'))
+        self.assertFalse(os.path.exists(self.watcher_properties.shared_store.path))
+
+    def test_failed_send_not_remembered(self):
+        self.mock_heat_driver.get_stack_events.return_value = [{'id': 'event2', 'physical_resource_id': '1', 'resource_status': 'CREATE_COMPLETE'}]
+        self.mock_handler.check_lifecycle_execution.return_value = LifecycleExecution('Create::1::request123', 'COMPLETE')
+        mock_lifecycle_messaging_service = MagicMock()
+        mock_lifecycle_messaging_service.send_lifecycle_execution.side_effect = Exception('Kafka unavailable')
+        watcher = StackWatcher(self.mock_location_translator, self.watcher_properties)
+        watcher.start(self.mock_handler, mock_lifecycle_messaging_service)
+        self.addCleanup(watcher.stop)
+        watcher.watch('Create::1::request123', self.deployment_location, '1')
+        watcher.check()
+        self.assertIsNone(watcher.sent_by('Create::1::request123'))
+        self.assertEqual(watcher.stats()['watched'], 1)
+
+    def test_check_ignores_events_of_earlier_operation(self):
+        self.mock_heat_driver.get_stack_events.side_effect = [
+            [{'id': 'event1', 'physical_resource_id': '1', 'resource_status': 'CREATE_COMPLETE', 'event_time': '2020-01-01T00:00:00Z'}],
+            [{'id': 'event2', 'physical_resource_id': '1', 'resource_status': 'DELETE_COMPLETE'}]
+        ]
+        self.mock_handler.check_lifecycle_execution.return_value = LifecycleExecution('Delete::1::request123', 'COMPLETE')
+        self.watcher.watch('Delete::1::request123', self.deployment_location, '1', operation='DELETE')
+        self.watcher.check()
+        self.mock_handler.check_lifecycle_execution.assert_not_called()
+        self.watcher.check()
+        self.assertEqual(len(self.postal_service.messages('lm_vnfc_lifecycle_execution_events')), 1)
+
+    def test_check_ignores_events_from_before_watch(self):
+        self.mock_heat_driver.get_stack_events.side_effect = [
+            [{'id': 'event1', 'physical_resource_id': '1', 'resource_status': 'DELETE_FAILED', 'event_time': '2020-01-01T00:00:00Z'}],
+            [{'id': 'event2', 'physical_resource_id': '1', 'resource_status': 'DELETE_COMPLETE', 'event_time': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}]
+        ]
+        self.mock_handler.check_lifecycle_execution.return_value = LifecycleExecution('Delete::1::request123', 'COMPLETE')
+        self.watcher.watch('Delete::1::request123', self.deployment_location, '1', operation='DELETE')
+        self.watcher.check()
+        self.mock_handler.check_lifecycle_execution.assert_not_called()
+        self.watcher.check()
+        self.mock_handler.check_lifecycle_execution.assert_called_once()
+
+    def test_check_publishes_deleted_stack(self):
+        self.mock_heat_driver.get_stack_events.side_effect = StackNotFoundError('Not found')
+        self.mock_handler.check_lifecycle_execution.return_value = LifecycleExecution('Delete::1::request123', 'COMPLETE')
+        self.watcher.watch('Delete::1::request123', self.deployment_location, '1')
+        self.watcher.check()
+        self.assertEqual(len(self.postal_service.messages('lm_vnfc_lifecycle_execution_events')), 1)
+
+    def test_check_keeps_watching_when_not_yet_finished(self):
+        self.mock_heat_driver.get_stack_events.return_value = [{'id': 'event2', 'physical_resource_id': '1', 'resource_status': 'DELETE_COMPLETE'}]
+        self.mock_handler.check_lifecycle_execution.return_value = LifecycleExecution('Delete::1::request123', 'IN_PROGRESS')
+        self.watcher.watch('Delete::1::request123', self.deployment_location, '1')
+        self.watcher.check()
+        self.assertEqual(len(self.postal_service.envelopes), 0)
+        self.assertEqual(self.watcher.stats()['watched'], 1)
+
+    def test_check_publishes_once_handler_reports_finished(self):
+        self.mock_heat_driver.get_stack_events.return_value = [{'id': 'event2', 'physical_resource_id': '1', 'resource_status': 'CREATE_COMPLETE'}]
+        self.mock_handler.check_lifecycle_execution.side_effect = [
+            LifecycleExecution('Create::1::request123', 'IN_PROGRESS'),
+            LifecycleExecution('Create::1::request123', 'COMPLETE')
+        ]
+        self.watcher.watch('Create::1::request123', self.deployment_location, '1')
+        self.watcher.check()
+        self.watcher.check()
+        self.mock_heat_driver.get_stack_events.assert_called_once()
+        self.assertEqual(len(self.postal_service.messages('lm_vnfc_lifecycle_execution_events')), 1)
+
+    def test_check_stops_watching_when_result_cannot_be_determined(self):
+        self.mock_heat_driver.get_stack_events.side_effect = StackNotFoundError('Not found')
+        self.mock_handler.check_lifecycle_execution.side_effect = InfrastructureNotFoundError('Not found')
+        self.watcher.watch('Create::1::request123', self.deployment_location, '1')
+        self.watcher.check()
+        self.assertEqual(len(self.postal_service.envelopes), 0)
+        self.assertEqual(self.watcher.stats()['watched'], 0)
+
+    def test_check_temporary_error_keeps_watching(self):
+        self.mock_heat_driver.get_stack_events.side_effect = StackNotFoundError('Not found')
+        self.mock_handler.check_lifecycle_execution.side_effect = TemporaryResourceDriverError('Unavailable')
+        self.watcher.watch('Create::1::request123', self.deployment_location, '1')
+        self.watcher.check()
+        self.assertEqual(self.watcher.stats()['watched'], 1)
+
+    def test_check_error_keeps_watching(self):
+        self.mock_heat_driver.get_stack_events.side_effect = Exception('Service Unavailable')
+        self.watcher.watch('Create::1::request123', self.deployment_location, '1')
+        self.watcher.check()
+        self.assertEqual(self.watcher.stats()['watched'], 1)
+
+
+class TestStackWatcherService(unittest.TestCase):
+
+    def test_init_starts_watcher(self):
+        mock_stack_watcher = MagicMock()
+        mock_handler = MagicMock()
+        mock_lifecycle_messaging_service = MagicMock()
+        StackWatcherService(mock_stack_watcher, handler=mock_handler, lifecycle_messaging_service=mock_lifecycle_messaging_service)
+        mock_stack_watcher.start.assert_called_once_with(mock_handler, mock_lifecycle_messaging_service)
+
+    def test_init_without_handler_fails(self):
+        with self.assertRaises(ValueError) as context:
+            StackWatcherService(MagicMock(), lifecycle_messaging_service=MagicMock())
+        self.assertEqual(str(context.exception), 'handler argument not provided')
+
+
+class TestStackWatcherServiceConfigurator(unittest.TestCase):
+
+    def __configuration(self, lifecycle_messaging_service_enabled):
+        configuration = MagicMock()
+        configuration.property_groups.get_property_group.return_value.resource_driver.lifecycle_messaging_service_enabled = lifecycle_messaging_service_enabled
+        return configuration
+
+    def test_configure(self):
+        watcher_properties = StackWatcherProperties()
+        watcher_properties.enabled = True
+        mock_service_register = MagicMock()
+        StackWatcherServiceConfigurator(StackWatcher(MagicMock(), watcher_properties)).configure(self.__configuration(True), mock_service_register)
+        mock_service_register.add_service.assert_called_once()
+
+    def test_configure_disabled(self):
+        mock_service_register = MagicMock()
+        StackWatcherServiceConfigurator(StackWatcher(MagicMock())).configure(self.__configuration(True), mock_service_register)
+        mock_service_register.add_service.assert_not_called()
+
+    def test_configure_without_lifecycle_messaging(self):
+        watcher_properties = StackWatcherProperties()
+        watcher_properties.enabled = True
+        mock_service_register = MagicMock()
+        StackWatcherServiceConfigurator(StackWatcher(MagicMock(), watcher_properties)).configure(self.__configuration(False), mock_service_register)
+        mock_service_register.add_service.assert_not_called()